@@ -0,0 +1,247 @@
+""" Search for the fleet layouts the bot finds hardest
+
+    The bot is only ever measured against random layouts, which says nothing about its worst case. This runs an
+    evolutionary search over fleet layouts to find ones that take the bot the most turns to sink. A layout's score
+    is the bot's mean turns over a fixed set of bot seeds, so every layout is played against the same bots.
+    Each generation the hardest layouts are kept and the rest are replaced by mutations of them: a ship nudged a
+    cell or two, turned, or moved somewhere random. New layouts are scored on a process pool and every score is
+    cached, so a layout that comes up again is never replayed.
+
+    The hardest layouts found are written to a JSON benchmark file, which load_layouts reads back so the same
+    layouts can be played against future versions of the bot.
+
+    Run this file to search, eg.
+        python adversarialSearch.py --generations 30 --population 40 --bot-seeds 20 --output hardest_layouts.json
+
+    Functions:
+        random_layout(rows: int, columns: int, fleet_template: FleetTemplate, rng: random.Random) -> Layout:
+            A layout placed the way Ship.random_place places ships.
+
+        evaluate_layout(rows: int, columns: int, fleet_name: str, layout: Layout, bot_seeds: Sequence[int], density_targeting: bool) -> float:
+            Mean turns the bot takes to sink a layout.
+
+        search(rows: int, columns: int, fleet_name: str, generations: int, population: int, ...) -> List[Tuple[float, Layout]]:
+            Evolve layouts to maximise the bot's turns.
+
+        load_layouts(path: str) -> dict:
+            Read a benchmark file written by save_layouts.
+"""
+from typing import Dict, List, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import json
+import random
+import densityTargeting
+import fleet
+import priors
+from gameContext import GameContext
+from gameBoard import gameBoard
+from ship import DIRECTIONS, Layout, place_fleet, place_layout
+
+
+def random_layout(rows: int, columns: int, fleet_template: fleet.FleetTemplate, rng: random.Random) -> Layout:
+    """
+    A layout placed the way Ship.random_place places ships, so the search starts from the layouts the bot normally sees.
+    """
+    board = gameBoard(rows, columns)
+    ships = fleet_template.create_ships()
+    place_fleet(board.board, ships, rows, columns, rng=rng)
+    return tuple((ship.bow_coord[0], ship.bow_coord[1], ship.direction) for ship in ships)
+
+
+def mutate(layout: Layout, rows: int, columns: int, fleet_template: fleet.FleetTemplate, rng: random.Random) -> Layout:
+    """
+    Change one ship of a layout, trying again until the result is a valid layout.
+    """
+    while True:
+        ships = list(layout)
+        index = rng.randrange(len(ships))
+        row, column, direction = ships[index]
+        move = rng.random()
+        if move < 0.5: # Nudge
+            row += rng.randint(-2, 2)
+            column += rng.randint(-2, 2)
+        elif move < 0.75: # Turn
+            direction = rng.choice(DIRECTIONS)
+        else: # Somewhere random
+            row, column, direction = rng.randrange(rows), rng.randrange(columns), rng.choice(DIRECTIONS)
+        if not (0 <= row < rows and 0 <= column < columns):
+            continue
+        ships[index] = (row, column, direction)
+        candidate = tuple(ships)
+        if candidate != layout and place_layout(gameBoard(rows, columns), fleet_template.create_ships(), candidate):
+            return candidate
+
+
+def layout_cells(rows: int, columns: int, fleet_template: fleet.FleetTemplate, layout: Layout) -> Tuple[Tuple[Tuple[int, int], ...], ...]:
+    """
+    Cells of each ship of a layout, sorted, so layouts that put the ships on the same cells compare equal
+    whichever end is the bow and whichever of two ships the same length is where.
+    """
+    ships = fleet_template.create_ships()
+    place_layout(gameBoard(rows, columns), ships, layout)
+    return tuple(sorted(tuple(sorted(ship.occupied_cells)) for ship in ships))
+
+
+def evaluate_layout(rows: int, columns: int, fleet_name: str, layout: Layout, bot_seeds: Sequence[int], density_targeting: bool = False) -> float:
+    """
+    Mean turns the bot takes to sink every ship of a layout, over a set of bot seeds. Run in pool workers.
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        fleet_name (str): Name of the fleet from the fleet config.
+        layout (Layout): Where each ship is.
+        bot_seeds (Sequence[int]): Seed of each bot that plays the layout.
+        density_targeting (bool): True to play a density targeting bot instead of the checkboard pattern.
+
+    Returns:
+        float: Mean turns to sink every ship.
+    """
+    fleet_template = fleet.get_fleet(fleet_name)
+    cell_priors = priors.load_priors(rows, columns, fleet_template)
+    density = densityTargeting.DensityTargeter(rows, columns, workers=0) if density_targeting else None # Layouts are already scored in parallel
+    total = 0
+    try:
+        for seed in bot_seeds:
+            context = GameContext(rows, columns, fleet_template, seed=seed, priors=cell_priors)
+            board = context.create_board()
+            ships = fleet_template.create_ships()
+            if not place_layout(board, ships, layout):
+                raise ValueError(f"Layout {layout} can't be placed on a {rows}x{columns} board")
+            if density is not None:
+                density.clear()
+            bot = context.create_bot(density=density)
+            sunk = 0
+            while sunk < len(ships):
+                total += 1
+                if bot.bot_turn(board.board):
+                    sunk += 1
+    finally:
+        if density is not None:
+            density.close()
+    return total / len(bot_seeds)
+
+
+def search(rows: int, columns: int, fleet_name: str = fleet.DEFAULT_FLEET, generations: int = 30, population: int = 40, bot_seeds: int = 20,
+           density_targeting: bool = False, seed: int = 0, workers: int = None, progress: bool = False) -> List[Tuple[float, Layout]]:
+    """
+    Evolve fleet layouts to maximise the turns the bot takes. The hardest half of each generation is kept and the
+    other half replaced by mutations of it.
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        fleet_name (str): Name of the fleet from the fleet config.
+        generations (int): Number of generations.
+        population (int): Layouts in each generation.
+        bot_seeds (int): Bots each layout is played against, seeds 0 to bot_seeds - 1.
+        density_targeting (bool): True to search against a density targeting bot.
+        seed (int): Seed for the search.
+        workers (int): Worker processes, None for one per CPU.
+        progress (bool): True to print the best and mean score of each generation.
+
+    Returns:
+        List[Tuple[float, Layout]]: Every layout scored during the search with its score, hardest first. Layouts on the same cells are listed once.
+    """
+    fleet_template = fleet.get_fleet(fleet_name)
+    fleet_template.validate(rows, columns)
+    rng = random.Random(seed)
+    seeds = tuple(range(bot_seeds))
+    scores: Dict[tuple, float] = {} # Score of every layout scored so far, by the cells its ships cover
+    found: Dict[tuple, Layout] = {} # First layout scored for those cells
+    cells: Dict[Layout, tuple] = {} # Cells of each layout seen
+
+    def cells_of(layout: Layout) -> tuple:
+        if layout not in cells:
+            cells[layout] = layout_cells(rows, columns, fleet_template, layout)
+        return cells[layout]
+
+    def score(layout: Layout) -> float:
+        return scores[cells_of(layout)]
+
+    def score_all(layouts: List[Layout]) -> None:
+        for layout in layouts:
+            found.setdefault(cells_of(layout), layout)
+        new = [key for key in dict.fromkeys(map(cells_of, layouts)) if key not in scores]
+        new_layouts = [found[key] for key in new]
+        results = pool.map(evaluate_layout, [rows] * len(new), [columns] * len(new), [fleet_name] * len(new), new_layouts,
+                           [seeds] * len(new), [density_targeting] * len(new))
+        scores.update(zip(new, results))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        layouts = [random_layout(rows, columns, fleet_template, rng) for _ in range(population)]
+        for generation in range(generations):
+            score_all(layouts)
+            layouts.sort(key=score, reverse=True)
+            if progress:
+                print(f"Generation {generation + 1}: hardest {score(layouts[0]):.2f}, mean {sum(map(score, layouts)) / len(layouts):.2f} turns")
+            survivors = layouts[:max(population // 2, 1)]
+            layouts = survivors + [mutate(rng.choice(survivors), rows, columns, fleet_template, rng) for _ in range(population - len(survivors))]
+        score_all(layouts)
+    return sorted(((scores[key], found[key]) for key in scores), key=lambda result: result[0], reverse=True)
+
+
+def save_layouts(path: str, rows: int, columns: int, fleet_name: str, results: List[Tuple[float, Layout]], bot_seeds: int,
+                 density_targeting: bool = False) -> None:
+    """
+    Write layouts and their scores to a JSON benchmark file.
+    """
+    ship_names = [ship.name for ship in fleet.get_fleet(fleet_name).ships]
+    benchmark = {
+        "rows": rows,
+        "columns": columns,
+        "fleet": fleet_name,
+        "bot_seeds": bot_seeds,
+        "density_targeting": density_targeting,
+        "layouts": [{"turns": score, "ships": [{"name": name, "row": row, "column": column, "direction": direction}
+                                              for name, (row, column, direction) in zip(ship_names, layout)]}
+                    for score, layout in results],
+    }
+    with open(path, "w") as file:
+        json.dump(benchmark, file, indent=2)
+
+
+def load_layouts(path: str) -> dict:
+    """
+    Read a benchmark file written by save_layouts.
+
+    Returns:
+        dict: The benchmark settings, with "layouts" as a list of (turns when found, Layout) tuples.
+    """
+    with open(path) as file:
+        benchmark = json.load(file)
+    benchmark["layouts"] = [(entry["turns"], tuple((ship["row"], ship["column"], ship["direction"]) for ship in entry["ships"]))
+                            for entry in benchmark["layouts"]]
+    return benchmark
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Search for the fleet layouts the bot takes the longest to sink")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--fleet", default=fleet.DEFAULT_FLEET, help="Fleet name from the fleet config")
+    parser.add_argument("--generations", type=int, default=30)
+    parser.add_argument("--population", type=int, default=40)
+    parser.add_argument("--bot-seeds", type=int, default=20, help="Bots each layout is played against")
+    parser.add_argument("--density", action="store_true", help="Search against a density targeting bot")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--keep", type=int, default=20, help="Hardest layouts to write to the benchmark file")
+    parser.add_argument("--output", default="hardest_layouts.json")
+    args = parser.parse_args()
+
+    found = search(args.rows, args.columns, args.fleet, args.generations, args.population, args.bot_seeds, args.density,
+                   args.seed, args.workers, progress=True)
+    save_layouts(args.output, args.rows, args.columns, args.fleet, found[:args.keep], args.bot_seeds, args.density)
+
+    # Score the hardest layouts again against bots that weren't used in the search, so the figure isn't overfitted to them
+    check_seeds = range(10000, 10000 + args.bot_seeds * 5)
+    fleet_template = fleet.get_fleet(args.fleet)
+    rng = random.Random(args.seed + 1)
+    random_scores = [evaluate_layout(args.rows, args.columns, args.fleet, random_layout(args.rows, args.columns, fleet_template, rng),
+                                     check_seeds, args.density) for _ in range(20)]
+    worst = evaluate_layout(args.rows, args.columns, args.fleet, found[0][1], check_seeds, args.density)
+    print(f"Random layouts: mean {sum(random_scores) / len(random_scores):.2f} turns")
+    print(f"Hardest layout: {found[0][0]:.2f} turns in the search, {worst:.2f} against new bots")
+    print(f"Wrote {min(args.keep, len(found))} layouts to {args.output}")
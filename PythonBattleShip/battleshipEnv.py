@@ -0,0 +1,369 @@
+""" Reset / step environment for training and evaluating targeting policies
+
+    BattleshipEnv wraps a board, a randomly placed fleet and shot resolution behind the reset / step API used by
+    Gym, without needing gym installed. An action is the flat index of the cell to shoot (row * columns + column),
+    and the observation is one byte per cell:
+        0   Not shot yet
+        1   Miss
+        2   Hit on a ship that is still afloat
+        3   Part of a sunk ship
+    Every shot has a reward of -1, so the return of a game is minus the number of turns it took, the same score
+    the computer modes report.
+
+    VectorEnv runs many environments in worker processes. Observations, actions, rewards and done flags live in
+    shared memory, so a step only sends a single byte to each worker instead of pickling arrays.
+    Everything is exposed as memoryviews, eg. numpy.frombuffer(env.observations, numpy.uint8) views them without copying.
+
+    Run this file to benchmark the step rate, eg.
+        python battleshipEnv.py --envs 256 --workers 4 --steps 200000
+
+    Classes:
+        BattleshipEnv:
+            One game with the reset / step API.
+
+        VectorEnv:
+            Many environments stepped together in worker processes through shared memory.
+"""
+from typing import List, Sequence, Tuple
+from array import array
+from multiprocessing import shared_memory
+import multiprocessing
+import fleet
+from gameContext import GameContext
+
+UNKNOWN: int = 0
+MISS: int = 1
+HIT: int = 2
+SUNK: int = 3
+REWARD_SHOT: float = -1.0 # Reward for every shot, hit or miss
+
+# Commands sent to VectorEnv workers, everything else goes through shared memory
+COMMAND_STEP: bytes = b"s"
+COMMAND_RESET: bytes = b"r"
+COMMAND_CLOSE: bytes = b"c"
+
+
+class BattleshipEnv:
+    """
+    One game of a bot shooting at a randomly placed fleet, with the reset / step API.
+
+    Attributes:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        cells (int): Number of cells, also the number of actions.
+        max_steps (int): Steps before a game is truncated, stops a policy that keeps shooting the same cell running forever.
+        observation (memoryview): One byte per cell, updated in place by every step.
+        steps (int): Steps taken in the current game.
+    """
+
+    def __init__(self, rows: int = 10, columns: int = 10, fleet_template: fleet.FleetTemplate = fleet.STANDARD_FLEET, seed: int = None,
+                 max_steps: int = None, observation: memoryview = None):
+        """
+        Args:
+            rows (int): Number of rows on the game board.
+            columns (int): Number of columns on the game board.
+            fleet_template (FleetTemplate): Fleet placed every game.
+            seed (int): Seed for fleet placement, None for unseeded games.
+            max_steps (int): Steps before a game is truncated, None for twice the number of cells.
+            observation (memoryview): Buffer of rows * columns bytes to write observations to, eg. a slice of shared memory. None to create one.
+        """
+        fleet_template.validate(rows, columns)
+        self.rows: int = rows
+        self.columns: int = columns
+        self.cells: int = rows * columns
+        self.max_steps: int = max_steps if max_steps is not None else 2 * self.cells
+        self.context: GameContext = GameContext(rows, columns, fleet_template, seed=seed)
+        self.board = self.context.create_board() # Only used to place the fleet, shots are resolved on the flat lists below
+        self.ships = []
+        self.observation: memoryview = observation if observation is not None else memoryview(bytearray(self.cells))
+        if len(self.observation) != self.cells:
+            raise ValueError(f"Observation buffer has {len(self.observation)} bytes, needs {self.cells}")
+        self.empty_observation: bytes = bytes(self.cells)
+        self.ship_at: List[int] = [-1] * self.cells # Index into ships of the ship on each cell, -1 for water
+        self.ship_cells: List[List[int]] = [] # Flat index of each ship's cells
+        self.ship_hits: List[int] = []
+        self.ships_left: int = 0
+        self.steps: int = 0
+
+    def reset(self, seed: int = None) -> Tuple[memoryview, dict]:
+        """
+        Start a new game with a newly placed fleet.
+
+        Args:
+            seed (int): Reseed fleet placement, None to carry on from the current random state.
+
+        Returns:
+            Tuple[memoryview, dict]: The empty observation and an info dictionary.
+        """
+        if seed is not None:
+            self.context.rng.seed(seed)
+        for index in range(len(self.ship_cells)):
+            for cell in self.ship_cells[index]:
+                self.ship_at[cell] = -1
+        for ship in self.ships:
+            ship.clear_ship(self.board.board)
+
+        self.ships = self.context.create_fleet(self.board)
+        self.ship_cells = [[row * self.columns + column for row, column in ship.occupied_cells] for ship in self.ships]
+        for index, cells in enumerate(self.ship_cells):
+            for cell in cells:
+                self.ship_at[cell] = index
+        self.ship_hits = [0] * len(self.ships)
+        self.ships_left = len(self.ships)
+        self.steps = 0
+        self.observation[:] = self.empty_observation
+        return self.observation, {}
+
+    def step(self, action: int) -> Tuple[memoryview, float, bool, bool, dict]:
+        """
+        Shoot a cell. Shooting a cell that was already shot wastes the turn but changes nothing.
+
+        Args:
+            action (int): Flat index of the cell to shoot, row * columns + column.
+
+        Returns:
+            Tuple[memoryview, float, bool, bool, dict]: (observation, reward, terminated, truncated, info).
+            Terminated is True once every ship is sunk, truncated is True when max_steps is reached first.
+            Info has "hit" and, when a ship sinks, "sunk" with the ship's name.
+
+        Raises:
+            ValueError: If the action is not a cell on the board.
+        """
+        if not 0 <= action < self.cells:
+            raise ValueError(f"Action {action} is not a cell on a {self.rows}x{self.columns} board")
+        observation = self.observation
+        self.steps += 1
+        truncated = self.steps >= self.max_steps
+        if observation[action] != UNKNOWN:
+            return observation, REWARD_SHOT, False, truncated, {"hit": False, "repeat": True}
+
+        index = self.ship_at[action]
+        if index < 0:
+            observation[action] = MISS
+            return observation, REWARD_SHOT, False, truncated, {"hit": False}
+
+        self.ship_hits[index] += 1
+        if self.ship_hits[index] < len(self.ship_cells[index]):
+            observation[action] = HIT
+            return observation, REWARD_SHOT, False, truncated, {"hit": True}
+
+        # Sunk, show the whole ship as sunk so a policy knows to stop hunting around it
+        for cell in self.ship_cells[index]:
+            observation[cell] = SUNK
+        self.ships_left -= 1
+        terminated = self.ships_left == 0
+        return observation, REWARD_SHOT, terminated, truncated and not terminated, {"hit": True, "sunk": self.ships[index].name}
+
+
+def _worker(connection, memory: shared_memory.SharedMemory, first_env: int, env_count: int, num_envs: int, rows: int, columns: int,
+            fleet_template: fleet.FleetTemplate, seed: int, max_steps: int) -> None:
+    """
+    Run a block of environments in a worker process, stepping them whenever a command byte arrives.
+    Finished games are reset straight away, the turns they took are left in episode_turns.
+    """
+    cells = rows * columns
+    observations, actions, rewards, terminated, truncated, episode_turns = _views(memory, num_envs, cells)
+    envs = []
+    for number in range(first_env, first_env + env_count):
+        env = BattleshipEnv(rows, columns, fleet_template, seed=None if seed is None else seed + number, max_steps=max_steps,
+                            observation=observations[number * cells:(number + 1) * cells])
+        env.reset()
+        envs.append(env)
+    numbers = range(first_env, first_env + env_count)
+
+    try:
+        while True:
+            command = connection.recv_bytes()
+            if command == COMMAND_STEP:
+                for number, env in zip(numbers, envs):
+                    _, reward, done, cut_short, _ = env.step(actions[number])
+                    rewards[number] = reward
+                    terminated[number] = done
+                    truncated[number] = cut_short
+                    if done or cut_short:
+                        episode_turns[number] = env.steps
+                        env.reset()
+                    else:
+                        episode_turns[number] = 0
+            elif command == COMMAND_RESET:
+                for number, env in zip(numbers, envs):
+                    env.reset()
+                    episode_turns[number] = 0
+            elif command == COMMAND_CLOSE:
+                break
+            connection.send_bytes(command) # Tell the main process this block is done
+    except (EOFError, KeyboardInterrupt):
+        pass # Main process has gone
+    # The shared memory isn't closed here, a forked worker also has copies of the main process's views into it.
+    # It is unmapped when the worker exits.
+
+
+def _views(memory: shared_memory.SharedMemory, num_envs: int, cells: int) -> Tuple[memoryview, ...]:
+    """
+    Split the shared memory into typed views. Layout: actions (int32), rewards (float32), episode turns (int32),
+    terminated and truncated flags (1 byte each), then observations. The 4 byte values go first so they stay aligned.
+    """
+    buffer = memory.buf
+    offset = 0
+    actions = buffer[offset:offset + 4 * num_envs].cast("i")
+    offset += 4 * num_envs
+    rewards = buffer[offset:offset + 4 * num_envs].cast("f")
+    offset += 4 * num_envs
+    episode_turns = buffer[offset:offset + 4 * num_envs].cast("i")
+    offset += 4 * num_envs
+    terminated = buffer[offset:offset + num_envs]
+    offset += num_envs
+    truncated = buffer[offset:offset + num_envs]
+    offset += num_envs
+    observations = buffer[offset:offset + num_envs * cells]
+    return observations, actions, rewards, terminated, truncated, episode_turns
+
+
+class VectorEnv:
+    """
+    Many BattleshipEnvs stepped together in worker processes, exchanging everything through shared memory.
+    Each worker runs a block of environments. Games that finish are reset automatically, so the observation after
+    a finished game is the start of the next one, and episode_turns holds how many turns the finished game took.
+    Use as a context manager so the workers and shared memory are cleaned up.
+
+    Attributes:
+        num_envs (int): Number of environments.
+        cells (int): Number of cells on each board, also the number of actions.
+        observations (memoryview): num_envs * cells bytes, environment i's observation starts at i * cells.
+        actions (memoryview): Int32 action for each environment, written by step.
+        rewards (memoryview): Float32 reward of each environment's last step.
+        terminated (memoryview): 1 for each environment whose last step sunk the last ship.
+        truncated (memoryview): 1 for each environment whose last step hit max_steps.
+        episode_turns (memoryview): Int32 turns of the game that just finished in each environment, 0 if it didn't finish.
+    """
+
+    def __init__(self, num_envs: int, rows: int = 10, columns: int = 10, fleet_template: fleet.FleetTemplate = fleet.STANDARD_FLEET,
+                 seed: int = None, max_steps: int = None, num_workers: int = None):
+        """
+        Args:
+            num_envs (int): Number of environments.
+            rows (int): Number of rows on each game board.
+            columns (int): Number of columns on each game board.
+            fleet_template (FleetTemplate): Fleet placed every game.
+            seed (int): Seed for environment 0, environment i uses seed + i. None for unseeded games.
+            max_steps (int): Steps before a game is truncated, None for twice the number of cells.
+            num_workers (int): Number of worker processes, None for one per CPU. Never more than num_envs.
+        """
+        fleet_template.validate(rows, columns)
+        self.num_envs: int = num_envs
+        self.cells: int = rows * columns
+        num_workers = min(num_workers or multiprocessing.cpu_count(), num_envs)
+
+        self.memory = shared_memory.SharedMemory(create=True, size=num_envs * (14 + self.cells))
+        (self.observations, self.actions, self.rewards, self.terminated,
+         self.truncated, self.episode_turns) = _views(self.memory, num_envs, self.cells)
+
+        self.connections = []
+        self.workers = []
+        first_env = 0
+        for worker_number in range(num_workers):
+            env_count = num_envs // num_workers + (1 if worker_number < num_envs % num_workers else 0)
+            parent_connection, child_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_worker, name=f"battleship-env-{worker_number}", daemon=True,
+                                             args=(child_connection, self.memory, first_env, env_count, num_envs, rows, columns,
+                                                   fleet_template, seed, max_steps))
+            worker.start()
+            child_connection.close()
+            self.connections.append(parent_connection)
+            self.workers.append(worker)
+            first_env += env_count
+
+    def _send(self, command: bytes) -> None:
+        # Start every worker before waiting on any, so they all run at the same time
+        for connection in self.connections:
+            connection.send_bytes(command)
+        for connection in self.connections:
+            connection.recv_bytes()
+
+    def observation(self, number: int) -> memoryview:
+        """
+        The observation of one environment.
+        """
+        return self.observations[number * self.cells:(number + 1) * self.cells]
+
+    def reset(self) -> memoryview:
+        """
+        Start a new game in every environment.
+
+        Returns:
+            memoryview: Observations of every environment.
+        """
+        self._send(COMMAND_RESET)
+        return self.observations
+
+    def step(self, actions: Sequence[int] = None) -> Tuple[memoryview, memoryview, memoryview, memoryview]:
+        """
+        Step every environment.
+
+        Args:
+            actions (Sequence[int]): Action for each environment. None if they were already written to the actions view.
+
+        Returns:
+            Tuple[memoryview, memoryview, memoryview, memoryview]: (observations, rewards, terminated, truncated).
+        """
+        if actions is not None:
+            self.actions[:] = actions if isinstance(actions, memoryview) else memoryview(array("i", actions))
+        self._send(COMMAND_STEP)
+        return self.observations, self.rewards, self.terminated, self.truncated
+
+    def close(self) -> None:
+        """
+        Stop the workers and free the shared memory.
+        """
+        if self.memory is None:
+            return
+        for connection in self.connections:
+            try:
+                connection.send_bytes(COMMAND_CLOSE)
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in self.workers:
+            worker.join()
+        for connection in self.connections:
+            connection.close()
+        del self.observations, self.actions, self.rewards, self.terminated, self.truncated, self.episode_turns
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
+
+    def __enter__(self) -> "VectorEnv":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from time import perf_counter
+    parser = argparse.ArgumentParser(description="Benchmark the step rate of the vectorized environment")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--envs", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--steps", type=int, default=200000, help="Total environment steps")
+    args = parser.parse_args()
+
+    with VectorEnv(args.envs, args.rows, args.columns, seed=0, num_workers=args.workers) as envs:
+        envs.reset()
+        cells = envs.cells
+        games = 0
+        turns = 0
+        time_start = perf_counter()
+        for step in range(max(args.steps // args.envs, 1)):
+            # Every environment sweeps the board one cell at a time, every cell is shot once before any repeat
+            envs.step(array("i", [step % cells]) * args.envs)
+            if any(envs.terminated) or any(envs.truncated):
+                finished = [count for count in envs.episode_turns if count]
+                games += len(finished)
+                turns += sum(finished)
+        elapsed = perf_counter() - time_start
+        total_steps = max(args.steps // args.envs, 1) * args.envs
+        print(f"{total_steps} steps in {elapsed:.2f}s, {total_steps / elapsed:,.0f} steps/s, {len(envs.workers)} workers")
+        if games:
+            print(f"{games} games finished, average {turns / games:.1f} turns")
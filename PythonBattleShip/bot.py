@@ -1,7 +1,61 @@
 """ Functions for controlling the bot's actions in the game """
 
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Sequence, Tuple
+from collections import deque
+from functools import lru_cache
+from time import perf_counter
 import random
+import stateCache
+import shotResolution
+from endgameSolver import EndgameSolver
+from fleetSampler import R_HAT_LIMIT, TOUCH_SEARCH_WEIGHT, FleetSampler
+
+if TYPE_CHECKING: # Only named in annotations, callers create these themselves
+    from densityTargeting import DensityTargeter
+    from gameEvents import EventBus
+    from ship import Ship
+
+NEIGHBOUR_TABLE_MAX_CELLS: int = 250000 # Boards larger than this work out neighbours on the fly instead of using a table
+PATTERN_LIST_MAX_CELLS: int = 4000000 # Boards larger than this pick checkboard cells at random instead of listing the pattern
+
+@lru_cache(maxsize=32)
+def checkboard_cells(rows: int, columns: int, spacing: int, offset: int) -> Tuple[Tuple[int, int], ...]:
+    """
+    Precompute a diagonal checkboard pattern, every cell where (row + column) % spacing == offset.
+    Every horizontal or vertical run of spacing cells contains exactly one pattern cell, so the pattern
+    is guaranteed to hit every ship of length spacing or longer.
+    Cached so the pattern for a board size is only built once and shared between games.
+
+    Args:
+        rows (int): Number of rows in the game board.
+        columns (int): Number of columns in the game board.
+        spacing (int): Gap between pattern cells along a row, the length of the smallest ship to find.
+        offset (int): Shift of the pattern, 0 to spacing - 1.
+
+    Returns:
+        Tuple[Tuple[int, int], ...]: Row and column of every cell in the pattern.
+    """
+    return tuple((row, column) for row in range(rows) for column in range((offset - row) % spacing, columns, spacing))
+
+@lru_cache(maxsize=8)
+def neighbour_table(rows: int, columns: int) -> Tuple[Tuple[Tuple[int, int], ...], ...]:
+    """
+    Precompute the in bounds up, down, left and right neighbours of every cell on a board.
+    Cached so every bot playing on the same board size shares one table.
+
+    Args:
+        rows (int): Number of rows in the game board.
+        columns (int): Number of columns in the game board.
+
+    Returns:
+        Tuple[Tuple[Tuple[int, int], ...], ...]: Neighbours of each cell, indexed by row * columns + column.
+    """
+    table = []
+    for row in range(rows):
+        for column in range(columns):
+            table.append(tuple((r, c) for r, c in ((row - 1, column), (row + 1, column), (row, column - 1), (row, column + 1))
+                               if 0 <= r < rows and 0 <= c < columns))
+    return tuple(table) # Immutable, the table is shared by every bot on this board size
 
 class Bot:
     """
@@ -12,7 +66,9 @@ class Bot:
         board (List[List[dict]]): The game board for the bot.
     """
     
-    def __init__(self, name: str, rows: int, columns: int):
+    def __init__(self, name: str, rows: int, columns: int, ship_lengths: List[int] = None, priors: Sequence[float] = None, rng: random.Random = None,
+                 density: "DensityTargeter" = None, habits: Sequence[float] = None, state_cache: stateCache.StateCache = None,
+                 endgame: EndgameSolver = None, sampler: FleetSampler = None, events: "EventBus" = None):
         """
         Initialize the bot with a name and a game board.
         
@@ -20,226 +76,486 @@ class Bot:
             name (str): The name of the bot.
             rows (int): Number of rows in the game board.
             columns (int): Number of columns in the game board.            
+            ship_lengths (List[int]): Lengths of the opponent's ships, needed for sampling fleet layouts in bot_turn.
+            priors (Sequence[float]): Chance of each cell being occupied, indexed by row * columns + column, from priors.load_priors.
+                The checkboard pattern is shot in order of most likely cell first. None to shoot the pattern in random order.
+            rng (random.Random): Random number generator for this bot, so bots in different threads don't share one. None for a new unseeded one.
+            density (DensityTargeter): Search by shooting the cell the most ship placements could cover instead of the checkboard pattern.
+                Meant for large boards where the counting is split across a process pool. None to use the checkboard pattern.
+            habits (Sequence[float]): Weight of each cell learnt from where this opponent has put ships before, from opponentModel.habit_weights.
+                Multiplies the priors when ordering the pattern and the counts when sampling layouts. None to not use it.
+            state_cache (StateCache): Cache of density shots by board state, shared between games so states that come up again
+                are looked up instead of counted. Only used with a density targeter. None to always count.
+            endgame (EndgameSolver): Solve the shots exactly once only a few fleet configurations are left. None to not solve them.
+            sampler (FleetSampler): Hunt by shooting where the most sampled fleet configurations put a ship, instead of
+                working through the cells next to each hit, and search that way too once the sunk ships are clustered. None to hunt around hits.
+            events (EventBus): Bus to emit each shot, hit and sink into. None to not emit them.
         """
+        self.rng: random.Random = rng if rng is not None else random.Random()
         self.name = name
         self.rows = rows
         self.columns = columns
+        self.remaining_lengths: List[int] = list(ship_lengths) if ship_lengths else []  # Lengths of ships not yet sunk
+        self.priors = priors
+        self.density = density
+        self.habits = habits
+        self.state_cache = state_cache
+        self.endgame = endgame
+        self.sampler = sampler
+        self.events = events
+        self.board_hash = stateCache.BoardHash(rows, columns) if state_cache is not None and density is not None else None
         
-        self.checkboard_pattern = [] # Generate the checkboard pattern for attacks
-        self.adjactent_pattern = []  # Placeholder for adjacent pattern, can be generated later if needed
-        self.search_generate()  # Generate the search patterns upon initialization
+        self.checkboard_spacing: int = None  # Spacing the checkboard pattern was generated for
+        self.checkboard_offset: int = 0  # Shift of the checkboard pattern
+        self.checkboard_pattern = [] # Generate the checkboard pattern for attacks, None when the board is too large to list it
+        self.search_generate()  # Generate the search pattern upon initialization
 
         self.hunt_mode_active = False  # Flag to indicate if the bot is in hunt mode
-        self.first_hit: Tuple[int, int] = None  # Coordinates of the first hit, used in hunt mode
-        self.last_hit: Tuple[int, int] = None  # Coordinates of the last hit, used in hunt mode
+        self.unresolved_hits: set = set()  # Hits on ships that have not been sunk yet, used in hunt mode
+        self.sunk_ships: List[List[Tuple[int, int]]] = []  # Cells of each ship sunk, for the fleet sampler's touch weight
+        self.target_queue: deque = deque()  # Candidate cells around the unresolved hits, best candidates at the front
+        self.last_shot: Tuple[int, int] = None  # Coordinates of the most recent shot, hit or miss
         self.last_shot_hit: bool = False  # Falg to indicate if the last shot hit a ship
-        self.hunt_direction: int = None  # Search direction in hunt mode, can be 0 (up), 1 (down), 2 (left), or 3 (right)
+        self.neighbours = neighbour_table(rows, columns) if rows * columns <= NEIGHBOUR_TABLE_MAX_CELLS else None
 
-    def search_generate(self) -> Tuple[int, int]:
+    def smallest_ship(self) -> int:
         """
-        Generates search patterns for different stages of the game.
-        1: Checkboard pattern is used for the initial search. It has 2 column spaces between attacks in a checkboard pattern. Pattern is randomly shifted slightly to avoid predictability.
-        2: Spaces where there are two adjactent tiles not in the checkboard pattern.
-        Bot should then resort to random attacks of remaining tiles.
-        
-        Returns:
-            Tuple[int, int]: Row and column of shot.
+        Length of the smallest ship still afloat, 2 if the bot wasn't told the fleet.
         """
+        return min(self.remaining_lengths) if self.remaining_lengths else 2
+
+    def search_generate(self, board: List[List[dict]] = None) -> None:
+        """
+        Generates the checkboard search pattern for the smallest ship still afloat.
+        A ship of length n always covers one cell out of every n along a row or column, so shooting every n-th cell
+        on each diagonal is guaranteed to find it, and every longer ship, with no second sweep needed.
+        The pattern is regenerated when the smallest ship is sunk, it gets sparser as the small ships go.
+        The pattern looks like this for the Frigate (2), and then once it is sunk for the Destroyer (3):
+            # 0 1 2 3 4 5       # 0 1 2 3 4 5
+            0 C ~ C ~ C ~       0 C ~ ~ C ~ ~
+            1 ~ C ~ C ~ C       1 ~ ~ C ~ ~ C
+            2 C ~ C ~ C ~       2 ~ C ~ ~ C ~
+            3 ~ C ~ C ~ C       3 C ~ ~ C ~ ~
         
-        # 1: Checkboard pattern.
-            # Define the spaces between attacks, this is to make it easier to adjust later if needed.
-            # Add some jiggle to offset the pattern slightly to avoid predictability.
-        # 2: Adjacent tiles pattern.
-            # Adjacent tiles are defined as two tiles that are not in the checkboard pattern.
-            # In the diagram below, C are the tiles in the checkboard pattern, A are the tiles in the adjacent pattern, and ~ tiles not in a pattern.
-            # The idea is that the smallest ship can fit into the gaps between the checkboard pattern, but hopefully gets found by it. If not the the adjacent pattern will find it.
-            # The adjacent pattern is on the first and third row of every three rows. The first row covers left and down, the third row covers right and up.
-            # The pattern looks like this:
-            # # 0 1 2 3 4 5
-            # 0 C ~ A C ~ A
-            # 1 ~ C ~ ~ C ~
-            # 2 A ~ C A ~ C
-            # 3 C ~ A C ~ A
-            # 4 ~ C ~ ~ C ~
-            # 5 A ~ C A ~ C
-        
-        checkboard_spacing = 2  # Spaces between attacks in the checkboard pattern
-        jiggle = random.randint(0, checkboard_spacing)  # Randomly shift the pattern slightly to avoid predictability
-        checkboard_coordinates = [] # List to hold the coordinates in a checkboard pattern
-        adjactent_coordinates = [] # List to hold the coordinates of adjacent tile pattern
-        for row in range(self.rows):
-            start = row % 3 - jiggle # Adjust the start index based on the row and jiggle value, negate so first acceptable value is 0, 1 or 2
-            for i in range(0, self.columns, checkboard_spacing + 1):  # Iterate through the columns with the specified spacing
-                # 1: Get column for checkboard pattern
-                col = start + i
-                if col >= 0 and col < self.columns:  # If column index is in bounds append to checkboard coordinate list
-                    checkboard_coordinates.append((row, col))
-
-                # 2: Get column for adjacent tiles, reference above for explanation of row type.
-                row_type = row % 3
-                if row_type == 0:
-                    col = start + i + 2
-                elif row_type == 1:
-                    continue
-                elif row_type == 2:
-                    col = start + i + 1
-
-                if col >= 0 and col < self.columns:  # If column index is in bounds append to checkboard coordinate list
-                    adjactent_coordinates.append((row, col))
-
-        self.checkboard_pattern = checkboard_coordinates
-        self.adjactent_pattern = adjactent_coordinates
-
-    def hunt_mode(self, board: List[List[dict]]) -> Tuple[int, int]:
+        Args:
+            board (List[List[dict]]): The game board being searched. When given, the pattern is shifted to line up with
+                as many of the cells already shot as possible, and shot cells are left out. Otherwise the shift is random.
+        """
+        spacing = self.smallest_ship()
+        if self.rows * self.columns > PATTERN_LIST_MAX_CELLS:
+            # Too many cells to list, pattern_shot picks cells on the pattern at random instead
+            self.checkboard_spacing = spacing
+            self.checkboard_offset = self.rng.randint(0, spacing - 1)
+            self.checkboard_pattern = None
+            return
+        if board is None:
+            offset = self.rng.randint(0, spacing - 1)  # Randomly shift the pattern to avoid predictability
+            pattern = list(checkboard_cells(self.rows, self.columns, spacing, offset))
+        else:
+            # Take the shift that leaves the fewest cells left to shoot
+            best = None
+            for offset in self.rng.sample(range(spacing), spacing):
+                pattern = [cell for cell in checkboard_cells(self.rows, self.columns, spacing, offset) if not board[cell[0]][cell[1]]["is_shot"]]
+                if best is None or len(pattern) < len(best):
+                    best = pattern
+            pattern = best
+        if self.priors is not None or self.habits is not None:
+            # Most likely cell last so it is popped first, shuffled first so equally likely cells are in random order
+            self.rng.shuffle(pattern)
+            pattern.sort(key=self.search_weight)
+        self.checkboard_spacing = spacing
+        self.checkboard_pattern = pattern
+
+    def search_weight(self, cell: Tuple[int, int]) -> float:
+        """
+        How likely a cell is to have a ship on it before any shots, the prior times the opponent's habit weight.
+        """
+        index = cell[0] * self.columns + cell[1]
+        weight = self.priors[index] if self.priors is not None else 1.0
+        if self.habits is not None:
+            weight *= self.habits[index]
+        return weight
+
+    def get_neighbours(self, cell: Tuple[int, int]) -> Tuple[Tuple[int, int], ...]:
+        """
+        Get the in bounds up, down, left and right neighbours of a cell.
+        """
+        if self.neighbours is not None:
+            return self.neighbours[cell[0] * self.columns + cell[1]]
+        row, column = cell
+        return tuple((r, c) for r, c in ((row - 1, column), (row + 1, column), (row, column - 1), (row, column + 1))
+                     if 0 <= r < self.rows and 0 <= c < self.columns)
+
+    def queue_targets(self, board: List[List[dict]], hit: Tuple[int, int]) -> None:
+        """
+        Add the candidate cells around a hit to the target queue.
+        If the hit lines up with other unresolved hits the ship's orientation is known, so the open
+        cells at each end of the line go to the front of the queue. The neighbours of the hit go to the
+        back, they are still needed if the line turns out to be several ships touching side by side.
+
+        Args:
+            board (List[List[dict]]): The game board where the bot is searching for the ship.
+            hit (Tuple[int, int]): Row and column of the hit.
+        """
+        for row_step, column_step in ((0, 1), (1, 0)):  # Horizontal then vertical
+            # Walk both ways along the unresolved hits to find the ends of the line
+            start = hit
+            while (start[0] - row_step, start[1] - column_step) in self.unresolved_hits:
+                start = (start[0] - row_step, start[1] - column_step)
+            end = hit
+            while (end[0] + row_step, end[1] + column_step) in self.unresolved_hits:
+                end = (end[0] + row_step, end[1] + column_step)
+            if start == end:
+                continue
+            for cell in ((start[0] - row_step, start[1] - column_step), (end[0] + row_step, end[1] + column_step)):
+                if 0 <= cell[0] < self.rows and 0 <= cell[1] < self.columns and not board[cell[0]][cell[1]]["is_shot"]:
+                    self.target_queue.appendleft(cell)
+        for cell in self.get_neighbours(hit):
+            if not board[cell[0]][cell[1]]["is_shot"]:
+                self.target_queue.append(cell)
+
+    def hunt_mode(self, board: List[List[dict]], exclude: set = frozenset()) -> Tuple[int, int]:
         """
         In hunt mode, bots has hit a ship and is now trying to find the rest of it.
+        Takes the next unshot cell from the target queue, refilling the queue from all the unresolved hits if it runs out.
 
         Args:
             board (List[List[dict]]): The game board where the bot is searching for the ship.
+            exclude (set): Cells not to pick, eg. the ones already in the salvo being chosen.
         
         Returns:
-            Tuple[int, int]: Row and column of shot.
+            Tuple[int, int]: Row and column of shot, or None if there are no cells left next to the unresolved hits.
         """
-        attempt: int = 0  # Counter for how many times bot has tried to find valid shot
-
-        if self.hunt_direction is not None: # If the last shot hit a ship, continue in the same direction
-            direction_reversed_flag = False  # Flag to indicate if the direction has been reversed
-            while True:
-                attempt += 1
-                # Determine the next shot based on the hunt direction
-                if self.hunt_direction == 0:  # Up
-                    shot_row = self.last_hit[0] - 1
-                    shot_column = self.last_hit[1]
-                elif self.hunt_direction == 1:  # Down
-                    shot_row = self.last_hit[0] + 1
-                    shot_column = self.last_hit[1]
-                elif self.hunt_direction == 2:  # Left
-                    shot_row = self.last_hit[0]
-                    shot_column = self.last_hit[1] - 1
-                elif self.hunt_direction == 3:  # Right
-                    shot_row = self.last_hit[0]
-                    shot_column = self.last_hit[1] + 1
-
-                # Check if the shot is within bounds and not already shot at, if so return the coordinates
-                if (0 <= shot_row < self.rows and
-                    0 <= shot_column < self.columns and
-                    not board[shot_row][shot_column]["is_shot"]):
-                    # If the next shot is valid, update the last hit and return the coordinates
-                    return (shot_row, shot_column)
-                else:
-                    # If the next shot is out of bounds or already shot at, reverse the direction
-                    if not direction_reversed_flag:
-                        self.hunt_direction = 1 if self.hunt_direction == 0 else 0 if self.hunt_direction == 1 else 3 if self.hunt_direction == 2 else 2
-                        direction_reversed_flag = True
-                        self.last_hit = self.first_hit # Go back to first hit and look other way
-                    # If it has already been reversed, change direction
+        for _ in range(2):
+            while self.target_queue:
+                cell = self.target_queue.popleft()
+                if not board[cell[0]][cell[1]]["is_shot"] and cell not in exclude:
+                    return cell
+            # Queue has run dry, queue up around every unresolved hit again
+            for hit in self.unresolved_hits:
+                self.queue_targets(board, hit)
+        return None
+
+    def density_shot(self) -> Tuple[int, int]:
+        """
+        The densest cell from the density targeter, looked up in the state cache first if the bot has one.
+        Results are cached in the canonical orientation, so a state's mirror images share the result.
+
+        Returns:
+            Tuple[int, int]: Row and column of shot, or None if no ship fits anywhere.
+        """
+        if self.board_hash is None:
+            return self.density.densest_cell(self.remaining_lengths)
+        state, symmetry = self.board_hash.canonical()
+        key = (state, tuple(sorted(self.remaining_lengths)))
+        cell = self.state_cache.get(key)
+        if cell is not None:
+            return self.board_hash.from_canonical(cell, symmetry)
+        shot = self.density.densest_cell(self.remaining_lengths)
+        if shot is not None:
+            self.state_cache.put(key, self.board_hash.to_canonical(shot, symmetry))
+        return shot
+
+    def anytime_search(self, board: List[List[dict]], deadline: float) -> Tuple[int, int]:
+        """
+        Sample random fleet layouts that are consistent with the shots so far until the deadline,
+        counting how often each unshot cell is covered. The more time given the more layouts are
+        sampled and the better the estimate of where the ships are.
+        A layout is consistent if no ship covers a missed cell or a cell of a sunk ship, and ships don't overlap.
+
+        Args:
+            board (List[List[dict]]): The game board where the bot is searching for ships.
+            deadline (float): perf_counter() time to stop sampling at.
+        
+        Returns:
+            Tuple[int, int]: Row and column of the most covered cell, or None if no layout was found in time.
+        """
+        counts = {}  # Number of sampled layouts covering each unshot cell
+        while perf_counter() < deadline:
+            layout = set()
+            for length in self.remaining_lengths:
+                fits_across, fits_down = length <= self.columns, length <= self.rows # A narrow board only has room one way
+                for _ in range(20):  # Give up on the layout if a ship can't be fitted after a few attempts
+                    if fits_across and (not fits_down or self.rng.randint(0, 1)):  # Horizontal
+                        row = self.rng.randint(0, self.rows - 1)
+                        column = self.rng.randint(0, self.columns - length)
+                        cells = [(row, column + i) for i in range(length)]
+                    else:  # Vertical
+                        row = self.rng.randint(0, self.rows - length)
+                        column = self.rng.randint(0, self.columns - 1)
+                        cells = [(row + i, column) for i in range(length)]
+                    for cell in cells:
+                        tile = board[cell[0]][cell[1]]
+                        if cell in layout or (tile["is_shot"] and (not tile["is_occupied"] or tile["ship"].is_sunk)):
+                            break
                     else:
-                        self.hunt_direction = (self.hunt_direction + 2) % 4
-                        direction_reversed_flag = False
-                
-                if attempt > 100: # If the bot has tried to find the next shot too many times, raise an error
-                    print("Bot is stuck in hunt mode, taking random shot")
-                    return self.random_shot(board)
-                
-        else:
-            # If the hunt direction is not set, pick a random direction to start hunting
-            # Keep trying until a valid direction is found
-            while True:
-                attempt += 1
-                self.hunt_direction = random.randint(0, 3)
-                if self.hunt_direction == 0:  # Up
-                    shot_row = self.last_hit[0] - 1
-                    shot_column = self.last_hit[1]
-                elif self.hunt_direction == 1:  # Down
-                    shot_row = self.last_hit[0] + 1
-                    shot_column = self.last_hit[1]
-                elif self.hunt_direction == 2:  # Left
-                    shot_row = self.last_hit[0]
-                    shot_column = self.last_hit[1] - 1
-                elif self.hunt_direction == 3:  # Right
-                    shot_row = self.last_hit[0]
-                    shot_column = self.last_hit[1] + 1
-
-                # Check if the shot is within bounds and not already shot at, if so return the coordinates
-                if (0 <= shot_row < self.rows and
-                    0 <= shot_column < self.columns and
-                    not board[shot_row][shot_column]["is_shot"]):
-                    # If the next shot is valid, update the last hit and return the coordinates
-                    return (shot_row, shot_column)
-                
-                if attempt > 100: # If the bot has tried to find the next shot too many times, raise an error
-                    print("Bot is stuck in hunt mode, taking random shot")
-                    return self.random_shot(board)
-
-    def bot_turn(self, board: List[List[dict]]) -> bool:
+                        layout.update(cells)
+                        break
+                else:
+                    layout = None
+                    break
+            if layout is None:
+                continue
+            for cell in layout:
+                if not board[cell[0]][cell[1]]["is_shot"]:
+                    counts[cell] = counts.get(cell, 0) + 1
+        if not counts:
+            return None
+        if self.habits is not None:
+            # Layouts are sampled uniformly, weight them towards where this opponent likes to put ships
+            return max(counts, key=lambda cell: counts[cell] * self.habits[cell[0] * self.columns + cell[1]])
+        return max(counts, key=counts.get)
+
+    def sampler_shot(self, board: List[List[dict]], touch_weight: float = 1.0) -> Tuple[int, int]:
+        """
+        The unshot cell the most sampled fleet configurations put a ship on. Configurations have to cover every
+        unresolved hit together, so hits from ships that touch are told apart.
+        Used to hunt, and to search once the sunk ships are clustered. Otherwise, with no hits to go on, the samples
+        are too noisy to beat the density targeter.
+
+        Args:
+            board (List[List[dict]]): The game board where the bot is hunting for ships.
+            touch_weight (float): Weight for configurations where ships touch, from FleetSampler.touch_weight.
+
+        Returns:
+            Tuple[int, int]: Row and column of shot, or None if no configuration fits the board or the chains didn't mix in time.
+        """
+        result = self.sampler.sample(board, self.remaining_lengths, self.rng, touch_weight)
+        if result is None or not result.probabilities or result.r_hat > R_HAT_LIMIT:
+            return None # Hunt around the hits instead of trusting chains that didn't mix in time
+        return max(result.probabilities, key=result.probabilities.get)
+
+    def choose_shot(self, board: List[List[dict]], time_budget: float = 0.0) -> Tuple[int, int]:
+        """
+        Decide where the bot will shoot next without making the shot. The endgame solver once few fleet configurations
+        are left, otherwise hunt mode if a ship has been hit, with the fleet sampler if the bot has one and its chains
+        mixed, otherwise the fleet sampler if the sunk ships are clustered, otherwise the densest cell if the bot has a
+        density targeter, or sampling fleet layouts for up to time_budget seconds, then the checkboard pattern.
+        Only reads the board, so it can run while the opponent is taking their turn on the other board.
+
+        Args:
+            board (List[List[dict]]): The game board where the bot will make a shot.
+            time_budget (float): Seconds the bot may spend sampling fleet layouts to pick a search shot, 0 to use the checkboard pattern.
+        
+        Returns:
+            Tuple[int, int]: Row and column of shot.
+        """
+        shot = None
+        if self.endgame is not None and self.remaining_lengths:
+            shot = self.endgame.solve(board, self.remaining_lengths) # None until few enough fleet configurations are left
+        if shot is None and self.sampler is not None and self.remaining_lengths:
+            touch_weight = self.sampler.touch_weight(self.sunk_ships)
+            if self.hunt_mode_active or touch_weight > TOUCH_SEARCH_WEIGHT:
+                shot = self.sampler_shot(board, touch_weight)
+        if shot is not None:
+            pass # Chosen by the endgame solver or the fleet sampler
+        elif self.hunt_mode_active:
+            shot = self.hunt_mode(board)
+        elif self.density is not None and self.remaining_lengths:
+            shot = self.density_shot()
+        elif time_budget > 0 and self.remaining_lengths:
+            shot = self.anytime_search(board, perf_counter() + time_budget)
+        if shot is None:
+            shot = self.search_shot(board)
+        return shot
+
+    def search_shot(self, board: List[List[dict]], exclude: set = frozenset()) -> Tuple[int, int]:
+        """
+        The next cell of the checkboard pattern, or a random cell once the pattern is used up.
+
+        Args:
+            board (List[List[dict]]): The game board where the bot will make a shot.
+            exclude (set): Cells not to pick, eg. the ones already in the salvo being chosen.
+
+        Returns:
+            Tuple[int, int]: Row and column of shot.
+        """
+        if self.checkboard_spacing != self.smallest_ship():
+            self.search_generate(board)  # Smallest ship has been sunk, switch to a sparser pattern
+        shot = None
+        while shot is None:
+            # If not in hunt mode, use the checkboard pattern
+            if self.checkboard_pattern is None:
+                shot = self.pattern_shot(board)
+            elif len(self.checkboard_pattern) > 0 and (self.priors is not None or self.habits is not None):
+                shot = self.checkboard_pattern.pop() # Pattern is in order of search_weight
+            elif len(self.checkboard_pattern) > 0:
+                # Pop a random shot from the checkboard pattern, swapping it with the last cell so the pop is cheap
+                num = self.rng.randint(0, len(self.checkboard_pattern) - 1)
+                self.checkboard_pattern[num], self.checkboard_pattern[-1] = self.checkboard_pattern[-1], self.checkboard_pattern[num]
+                shot = self.checkboard_pattern.pop()
+            else:
+                # If the pattern is empty, resort to random shots on the board
+                shot = self.random_shot(board)
+            if board[shot[0]][shot[1]]["is_shot"] or shot in exclude:  # Pattern cell already taken by hunt mode or sampling, pick again
+                shot = None
+        return shot
+
+    def choose_salvo(self, board: List[List[dict]], size: int, time_budget: float = 0.0) -> List[Tuple[int, int]]:
+        """
+        Decide on a whole salvo of shots, all fired before any of their results are known. The first shot is chosen
+        as by choose_shot, the rest from the hunt queue while a ship is being hunted, then the densest cells from a single
+        count if the bot has a density targeter, then the checkboard pattern.
+
+        Args:
+            board (List[List[dict]]): The game board where the bot will fire the salvo.
+            size (int): Shots in the salvo, at most the number of unshot cells.
+            time_budget (float): Seconds the bot may spend sampling fleet layouts to pick the first shot.
+
+        Returns:
+            List[Tuple[int, int]]: Row and column of each shot, all different.
+        """
+        salvo = [self.choose_shot(board, time_budget)]
+        chosen = set(salvo)
+        # Cells next to the hits first
+        while self.hunt_mode_active and len(salvo) < size:
+            shot = self.hunt_mode(board, chosen)
+            if shot is None:
+                break
+            salvo.append(shot)
+            chosen.add(shot)
+        # Then the densest cells, all from one count with the salvo's cells counted as misses
+        if len(salvo) < size and self.density is not None and self.remaining_lengths:
+            for cell in salvo:
+                self.density.record_shot(cell[0], cell[1]) # Recorded again with whether it hit when the salvo lands
+            for shot in self.density.densest_cells(self.remaining_lengths, size - len(salvo)):
+                salvo.append(shot)
+                chosen.add(shot)
+        # Then the checkboard pattern
+        while len(salvo) < size:
+            shot = self.search_shot(board, chosen)
+            salvo.append(shot)
+            chosen.add(shot)
+        return salvo
+
+    def bot_turn(self, board: List[List[dict]], time_budget: float = 0.0, shot: Tuple[int, int] = None, turn: int = 0) -> bool:
         """
         The bot's turn to make a shot on the game board.
-        1. Decide where to shoot.
+        1. Decide where to shoot, unless the shot was already chosen with choose_shot.
         2. Make shot and check if it hit a ship.
         3. If it hit a ship, check if it sunk the ship.
-        4. If it sunk a ship, reset hunt mode.
+        4. If it sunk a ship, forget the hits on that ship and leave hunt mode if no other hits are unresolved.
         5. If it did not hit a ship, end turn.
-        6. If it hit a ship, update the last hit and first hit coordinates.
+        6. If it hit a ship, add it to the unresolved hits and queue up the cells around it.
         
         Args:
             board (List[List[dict]]): The game board where the bot will make a shot.
+            time_budget (float): Seconds the bot may spend sampling fleet layouts to pick a search shot, 0 to use the checkboard pattern.
+            shot (Tuple[int, int]): Shot precomputed with choose_shot, None to choose it now.
+            turn (int): Turn number of the game loop, for the shot's events. 0 if the caller doesn't count turns.
         
         Returns:
             bool: True if a ship was sunk, False otherwise. Used to check for end of game.
         """
-        if self.hunt_mode_active:
-            shot = self.hunt_mode(board)
-        else:
-            # If not in hunt mode, use the checkboard pattern for the first shots
-            if len(self.checkboard_pattern) > 0:
-                num = random.randint(0, len(self.checkboard_pattern) - 1)
-                shot = self.checkboard_pattern.pop(num)  # Pop a random shot from the checkboard pattern
-            elif len(self.adjactent_pattern) > 0:
-                # If the checkboard pattern is empty, use the adjacent pattern
-                num = random.randint(0, len(self.adjactent_pattern) - 1)
-                shot = self.adjactent_pattern.pop(num) # Pop a random shot from the adjacent pattern
-            else:
-                # If both patterns are empty, resort to random shots on the board
-                shot = self.random_shot(board)
+        if shot is None:
+            shot = self.choose_shot(board, time_budget)
+        shot_hit, sunk_ship = shotResolution.resolve_shot(board, shot)
+        return self.record_result(board, shot, shot_hit, sunk_ship, turn)
 
-        shot_hit: bool = False # Flag to indicate if the shot hit a ship
-        ship_sunk: bool = False # Flag to indicate if a ship was sunk
+    def salvo_turn(self, board: List[List[dict]], size: int, fleet: Sequence["Ship"] = None, time_budget: float = 0.0,
+                   salvo: List[Tuple[int, int]] = None, turn: int = 0) -> shotResolution.SalvoResult:
+        """
+        The bot's turn in the salvo variant: choose a salvo, fire it all at once, then learn from each shot's result.
 
-        board[shot[0]][shot[1]]['is_shot'] = True  # Mark the tile as shot at
-        if board[shot[0]][shot[1]]['is_occupied']:
-            board[shot[0]][shot[1]]["ship"].hits += 1  # Increment the hit count of the ship
-            shot_hit = True
+        Args:
+            board (List[List[dict]]): The game board where the bot will fire the salvo.
+            size (int): Shots in the salvo.
+            fleet (Sequence[Ship]): Every ship on the board, to check for game over. None to not check.
+            time_budget (float): Seconds the bot may spend sampling fleet layouts to pick the first shot.
+            salvo (List[Tuple[int, int]]): Salvo precomputed with choose_salvo, None to choose it now.
+            turn (int): Turn number of the game loop, for the shots' events. 0 if the caller doesn't count turns.
+
+        Returns:
+            SalvoResult: What each shot hit and sank, and whether the fleet is finished.
+        """
+        if salvo is None:
+            salvo = self.choose_salvo(board, size, time_budget)
+        result = shotResolution.resolve_salvo(board, salvo, fleet)
+        for shot, shot_hit, sunk_ship in zip(salvo, result.hits, result.sunk):
+            self.record_result(board, shot, shot_hit, sunk_ship, turn)
+        return result
+
+    def record_result(self, board: List[List[dict]], shot: Tuple[int, int], shot_hit: bool, sunk_ship: "Ship", turn: int = 0) -> bool:
+        """
+        Learn from the result of a shot that has been resolved: forget a sunk ship's hits, or queue up the cells
+        around a new hit.
+
+        Args:
+            board (List[List[dict]]): The game board that was shot at.
+            shot (Tuple[int, int]): Row and column of the shot.
+            shot_hit (bool): True if the shot hit a ship.
+            sunk_ship (Ship): The ship the shot sank, None if it didn't sink one.
+            turn (int): Turn number of the game loop, for the shot's events. 0 if the caller doesn't count turns.
+
+        Returns:
+            bool: True if the shot sank a ship.
+        """
+        ship_sunk = sunk_ship is not None
+        self.last_shot = shot
+        if self.density is not None:
+            self.density.record_shot(shot[0], shot[1], shot_hit)
+        if ship_sunk and sunk_ship.length in self.remaining_lengths:
+            self.remaining_lengths.remove(sunk_ship.length)
+        if ship_sunk:
+            self.sunk_ships.append(list(sunk_ship.occupied_cells))
+
+        if self.board_hash is not None:
+            if ship_sunk:
+                for cell in sunk_ship.occupied_cells:
+                    self.board_hash.set_state(cell[0], cell[1], stateCache.SUNK)
+            else:
+                self.board_hash.set_state(shot[0], shot[1], stateCache.HIT if shot_hit else stateCache.MISS)
+
+        if self.events is not None and self.events.active:
+            self.events.resolved(self.name, board, shot, board[shot[0]][shot[1]]["ship"] if shot_hit else None, ship_sunk, turn)
 
-            if board[shot[0]][shot[1]]["ship"].check_sunk():
-                ship_sunk = True
-        
         if not shot_hit: # If the shot missed, end turn
             self.last_shot_hit = False
-            return
+            return False
         
-        if ship_sunk: # If the last shot sunk a ship, reset bot's hunt mode
-            self.hunt_mode_active = False
-            self.first_hit = None
-            self.last_hit = None
-            self.last_shot_hit = False
-            self.hunt_direction = None
+        self.last_shot_hit = True  # Mark the last shot as a hit
+        if ship_sunk: # If the last shot sunk a ship, only forget the hits that belong to that ship
+            for cell in sunk_ship.occupied_cells:
+                self.unresolved_hits.discard(cell)
+            # Drop queued cells that are no longer next to an unresolved hit, the rest are kept for ships that were touching
+            self.target_queue = deque(cell for cell in self.target_queue
+                                      if any(neighbour in self.unresolved_hits for neighbour in self.get_neighbours(cell)))
+            self.hunt_mode_active = len(self.unresolved_hits) > 0
             return ship_sunk # End turn
         
-        # If the first hit is not set, set it to the last hit
-        if self.first_hit is None:
-            self.first_hit = shot
-            self.hunt_mode_active = True
-
-        self.last_hit = shot  # Update the last hit to the current shot
-        self.last_shot_hit = True  # Mark the last shot as a hit
+        self.unresolved_hits.add(shot)
+        self.hunt_mode_active = True
+        self.queue_targets(board, shot)
 
         return ship_sunk # End turn              
 
+    def pattern_shot(self, board: List[List[dict]]) -> Tuple[int, int]:
+        """
+        Pick a random unshot cell on the checkboard pattern without listing the pattern, used on very large boards.
+        Falls back to a random shot if it can't find one, which only happens once the pattern is nearly all shot.
+
+        Args:
+            board (List[List[dict]]): The game board where the bot will make a shot.
+
+        Returns:
+            Tuple[int, int]: Row and column of shot.
+        """
+        spacing = self.checkboard_spacing
+        for _ in range(100):
+            shot_row = self.rng.randint(0, self.rows - 1)
+            first_column = (self.checkboard_offset - shot_row) % spacing
+            if first_column >= self.columns:
+                continue
+            shot_column = first_column + spacing * self.rng.randint(0, (self.columns - 1 - first_column) // spacing)
+            if not board[shot_row][shot_column]["is_shot"]:
+                return (shot_row, shot_column)
+        return self.random_shot(board)
+
     def random_shot(self, board: List[List[dict]]):
         # If both patterns are empty, resort to random shots on the board
         while True:
-            shot_row = random.randint(0, self.rows - 1)
-            shot_column = random.randint(0, self.columns - 1)
+            shot_row = self.rng.randint(0, self.rows - 1)
+            shot_column = self.rng.randint(0, self.columns - 1)
             if not board[shot_row][shot_column]["is_shot"]:
                 shot = (shot_row, shot_column)
                 return shot
@@ -249,5 +565,4 @@ if __name__ == "__main__":
     # Example usage
     bot = Bot(name="Bot1", rows=10, columns=10)
     print(f"Bot Name: {bot.name}")
-    print(f"Checkboard Pattern Coordinates: {bot.checkboard_pattern}")
-    print(f"Adjacent Pattern Coordinates: {bot.adjactent_pattern}")
\ No newline at end of file
+    print(f"Checkboard Pattern Coordinates: {bot.checkboard_pattern}")
\ No newline at end of file
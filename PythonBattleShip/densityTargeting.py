@@ -0,0 +1,337 @@
+""" Placement density targeting for large boards, split across a process pool
+
+    The density of a cell is how many ways the ships still afloat could be placed over it, counting every
+    horizontal and vertical window of each ship's length that doesn't cover a shot cell. The bot shoots the
+    densest cell while searching.
+
+    Horizontal windows only depend on one row and vertical windows on one column, so the rows are split into
+    bands and the columns into bands, and each band is counted by a pool worker. The shot state lives in shared
+    memory twice, row by row and column by column, so every line a worker scans is contiguous. Workers read it
+    and write their counts back without anything being copied or pickled except the band bounds.
+    Each cell of the shot state is UNSHOT, MISS or HIT, so workers can tell hits from misses without asking the board.
+
+    Boards of DENSITY_POOL_MIN_CELLS or more get a worker per CPU unless told otherwise. On smaller boards a move is
+    counted faster in the calling process than the pool can be handed the bands. Boards over DENSITY_MAX_CELLS can't
+    be density targeted, the shared memory takes 10 bytes a cell.
+
+    Within a run of unshot cells the count only depends on the run length, so the count for each run length is
+    worked out once and cached, and a row is counted by copying one cached slice per run.
+
+    Run this file to benchmark the time per move, eg.
+        python densityTargeting.py --size 1000 --workers 1 2 4 8
+
+    Functions:
+        default_workers(rows: int, columns: int) -> int:
+            Worker processes to count a board with when the caller doesn't say.
+
+    Classes:
+        DensityTargeter:
+            Keep the shot state of a board in shared memory and find the densest cell with a process pool.
+"""
+from typing import List, Sequence, Tuple
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from heapq import nlargest
+from multiprocessing import shared_memory
+from operator import add
+import os
+import re
+
+# Shot state of a cell
+UNSHOT: int = 0
+MISS: int = 1
+HIT: int = 2
+
+DENSITY_MAX_CELLS: int = 1000 * 1000 # Largest board density targeting is offered on, the shared memory is 10 bytes a cell
+DENSITY_POOL_MIN_CELLS: int = 250000 # Boards with at least this many cells are counted by a pool by default, about where a pool starts to pay off
+
+OPEN_RUN = re.compile(rb"\x00+") # A run of unshot cells in a line of the shot state
+
+_worker_memory: dict = {} # Shared memory attached by each pool worker process, set once by _init_worker
+
+
+@lru_cache(maxsize=4096)
+def run_counts(run_length: int, lengths: Tuple[int, ...]) -> array:
+    """
+    Number of windows of each length in lengths covering each cell of a run of unshot cells.
+
+    Args:
+        run_length (int): Number of unshot cells in the run.
+        lengths (Tuple[int, ...]): Lengths of the ships still afloat, sorted so the cache is shared.
+
+    Returns:
+        array: Int32 window count for each cell of the run.
+    """
+    counts = array("i", [0]) * run_length
+    for length in lengths:
+        if length > run_length:
+            continue
+        for position in range(run_length):
+            counts[position] += min(position + 1, length, run_length - length + 1, run_length - position)
+    return counts
+
+
+def count_lines(shots: memoryview, counts: memoryview, line_length: int, first_line: int, last_line: int, lengths: Tuple[int, ...]) -> None:
+    """
+    Count the windows along a band of lines, rows if the views are row by row or columns if they are column by column.
+
+    Args:
+        shots (memoryview): One byte per cell, 0 if the cell hasn't been shot.
+        counts (memoryview): Int32 count per cell, in the same order as shots, the band is overwritten.
+        line_length (int): Cells in each line.
+        first_line (int): First line of the band.
+        last_line (int): Line after the last line of the band.
+        lengths (Tuple[int, ...]): Lengths of the ships still afloat.
+    """
+    band_start = first_line * line_length
+    band_end = last_line * line_length
+    counts[band_start:band_end] = array("i", [0]) * (band_end - band_start)
+    for line_start in range(band_start, band_end, line_length):
+        for run in OPEN_RUN.finditer(shots[line_start:line_start + line_length].tobytes()):
+            counts[line_start + run.start():line_start + run.end()] = run_counts(run.end() - run.start(), lengths)
+
+
+def densest_in_rows(horizontal: memoryview, vertical: memoryview, rows: int, columns: int, first_row: int, last_row: int) -> Tuple[int, Tuple[int, int]]:
+    """
+    Add the horizontal and vertical counts for a band of rows and find the densest cell.
+
+    Returns:
+        Tuple[int, Tuple[int, int]]: Density and cell of the densest cell in the band, (0, None) if no cell can hold a ship.
+    """
+    best = (0, None)
+    for row in range(first_row, last_row):
+        # vertical is column by column, so a row of it is every rows-th value
+        row_horizontal = horizontal[row * columns:(row + 1) * columns]
+        row_vertical = vertical[row::rows]
+        density = max(map(add, row_horizontal, row_vertical))
+        if density > best[0]:
+            # Only look for the column when the row beats the best so far, most rows don't
+            best = (density, (row, list(map(add, row_horizontal, row_vertical)).index(density)))
+    return best
+
+
+def default_workers(rows: int, columns: int) -> int:
+    """
+    Worker processes to count a board with when the caller doesn't say.
+
+    Args:
+        rows (int): Number of rows on the board.
+        columns (int): Number of columns on the board.
+
+    Returns:
+        int: One per CPU for boards of DENSITY_POOL_MIN_CELLS or more, 0 to count in the calling process otherwise.
+    """
+    if rows * columns < DENSITY_POOL_MIN_CELLS:
+        return 0
+    cpus = os.cpu_count() or 1
+    return cpus if cpus > 1 else 0
+
+
+def _init_worker(name: str, rows: int, columns: int) -> None:
+    # Pool workers share the main process's resource tracker, so attaching doesn't stop the main process unlinking the memory
+    memory = shared_memory.SharedMemory(name=name)
+    _worker_memory["memory"] = memory
+    _worker_memory["views"] = _views(memory, rows, columns)
+    _worker_memory["size"] = (rows, columns)
+
+
+def _worker_task(task: Tuple[str, int, int, Tuple[int, ...]]):
+    """
+    Run one band in a pool worker. Tasks are ("rows" | "columns", first line, last line, lengths) to count windows,
+    or ("densest", first row, last row, ()) to find the densest cell in a band of rows.
+    """
+    kind, first, last, lengths = task
+    rows, columns = _worker_memory["size"]
+    return _run_task(_worker_memory["views"], rows, columns, kind, first, last, lengths)
+
+
+def _run_task(views: Tuple[memoryview, ...], rows: int, columns: int, kind: str, first: int, last: int, lengths: Tuple[int, ...]):
+    shots_by_row, shots_by_column, horizontal, vertical = views
+    if kind == "rows":
+        return count_lines(shots_by_row, horizontal, columns, first, last, lengths)
+    if kind == "columns":
+        return count_lines(shots_by_column, vertical, rows, first, last, lengths)
+    return densest_in_rows(horizontal, vertical, rows, columns, first, last)
+
+
+def _views(memory: shared_memory.SharedMemory, rows: int, columns: int) -> Tuple[memoryview, ...]:
+    """
+    Split the shared memory into the horizontal and vertical counts (int32) then the shot state by row and by column,
+    one byte per cell, UNSHOT, MISS or HIT.
+    """
+    cells = rows * columns
+    horizontal = memory.buf[:4 * cells].cast("i")
+    vertical = memory.buf[4 * cells:8 * cells].cast("i")
+    shots_by_row = memory.buf[8 * cells:9 * cells]
+    shots_by_column = memory.buf[9 * cells:10 * cells]
+    return shots_by_row, shots_by_column, horizontal, vertical
+
+
+def _bands(lines: int, count: int) -> List[Tuple[int, int]]:
+    """
+    Split lines into count bands of nearly equal size, as (first line, line after the last) pairs.
+    """
+    count = max(min(count, lines), 1)
+    return [(lines * band // count, lines * (band + 1) // count) for band in range(count)]
+
+
+class DensityTargeter:
+    """
+    Shot state of one board in shared memory, and a process pool that finds the densest unshot cell.
+    Use as a context manager, or call close, so the pool and shared memory are cleaned up.
+
+    Attributes:
+        rows (int): Number of rows on the board.
+        columns (int): Number of columns on the board.
+        workers (int): Number of worker processes, 0 or 1 to count in this process.
+    """
+
+    def __init__(self, rows: int, columns: int, workers: int = None):
+        """
+        Args:
+            rows (int): Number of rows on the board.
+            columns (int): Number of columns on the board.
+            workers (int): Number of worker processes, 0 or 1 to count in this process. None for default_workers,
+                callers already running in a pool worker should pass 0.
+
+        Raises:
+            ValueError: If the board has more than DENSITY_MAX_CELLS cells.
+        """
+        if rows * columns > DENSITY_MAX_CELLS:
+            raise ValueError(f"Density targeting is limited to {DENSITY_MAX_CELLS} cells, a {rows}x{columns} board has {rows * columns}")
+        if workers is None:
+            workers = default_workers(rows, columns)
+        self.rows: int = rows
+        self.columns: int = columns
+        self.workers: int = workers
+        self.memory = shared_memory.SharedMemory(create=True, size=10 * rows * columns)
+        self.views = _views(self.memory, rows, columns)
+        self.shots_by_row, self.shots_by_column = self.views[0], self.views[1]
+        self.shots_by_row[:] = bytes(rows * columns) # Shared memory isn't always zeroed, eg. on Windows
+        self.shots_by_column[:] = bytes(rows * columns)
+        self.pool: ProcessPoolExecutor = None
+        if workers > 1:
+            self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self.memory.name, rows, columns))
+        self.row_bands = _bands(rows, max(workers, 1))
+        self.column_bands = _bands(columns, max(workers, 1))
+
+    def clear(self) -> None:
+        """
+        Forget every shot, so the targeter and its pool can be reused for the next game.
+        """
+        self.shots_by_row[:] = bytes(self.rows * self.columns)
+        self.shots_by_column[:] = bytes(self.rows * self.columns)
+
+    def record_shot(self, row: int, column: int, hit: bool = False) -> None:
+        """
+        Mark a cell as shot, so no more windows are counted over it.
+
+        Args:
+            row (int): Row of the shot.
+            column (int): Column of the shot.
+            hit (bool): True if the shot hit a ship. Recording a cell again replaces what it was recorded as.
+        """
+        state = HIT if hit else MISS
+        self.shots_by_row[row * self.columns + column] = state
+        self.shots_by_column[column * self.rows + row] = state
+
+    def densest_cell(self, lengths: Sequence[int]) -> Tuple[int, int]:
+        """
+        Find the unshot cell that the most placements of the ships still afloat could cover.
+        Windows are counted over unshot cells only, hits don't make a cell denser, so it should be used while searching,
+        not while a ship is hit and not yet sunk.
+
+        Args:
+            lengths (Sequence[int]): Lengths of the ships still afloat.
+
+        Returns:
+            Tuple[int, int]: Row and column of the densest cell, or None if no ship fits anywhere.
+        """
+        self.count_windows(lengths)
+        densest = [("densest", first, last, ()) for first, last in self.row_bands]
+        if self.pool is None:
+            results = [_run_task(self.views, self.rows, self.columns, *task) for task in densest]
+        else:
+            # Every band has to be counted before any densest cell can be found, so it takes two trips to the pool
+            results = list(self.pool.map(_worker_task, densest))
+        return max(results, key=lambda result: result[0])[1]
+
+    def densest_cells(self, lengths: Sequence[int], count: int) -> List[Tuple[int, int]]:
+        """
+        The densest unshot cells from a single count, densest first, eg. for a salvo. Ties are in the order
+        densest_cell would pick them, so the first cell is the one densest_cell returns.
+
+        Args:
+            lengths (Sequence[int]): Lengths of the ships still afloat.
+            count (int): Number of cells wanted.
+
+        Returns:
+            List[Tuple[int, int]]: Row and column of each cell, fewer than count if fewer cells can hold a ship.
+        """
+        self.count_windows(lengths)
+        horizontal, vertical = self.views[2], self.views[3]
+        density = []
+        for row in range(self.rows):
+            density += map(add, horizontal[row * self.columns:(row + 1) * self.columns], vertical[row::self.rows])
+        return [divmod(index, self.columns) for index in nlargest(count, range(len(density)), key=density.__getitem__) if density[index] > 0]
+
+    def count_windows(self, lengths: Sequence[int]) -> None:
+        """
+        Count the horizontal and vertical windows over every cell into the shared count arrays.
+        """
+        lengths = tuple(sorted(lengths))
+        counting = [("rows", first, last, lengths) for first, last in self.row_bands]
+        counting += [("columns", first, last, lengths) for first, last in self.column_bands]
+        if self.pool is None:
+            for task in counting:
+                _run_task(self.views, self.rows, self.columns, *task)
+        else:
+            list(self.pool.map(_worker_task, counting))
+
+    def close(self) -> None:
+        """
+        Stop the pool and free the shared memory.
+        """
+        if self.memory is None:
+            return
+        if self.pool is not None:
+            self.pool.shutdown()
+        del self.views, self.shots_by_row, self.shots_by_column
+        self.memory.unlink() # Before closing, so the memory is still freed if someone else holds a view
+        self.memory.close()
+        self.memory = None
+
+    def __enter__(self) -> "DensityTargeter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    from time import perf_counter
+    parser = argparse.ArgumentParser(description="Benchmark the time per move of density targeting")
+    parser.add_argument("--size", type=int, default=1000, help="Rows and columns of the board")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--shots", type=int, default=20000, help="Random shots made before timing")
+    parser.add_argument("--moves", type=int, default=10, help="Moves to time")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    shots = [(rng.randrange(args.size), rng.randrange(args.size)) for _ in range(args.shots)]
+    baseline = None
+    for workers in args.workers:
+        with DensityTargeter(args.size, args.size, workers) as targeter:
+            for shot in shots:
+                targeter.record_shot(*shot)
+            targeter.densest_cell([2, 3, 4, 5]) # Start the pool and fill the run cache
+            time_start = perf_counter()
+            for _ in range(args.moves):
+                cell = targeter.densest_cell([2, 3, 4, 5])
+                targeter.record_shot(*cell)
+            per_move = (perf_counter() - time_start) / args.moves
+        baseline = baseline or per_move
+        print(f"{workers:>3} workers: {per_move * 1000:8.1f} ms per move, speedup {baseline / per_move:.2f}x")
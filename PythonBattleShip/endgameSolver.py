@@ -0,0 +1,304 @@
+""" Exact endgame solver for when only a few fleet configurations are left
+
+    Late in a game the shots so far often leave only a handful of ways the remaining ships could be placed.
+    Once the number of consistent configurations is below a threshold they are all listed, and the shot is chosen
+    by dynamic programming over them to minimise the expected number of shots left, every configuration being
+    equally likely. A configuration is consistent if no ship covers a miss or a sunk ship, ships don't overlap,
+    every hit that isn't part of a sunk ship is covered, and no ship is entirely hit (it would have sunk).
+
+    Cells and sets of configurations are both bitmasks. A state of the search is the set of configurations still
+    consistent and the shots that matter to them, and states are memoised since different shot orders reach the same
+    state. Shooting a cell splits the configurations by what the shot would show: a miss, a hit, or which ship sank.
+
+    Classes:
+        EndgameSolver:
+            List the consistent configurations and pick the shot with the fewest expected shots left.
+"""
+from typing import Dict, List, Sequence, Tuple
+from functools import lru_cache
+
+DEFAULT_MAX_CONFIGURATIONS: int = 64 # Solve exactly once this few configurations are left
+DEFAULT_MAX_STATES: int = 2000 # States searched before giving up and shooting the cell most configurations cover
+ENDGAME_MAX_CELLS: int = 2500 # Listing ship positions every turn is too slow on larger boards
+
+MISS: int = 0 # Outcome of a shot, a sunk ship's outcome is its cell mask
+HIT: int = -1
+
+
+@lru_cache(maxsize=64)
+def segment_masks(rows: int, columns: int, length: int) -> Tuple[int, ...]:
+    """
+    Bitmask of every horizontal and vertical position of a ship of a given length, bit row * columns + column.
+    Cached and read only, shared by every solver on this board size.
+    """
+    run = (1 << length) - 1
+    masks = []
+    for row in range(rows):
+        for column in range(columns - length + 1):
+            masks.append(run << (row * columns + column))
+    if length > 1:
+        column_run = sum(1 << (i * columns) for i in range(length))
+        for row in range(rows - length + 1):
+            for column in range(columns):
+                masks.append(column_run << (row * columns + column))
+    return tuple(masks)
+
+
+def read_board(board: List[List[dict]]) -> Tuple[int, int, int]:
+    """
+    Bitmasks of the cells shot, the cells no remaining ship can cover (misses and sunk ships) and the unresolved hits.
+    """
+    shots = blocked = hits = 0
+    bit = 1
+    for row in board:
+        for cell in row:
+            if cell["is_shot"]:
+                shots |= bit
+                if not cell["is_occupied"] or cell["ship"].is_sunk:
+                    blocked |= bit
+                else:
+                    hits |= bit
+            bit <<= 1
+    return shots, blocked, hits
+
+
+class _OutOfBudget(Exception):
+    pass
+
+
+class EndgameSolver:
+    """
+    Pick the shot that minimises the expected shots left, once few enough fleet configurations are consistent.
+
+    Attributes:
+        rows (int): Number of rows on the board.
+        columns (int): Number of columns on the board.
+        max_configurations (int): Solve exactly when at most this many configurations are consistent.
+        max_states (int): States searched before settling for the cell most configurations cover.
+    """
+
+    def __init__(self, rows: int, columns: int, max_configurations: int = DEFAULT_MAX_CONFIGURATIONS, max_states: int = DEFAULT_MAX_STATES):
+        self.rows: int = rows
+        self.columns: int = columns
+        self.max_configurations: int = max_configurations
+        self.max_states: int = max_states
+        self.configurations: List[Tuple[int, Tuple[int, ...]]] = [] # (all ship cells, each ship's cells) of each configuration
+        self.memo: Dict[Tuple[int, int], Tuple[float, int]] = {} # Kept between turns while the plan is followed
+        self.planned: Tuple[int, int, int] = None # (configurations, shots, cell) of the last shot picked
+        self.states: int = 0
+
+    def list_configurations(self, lengths: Sequence[int], shots: int, blocked: int, hits: int) -> bool:
+        """
+        List every consistent configuration of the remaining ships into self.configurations.
+
+        Returns:
+            bool: False if there are more than max_configurations, the list is then incomplete.
+        """
+        lengths = sorted(lengths, reverse=True)
+        # Positions each ship could be in on its own, a position that is all hits would already have sunk
+        options = [[mask for mask in segment_masks(self.rows, self.columns, length) if not mask & blocked and mask & ~shots]
+                   for length in lengths]
+        configurations = []
+
+        def cover_hits(unplaced: Tuple[int, ...], covered: int, ships: Tuple[int, ...]) -> bool:
+            # Some ship has to cover the lowest uncovered hit, so only branch on the positions that do.
+            # That ship is unique to the configuration, so nothing is listed twice.
+            uncovered = hits & ~covered
+            if not uncovered:
+                return place_rest(unplaced, 0, covered, ships, 0)
+            if uncovered.bit_count() > sum(lengths[index] for index in unplaced):
+                return True # Not enough ship cells left to cover the hits
+            target = uncovered & -uncovered
+            tried = set()
+            for position, index in enumerate(unplaced):
+                if lengths[index] in tried:
+                    continue # Ships of the same length are interchangeable
+                tried.add(lengths[index])
+                rest = unplaced[:position] + unplaced[position + 1:]
+                for mask in options[index]:
+                    if mask & target and not mask & covered:
+                        if not cover_hits(rest, covered | mask, ships + (mask,)):
+                            return False
+            return True
+
+        def place_rest(unplaced: Tuple[int, ...], position: int, covered: int, ships: Tuple[int, ...], first_option: int) -> bool:
+            # Place the ships left over once every hit is covered, none of them can touch a hit
+            if position == len(unplaced):
+                configurations.append((covered, ships))
+                return len(configurations) <= self.max_configurations
+            index = unplaced[position]
+            # Keep ships of the same length in option order so each configuration is listed once
+            start = first_option if position > 0 and lengths[index] == lengths[unplaced[position - 1]] else 0
+            for option_index in range(start, len(options[index])):
+                mask = options[index][option_index]
+                if mask & (covered | hits):
+                    continue
+                if not place_rest(unplaced, position + 1, covered | mask, ships + (mask,), option_index + 1):
+                    return False
+            return True
+
+        complete = cover_hits(tuple(range(len(lengths))), 0, ())
+        self.configurations = configurations
+        return complete
+
+    def solve(self, board: List[List[dict]], lengths: Sequence[int]) -> Tuple[int, int]:
+        """
+        The shot with the fewest expected shots left, if few enough configurations are consistent with the board.
+
+        Args:
+            board (List[List[dict]]): The game board being shot at.
+            lengths (Sequence[int]): Lengths of the ships still afloat.
+
+        Returns:
+            Tuple[int, int]: Row and column of shot, or None if there are too many configurations to solve.
+        """
+        shots, blocked, hits = read_board(board)
+        configuration_set = self.follow_plan(board, shots)
+        if configuration_set is None:
+            if not self.list_configurations(lengths, shots, blocked, hits) or not self.configurations:
+                self.planned = None
+                return None
+            configuration_set = (1 << len(self.configurations)) - 1
+            self.memo = {}
+        self.states = 0
+        try:
+            cell = self.expected_shots(configuration_set, shots)[1]
+        except _OutOfBudget:
+            cell = self.most_covered(configuration_set, shots)
+        self.planned = (configuration_set, shots, cell)
+        return divmod(cell.bit_length() - 1, self.columns)
+
+    def follow_plan(self, board: List[List[dict]], shots: int) -> int:
+        """
+        If the only change to the board is the shot picked last turn, narrow last turn's configurations down to the ones
+        that agree with what it showed. The search from last turn already covered that state, so it is a memo lookup.
+
+        Returns:
+            int: Bitmask of the configurations still consistent, or None if they have to be listed again.
+        """
+        if self.planned is None:
+            return None
+        configuration_set, planned_shots, cell = self.planned
+        if shots != planned_shots | cell or shots == planned_shots:
+            return None # Something else changed, eg. a new game
+        row, column = divmod(cell.bit_length() - 1, self.columns)
+        tile = board[row][column]
+        if not tile["is_occupied"]:
+            observed = MISS
+        elif tile["ship"].is_sunk:
+            observed = sum(1 << (ship_row * self.columns + ship_column) for ship_row, ship_column in tile["ship"].occupied_cells)
+        else:
+            observed = HIT
+        narrowed = 0
+        for index in self._members(configuration_set):
+            if self._outcome(index, cell, planned_shots) == observed:
+                narrowed |= 1 << index
+        return narrowed or None
+
+    def most_covered(self, configuration_set: int, shots: int) -> int:
+        """
+        The unshot cell covered by the most configurations in a set, as a one bit mask.
+        """
+        counts = {}
+        for index in self._members(configuration_set):
+            cells = self.configurations[index][0] & ~shots
+            while cells:
+                cell = cells & -cells
+                counts[cell] = counts.get(cell, 0) + 1
+                cells ^= cell
+        return max(counts, key=counts.get)
+
+    def expected_shots(self, configuration_set: int, shots: int, members: List[int] = None) -> Tuple[float, int]:
+        """
+        Expected shots to sink every ship from a state, and the best cell to shoot.
+
+        Args:
+            configuration_set (int): Bitmask of the configurations still consistent.
+            shots (int): Bitmask of the cells shot.
+            members (List[int]): Indexes of the configurations in configuration_set, if the caller already has them.
+
+        Returns:
+            Tuple[float, int]: Expected shots left and the cell to shoot as a one bit mask, 0 if every ship is sunk.
+        """
+        key = (configuration_set, shots)
+        if key in self.memo:
+            return self.memo[key]
+        configurations = self.configurations
+        if members is None:
+            members = self._members(configuration_set)
+        if len(members) == 1:
+            # Only one configuration left, every one of its unshot cells takes exactly one shot
+            left = configurations[members[0]][0] & ~shots
+            return float(left.bit_count()), left & -left
+        if not configurations[members[0]][0] & ~shots:
+            return 0.0, 0 # Every configuration agrees on what has sunk, so they are all finished
+        self.states += 1
+        if self.states > self.max_states:
+            raise _OutOfBudget()
+
+        left_counts = {}
+        left = 0
+        for index in members:
+            unshot = configurations[index][0] & ~shots
+            left_counts[index] = unshot.bit_count()
+            left |= unshot
+        coverage = {}
+        cells = left
+        while cells:
+            cell = cells & -cells
+            coverage[cell] = sum(1 for index in members if configurations[index][0] & cell)
+            cells ^= cell
+        count = len(members)
+        best = (float("inf"), 0)
+        for cell in sorted(coverage, key=coverage.get, reverse=True): # Likeliest hits first so good answers are found early
+            new_shots = shots | cell
+            # Split the configurations by what the shot shows: [configuration set, members, fewest unshot cells left]
+            outcomes = {}
+            for index in members:
+                outcome = MISS
+                remaining = left_counts[index]
+                if configurations[index][0] & cell:
+                    remaining -= 1
+                    outcome = HIT
+                    for ship in configurations[index][1]:
+                        if ship & cell:
+                            if not ship & ~new_shots:
+                                outcome = ship
+                            break
+                group = outcomes.get(outcome)
+                if group is None:
+                    outcomes[outcome] = [1 << index, [index], remaining]
+                else:
+                    group[0] |= 1 << index
+                    group[1].append(index)
+                    if remaining < group[2]:
+                        group[2] = remaining
+            # Every unshot ship cell has to be shot, so the fewest unshot cells of any configuration is a lower bound
+            bound = 1.0 + sum(len(group[1]) * group[2] for group in outcomes.values()) / count
+            if bound >= best[0]:
+                continue
+            expected = 1.0
+            for subset, subset_members, _ in outcomes.values():
+                expected += len(subset_members) / count * self.expected_shots(subset, new_shots, subset_members)[0]
+                if expected >= best[0]:
+                    break
+            if expected < best[0]:
+                best = (expected, cell)
+        self.memo[key] = best
+        return best
+
+    def _outcome(self, index: int, cell: int, shots: int) -> int:
+        # What shooting cell shows if configuration index is the real one
+        for ship in self.configurations[index][1]:
+            if ship & cell:
+                return ship if ship & ~(shots | cell) == 0 else HIT
+        return MISS
+
+    @staticmethod
+    def _members(configuration_set: int) -> List[int]:
+        members = []
+        while configuration_set:
+            lowest = configuration_set & -configuration_set
+            members.append(lowest.bit_length() - 1)
+            configuration_set ^= lowest
+        return members
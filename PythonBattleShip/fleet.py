@@ -0,0 +1,167 @@
+""" Fleet templates and board rules loaded from a config file
+
+    Fleets are read once from fleets.json into immutable templates. Creating the ships for a game
+    from a template is just constructing new Ship objects, there is no need to deepcopy a fleet.
+
+    Functions:
+        load_fleets(path: str) -> Dict[str, FleetTemplate]:
+            Load and validate all fleet templates from a JSON config file.
+
+        get_fleet(name: str, path: str) -> FleetTemplate:
+            Get a single fleet template by name.
+"""
+from typing import List, Mapping, NamedTuple, Tuple
+from functools import lru_cache
+from types import MappingProxyType
+import json
+import os
+from ship import Ship
+
+# Config file that sits next to this module
+FLEET_CONFIG_PATH: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fleets.json")
+DEFAULT_FLEET: str = "Standard"
+
+
+class ShipTemplate(NamedTuple):
+    """
+    Immutable description of a ship, used to create Ship objects.
+    """
+    name: str
+    tile: str
+    length: int
+
+
+class BoardRules(NamedTuple):
+    """
+    Board size limits a fleet can be played on.
+    """
+    min_rows: int = 1
+    min_columns: int = 1
+    max_rows: int = 100000
+    max_columns: int = 100000
+
+
+class FleetTemplate(NamedTuple):
+    """
+    Immutable fleet definition and the board rules it is played with.
+    """
+    name: str
+    ships: Tuple[ShipTemplate, ...]
+    rules: BoardRules = BoardRules()
+
+    @property
+    def ship_lengths(self) -> List[int]:
+        return [ship.length for ship in self.ships]
+
+    def create_ships(self) -> List[Ship]:
+        """
+        Create a new set of unplaced ships for one game.
+
+        Returns:
+            List[Ship]: One Ship object for each ship in the template.
+        """
+        return [Ship(ship.name, ship.tile, ship.length) for ship in self.ships]
+
+    def validate(self, board_rows: int, board_columns: int) -> None:
+        """
+        Check the fleet can be played on a board of the given size.
+        The board must be within the rules, every ship must fit in a row or column and the fleet
+        can't cover more cells than the board has. A fleet that passes can still be impossible to pack
+        onto the board, ship.place_fleet raises a ValueError for it instead of trying forever.
+
+        Args:
+            board_rows (int): Number of rows on the game board.
+            board_columns (int): Number of columns on the game board.
+
+        Raises:
+            ValueError: If the fleet can't be played on the board.
+        """
+        if not (self.rules.min_rows <= board_rows <= self.rules.max_rows and self.rules.min_columns <= board_columns <= self.rules.max_columns):
+            raise ValueError(f"{self.name} fleet needs a board between {self.rules.min_rows}x{self.rules.min_columns} and {self.rules.max_rows}x{self.rules.max_columns}")
+        longest = max(self.ship_lengths)
+        if longest > board_rows and longest > board_columns:
+            raise ValueError(f"{self.name} fleet has a ship of length {longest} which does not fit on a {board_rows}x{board_columns} board")
+        if sum(self.ship_lengths) > board_rows * board_columns:
+            raise ValueError(f"{self.name} fleet covers {sum(self.ship_lengths)} cells, more than a {board_rows}x{board_columns} board has")
+
+
+# Built in fleet, used if the config file is missing, eg. when packaged into a single exe
+STANDARD_FLEET = FleetTemplate(
+    name="Standard",
+    ships=(
+        ShipTemplate("Frigate", "F", 2),
+        ShipTemplate("Destroyer", "D", 3),
+        ShipTemplate("Battleship", "B", 4),
+        ShipTemplate("Carrier", "C", 5),
+    ),
+    rules=BoardRules(min_rows=5, min_columns=5),
+)
+
+
+def _parse_fleet(entry: dict) -> FleetTemplate:
+    """
+    Convert one fleet entry from the config file into a template. Ships with a count are repeated.
+    """
+    ships = []
+    for ship in entry["ships"]:
+        length = int(ship["length"])
+        tile = str(ship["tile"])
+        if length < 1:
+            raise ValueError(f"Ship {ship['name']} in fleet {entry['name']} must have a length of at least 1")
+        if len(tile) != 1:
+            raise ValueError(f"Ship {ship['name']} in fleet {entry['name']} must have a single character tile")
+        ships.extend([ShipTemplate(str(ship["name"]), tile, length)] * int(ship.get("count", 1)))
+    if not ships:
+        raise ValueError(f"Fleet {entry['name']} has no ships")
+    return FleetTemplate(name=str(entry["name"]), ships=tuple(ships), rules=BoardRules(**entry.get("rules", {})))
+
+
+@lru_cache(maxsize=None)
+def load_fleets(path: str = FLEET_CONFIG_PATH) -> Mapping[str, FleetTemplate]:
+    """
+    Load and validate all fleet templates from a JSON config file. The file is only read once per path,
+    and the result is read only since every caller shares it.
+
+    Args:
+        path (str): Path to the config file.
+
+    Returns:
+        Mapping[str, FleetTemplate]: Fleet templates by name, always includes the Standard fleet.
+    """
+    fleets = {STANDARD_FLEET.name: STANDARD_FLEET}
+    if not os.path.exists(path):
+        return MappingProxyType(fleets)
+    with open(path) as file:
+        config = json.load(file)
+    for entry in config.get("fleets", []):
+        template = _parse_fleet(entry)
+        fleets[template.name] = template
+    return MappingProxyType(fleets)
+
+
+def get_fleet(name: str = DEFAULT_FLEET, path: str = FLEET_CONFIG_PATH) -> FleetTemplate:
+    """
+    Get a single fleet template by name.
+
+    Args:
+        name (str): Name of the fleet.
+        path (str): Path to the config file.
+
+    Returns:
+        FleetTemplate: The fleet template.
+
+    Raises:
+        KeyError: If there is no fleet with that name.
+    """
+    fleets = load_fleets(path)
+    if name not in fleets:
+        raise KeyError(f"No fleet named {name}, available fleets: {', '.join(fleets)}")
+    return fleets[name]
+
+
+if __name__ == "__main__":
+    for template in load_fleets().values():
+        print(f"{template.name}: {len(template.ships)} ships, lengths {template.ship_lengths}, rules {template.rules}")
+    standard = get_fleet()
+    standard.validate(10, 10)
+    print(standard.create_ships())
@@ -0,0 +1,459 @@
+""" Sample whole fleet configurations consistent with the shots so far
+
+    Hunting around a hit one ship at a time goes wrong when ships touch: a row of hits can belong to two ships, and
+    a miss next to one ship says nothing about the ship beside it. This samples whole configurations of the remaining
+    ships, every one equally likely, and counts how often each unshot cell is covered. A configuration is consistent
+    if no ship covers a miss or a sunk ship, ships don't overlap, every unresolved hit is covered, and no ship is
+    entirely hit (it would have sunk).
+
+    Rejection sampling draws each ship uniformly from the positions it could be in on its own and throws away the
+    configurations that overlap or leave a hit uncovered, so its samples are exact and independent. When the hits make
+    that too wasteful, the rest of the samples come from Markov chains started at consistent configurations. Most
+    steps move one ship to a random position that keeps the configuration consistent, the rest move two ships at once
+    and keep the move if the configuration is still consistent, so ships can swap which hits they cover. Both kinds
+    of step leave the uniform distribution unchanged, so the chains converge to it. Several chains are run so the
+    Gelman-Rubin R-hat of the cell probabilities shows whether they have mixed. Chains that haven't are run for as
+    many samples again, until they have or MCMC_EXTEND_SECONDS runs out, so their work isn't thrown away.
+
+    Some players put their ships against each other. Sinking one ship of a cluster exactly leaves the ship beside it to
+    be found by search, which rates cells boxed in by sunk ships low, so uniform sampling does worse on those fleets
+    than hunting around hits. touch_weight measures how much more often the sunk ships touch each other than randomly
+    placed ships would, and sample can weight each configuration by that for every ship touching another ship or a
+    sunk one. The bot also samples its search shots once the weight is over TOUCH_SEARCH_WEIGHT.
+
+    Cells are bits of an int, bit row * columns + column, as in endgameSolver.
+
+    Run this file to compare it with the checkboard pattern and density targeting on random fleets and on fleets
+    where every ship touches another, eg.
+        python fleetSampler.py --games 100 --samples 1000
+
+    Classes:
+        SampleResult:
+            Cell probabilities from one round of sampling, with convergence diagnostics.
+
+        FleetSampler:
+            Sample consistent fleet configurations and estimate where the ships are.
+"""
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+from time import perf_counter
+import math
+import random
+import gameFunctions
+from endgameSolver import read_board, segment_masks
+
+DEFAULT_SAMPLES: int = 500 # Configurations sampled per shot
+REJECTION_ATTEMPTS: int = 10 # Rejection sampling attempts per sample wanted before falling back to MCMC
+MCMC_CHAINS: int = 4
+MCMC_BURN_IN: int = 50 # Steps per ship before a chain's first sample
+MCMC_PAIR_MOVES: float = 0.3 # Chance a step moves two ships at once, so ships can swap which hits they cover
+START_SEARCH_LIMIT: int = 100000 # Placements tried looking for a chain's starting configuration
+R_HAT_LIMIT: float = 1.1 # Chains with an R-hat above this haven't mixed
+MCMC_EXTEND_SECONDS: float = 0.5 # Time per call spent extending chains that haven't mixed
+TOUCH_SEARCH_WEIGHT: float = 1.3 # Touch weight past which the sunk ships are taken as clustered and search shots are sampled too
+SAMPLER_MAX_CELLS: int = 10000 # Configurations are whole board bitmasks, too slow on larger boards
+
+
+class SampleResult(NamedTuple):
+    """
+    Cell probabilities from one round of sampling, with convergence diagnostics.
+
+    Attributes:
+        probabilities (Dict[Tuple[int, int], float]): Chance each unshot cell has a ship, only cells some sample covered.
+        samples (int): Configurations sampled.
+        mcmc_samples (int): How many of them came from the Markov chains.
+        acceptance_rate (float): Fraction of rejection sampling attempts that were consistent.
+        mcmc_acceptance_rate (float): Fraction of the chains' two ship moves kept, 0 if no chains were run.
+        r_hat (float): Largest Gelman-Rubin R-hat of any cell's probability over the chains, 1 when every sample is independent.
+            Above R_HAT_LIMIT the chains haven't mixed and the probabilities can't be trusted.
+        standard_error (float): Largest standard error of any cell's probability, treating the samples as independent.
+    """
+    probabilities: Dict[Tuple[int, int], float]
+    samples: int
+    mcmc_samples: int
+    acceptance_rate: float
+    mcmc_acceptance_rate: float
+    r_hat: float
+    standard_error: float
+
+
+class FleetSampler:
+    """
+    Sample whole fleet configurations consistent with a board and estimate where the remaining ships are.
+    Holds no game state, so one sampler can be shared by every game on a board size.
+
+    Attributes:
+        rows (int): Number of rows on the board.
+        columns (int): Number of columns on the board.
+        samples (int): Configurations sampled per call to sample.
+        chains (int): Markov chains run when rejection sampling falls short.
+        extend_seconds (float): Time per call spent extending chains that haven't mixed, 0 to never extend them.
+    """
+
+    def __init__(self, rows: int, columns: int, samples: int = DEFAULT_SAMPLES, chains: int = MCMC_CHAINS,
+                 extend_seconds: float = MCMC_EXTEND_SECONDS):
+        self.rows: int = rows
+        self.columns: int = columns
+        self.samples: int = samples
+        self.chains: int = chains
+        self.extend_seconds: float = extend_seconds
+        self.every_cell: int = (1 << (rows * columns)) - 1
+        self.first_column: int = sum(1 << (row * columns) for row in range(rows))
+        self.last_column: int = self.first_column << (columns - 1)
+        # Totals over every call to sample, for stats
+        self.calls: int = 0
+        self.mcmc_calls: int = 0
+        self.total_samples: int = 0
+        self.extended_calls: int = 0
+        self.unmixed_calls: int = 0
+
+    def sample(self, board: List[List[dict]], lengths: Sequence[int], rng: random.Random, touch_weight: float = 1.0) -> SampleResult:
+        """
+        Sample configurations of the remaining ships consistent with the board and count how often each unshot cell is covered.
+
+        Args:
+            board (List[List[dict]]): The game board being shot at.
+            lengths (Sequence[int]): Lengths of the ships still afloat.
+            rng (random.Random): Random number generator of the game.
+            touch_weight (float): A configuration's weight is multiplied by this for each ship touching another ship or a sunk one, 1 for every configuration equally likely.
+
+        Returns:
+            SampleResult: Cell probabilities and diagnostics, or None if no configuration fits the board.
+        """
+        started = perf_counter()
+        shots, blocked, hits = read_board(board)
+        sunk = self._sunk(board) if touch_weight != 1.0 else 0
+        # Positions each ship could be in on its own, a position that is all hits would already have sunk
+        options = [[mask for mask in segment_masks(self.rows, self.columns, length) if not mask & blocked and mask & ~shots]
+                   for length in lengths]
+        if not all(options):
+            return None
+        counts = [0] * (self.rows * self.columns)
+
+        # Rejection sampling, exact and independent
+        accepted = attempts = 0
+        weight_total = weight_squares = 0.0
+        starts = [] # Consistent configurations found, the chains start from these
+        while accepted < self.samples and attempts < self.samples * REJECTION_ATTEMPTS:
+            attempts += 1
+            ships = [rng.choice(positions) for positions in options]
+            covered = self._consistent(ships, hits)
+            if covered is None:
+                continue
+            accepted += 1
+            weight = self._weight(ships, covered | sunk, touch_weight)
+            weight_total += weight
+            weight_squares += weight * weight
+            self._count(counts, covered & ~shots, weight)
+            if len(starts) < self.chains:
+                starts.append(ships)
+
+        # Markov chains for the rest, when the hits make rejection sampling too wasteful
+        chain_counts = []
+        chain_weights = []
+        chain_ships = []
+        moves = kept = per_chain = 0
+        extended = False
+        missing = self.samples - accepted
+        if missing > 0:
+            while len(starts) < self.chains:
+                start = self._find_start(options, hits, rng)
+                if start is None:
+                    break
+                starts.append(start)
+            if not starts:
+                return None
+            per_chain = -(-missing // len(starts))
+            for start in starts:
+                chain_ships.append(list(start))
+                chain_counts.append([0] * len(counts))
+                chain_weights.append(0.0)
+            run = per_chain
+            while True:
+                for index, ships in enumerate(chain_ships):
+                    # Carries on from where the chain stopped, so only the first run needs burning in
+                    chain_moves, chain_kept, chain_weight, chain_squares = self._run_chain(
+                        ships, options, hits, shots, run, chain_counts[index], rng, sunk, touch_weight, burn_in=not extended)
+                    moves += chain_moves
+                    kept += chain_kept
+                    chain_weights[index] += chain_weight
+                    weight_total += chain_weight
+                    weight_squares += chain_squares
+                if (len(chain_counts) < 2 or perf_counter() - started >= self.extend_seconds
+                        or self._r_hat(chain_counts, chain_weights, per_chain) <= R_HAT_LIMIT):
+                    break
+                # Not mixed yet, run every chain for as many samples again
+                extended = True
+                run = per_chain
+                per_chain += run
+            for chain in chain_counts:
+                for cell, count in enumerate(chain):
+                    counts[cell] += count
+
+        total = accepted + per_chain * len(chain_counts)
+        if total == 0 or weight_total == 0:
+            return None
+        # Clamped since the counts and weight totals of extended chains are summed in different orders
+        probabilities = {divmod(cell, self.columns): min(count / weight_total, 1.0) for cell, count in enumerate(counts) if count}
+        effective = weight_total * weight_total / weight_squares # Effective sample size of the weighted samples, total when unweighted
+        standard_error = max((math.sqrt(p * (1 - p) / effective) for p in probabilities.values()), default=0.0)
+        r_hat = self._r_hat(chain_counts, chain_weights, per_chain) if len(chain_counts) > 1 else 1.0
+
+        self.calls += 1
+        self.total_samples += total
+        if chain_counts:
+            self.mcmc_calls += 1
+        if extended:
+            self.extended_calls += 1
+        if r_hat > R_HAT_LIMIT:
+            self.unmixed_calls += 1
+        return SampleResult(probabilities, total, total - accepted, accepted / attempts if attempts else 0.0,
+                            kept / moves if moves else 0.0, r_hat, standard_error)
+
+    def touch_weight(self, sunk_ships: Sequence[Sequence[Tuple[int, int]]]) -> float:
+        """
+        How many times more often pairs of sunk ships touch than randomly placed ships would, at least 1. Two random
+        ships of lengths a and b touch with a chance of about 2 (a + b) / cells. One touching pair is added to both
+        counts, so a single touch is weak evidence.
+
+        Args:
+            sunk_ships (Sequence[Sequence[Tuple[int, int]]]): Cells of each sunk ship.
+
+        Returns:
+            float: Weight to pass to sample.
+        """
+        if len(sunk_ships) < 2:
+            return 1.0
+        masks = [sum(1 << (row * self.columns + column) for row, column in cells) for cells in sunk_ships]
+        cells = self.rows * self.columns
+        touching = expected = 0.0
+        for first in range(len(masks)):
+            around = self._around(masks[first])
+            for second in range(first):
+                touching += bool(around & masks[second])
+                expected += min(2 * (len(sunk_ships[first]) + len(sunk_ships[second])) / cells, 1.0)
+        return max((touching + 1) / (expected + 1), 1.0)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Shots sampled for, mean samples per shot, and the fractions of shots that needed the Markov chains, whose
+        chains were extended, and whose chains still hadn't mixed when the time ran out.
+        """
+        calls = max(self.calls, 1)
+        return {"calls": self.calls, "mean_samples": self.total_samples / calls, "mcmc_rate": self.mcmc_calls / calls,
+                "extended_rate": self.extended_calls / calls, "unmixed_rate": self.unmixed_calls / calls}
+
+    def _consistent(self, ships: List[int], hits: int) -> int:
+        # Every cell the configuration covers, or None if ships overlap or a hit is left uncovered
+        covered = 0
+        for ship in ships:
+            if ship & covered:
+                return None
+            covered |= ship
+        if hits & ~covered:
+            return None
+        return covered
+
+    @staticmethod
+    def _count(counts: List[float], cells: int, weight: float = 1) -> None:
+        while cells:
+            cell = cells & -cells
+            counts[cell.bit_length() - 1] += weight
+            cells ^= cell
+
+    def _sunk(self, board: List[List[dict]]) -> int:
+        # Cells of the sunk ships
+        sunk = 0
+        bit = 1
+        for row in board:
+            for cell in row:
+                if cell["is_shot"] and cell["is_occupied"] and cell["ship"].is_sunk:
+                    sunk |= bit
+                bit <<= 1
+        return sunk
+
+    def _around(self, cells: int) -> int:
+        # Cells next to any of the cells, up, down, left or right
+        columns = self.columns
+        return (((cells & ~self.last_column) << 1) | ((cells & ~self.first_column) >> 1) | (cells << columns) | (cells >> columns)) & self.every_cell
+
+    def _weight(self, ships: List[int], occupied: int, touch_weight: float) -> float:
+        # Weight of a configuration, touch_weight for each ship touching another ship or a sunk one
+        if touch_weight == 1.0:
+            return 1.0
+        touching = sum(1 for ship in ships if self._around(ship) & (occupied ^ ship))
+        return touch_weight ** touching
+
+    def _find_start(self, options: List[List[int]], hits: int, rng: random.Random) -> List[int]:
+        """
+        A random consistent configuration found by backtracking, for when rejection sampling found none.
+        Covers the lowest uncovered hit first, since some ship has to, then places the rest anywhere free.
+
+        Returns:
+            List[int]: Position of each ship in the order of options, or None if none was found within START_SEARCH_LIMIT tries.
+        """
+        ships = [0] * len(options)
+        tries = 0
+
+        def place(unplaced: List[int], covered: int) -> bool:
+            nonlocal tries
+            if not unplaced:
+                return True
+            uncovered = hits & ~covered
+            target = uncovered & -uncovered
+            order = list(unplaced)
+            rng.shuffle(order)
+            for index in order:
+                positions = [mask for mask in options[index] if not mask & covered and (not target or mask & target)]
+                rng.shuffle(positions)
+                rest = [other for other in unplaced if other != index]
+                for mask in positions:
+                    tries += 1
+                    if tries > START_SEARCH_LIMIT:
+                        return False
+                    ships[index] = mask
+                    if place(rest, covered | mask):
+                        return True
+                if not target:
+                    return False # With no hit to cover any ship can go next, so trying the others only reorders the same search
+            return False
+
+        if not place(list(range(len(options))), 0) or hits & ~self._cover(ships):
+            return None
+        return ships
+
+    @staticmethod
+    def _cover(ships: List[int]) -> int:
+        covered = 0
+        for ship in ships:
+            covered |= ship
+        return covered
+
+    @staticmethod
+    def _positions(options: List[int], others: int, hits: int) -> List[int]:
+        # Positions of a ship that keep a configuration consistent, given every other ship
+        needed = hits & ~others
+        return [mask for mask in options if not mask & others and not needed & ~mask]
+
+    def _run_chain(self, ships: List[int], options: List[List[int]], hits: int, shots: int, samples: int,
+                   counts: List[float], rng: random.Random, sunk: int = 0, touch_weight: float = 1.0,
+                   burn_in: bool = True) -> Tuple[int, int, float, float]:
+        """
+        Run a chain from a consistent configuration, adding the unshot cells of each sample to counts. Each step either
+        moves one ship to a random position that keeps the configuration consistent (a Gibbs step, always kept), or
+        moves two ships at once (a Metropolis-Hastings step, so ships can swap which hits they cover).
+        Samples are taken once every ship has had a chance to move since the last one. The chain samples every
+        consistent configuration equally, samples are weighted by touch_weight afterwards.
+        The ships are moved in place, so calling again with burn_in False carries the chain on from where it stopped.
+
+        Returns:
+            Tuple[int, int, float, float]: Two ship moves proposed and kept, and the total and total square of the samples' weights.
+        """
+        ship_count = len(ships)
+        moves = kept = 0
+        weight_total = weight_squares = 0.0
+        burn_in_steps = MCMC_BURN_IN * ship_count if burn_in else 0
+        for step in range(burn_in_steps + samples * ship_count):
+            first = rng.randrange(ship_count)
+            if ship_count > 1 and rng.random() < MCMC_PAIR_MOVES:
+                second = rng.randrange(ship_count - 1)
+                second += second >= first
+                others = 0
+                for index, ship in enumerate(ships):
+                    if index != first and index != second:
+                        others |= ship
+                # The first ship goes anywhere clear of the others, the second anywhere that then keeps the configuration
+                # consistent. Accepting with the ratio of the second ship's choices makes the move reversible.
+                moves += 1
+                first_ship = rng.choice([mask for mask in options[first] if not mask & others])
+                proposed = self._positions(options[second], others | first_ship, hits)
+                if rng.random() * len(self._positions(options[second], others | ships[first], hits)) < len(proposed):
+                    ships[first], ships[second] = first_ship, rng.choice(proposed)
+                    kept += 1
+            else:
+                others = 0
+                for index, ship in enumerate(ships):
+                    if index != first:
+                        others |= ship
+                ships[first] = rng.choice(self._positions(options[first], others, hits))
+            if step >= burn_in_steps and (step + 1) % ship_count == 0:
+                covered = self._cover(ships)
+                weight = self._weight(ships, covered | sunk, touch_weight)
+                weight_total += weight
+                weight_squares += weight * weight
+                self._count(counts, covered & ~shots, weight)
+        return moves, kept, weight_total, weight_squares
+
+    @staticmethod
+    def _r_hat(chain_counts: List[List[float]], chain_weights: List[float], samples: int) -> float:
+        # Gelman-Rubin R-hat of each cell's covered indicator, the largest over the cells
+        if samples < 2 or not all(chain_weights):
+            return 1.0
+        chains = len(chain_counts)
+        worst = 1.0
+        for cell_counts in zip(*chain_counts):
+            means = [min(count / weight, 1.0) for count, weight in zip(cell_counts, chain_weights)]
+            within = sum(mean * (1 - mean) for mean in means) / chains * samples / (samples - 1)
+            overall = sum(means) / chains
+            between = samples * sum((mean - overall) ** 2 for mean in means) / (chains - 1)
+            if within == 0:
+                if between > 0:
+                    return math.inf # Every chain is stuck on a different answer
+                continue
+            pooled = (samples - 1) / samples * within + between / samples
+            worst = max(worst, math.sqrt(pooled / within))
+        return worst
+
+
+if __name__ == "__main__":
+    import argparse
+    import densityTargeting
+    from gameBoard import gameBoard
+    from gameContext import GameContext
+    from ship import Ship
+    parser = argparse.ArgumentParser(description="Compare targeting on random fleets and fleets where every ship touches another")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="Configurations sampled per shot")
+    args = parser.parse_args()
+
+    def place_touching(context: GameContext, board: gameBoard) -> List[Ship]:
+        # Simulated cluster: every ship after the first is placed touching one already on the board
+        ships = context.fleet_template.create_ships()
+        placed = set()
+        for ship in ships:
+            while True:
+                ship.random_place(board.board, context.rows, context.columns, rng=context.rng)
+                if not placed or any((row + row_step, column + column_step) in placed for row, column in ship.occupied_cells
+                                     for row_step, column_step in ((1, 0), (-1, 0), (0, 1), (0, -1))):
+                    break
+                ship.clear_ship(board.board)
+            placed.update(ship.occupied_cells)
+        return ships
+
+    density = densityTargeting.DensityTargeter(args.rows, args.columns)
+    sampler = FleetSampler(args.rows, args.columns, args.samples)
+    with density:
+        for layout_name, touching in (("Random", False), ("Touching", True)):
+            for name in ("Checkboard", "Density", "Density and sampler"):
+                turns = []
+                hunting = 0 # Shots taken while a ship was hit but not sunk, the part the sampler changes
+                time_start = perf_counter()
+                for seed in range(args.games):
+                    context = GameContext(args.rows, args.columns, seed=seed)
+                    board = context.create_board()
+                    ships = place_touching(context, board) if touching else context.create_fleet(board)
+                    density.clear()
+                    bot = context.create_bot(density=density if name != "Checkboard" else None, sampler=sampler if name == "Density and sampler" else None)
+                    count = 0
+                    while not all(ship.is_sunk for ship in ships):
+                        count += 1
+                        hunting += bot.hunt_mode_active
+                        bot.bot_turn(board.board)
+                    turns.append(count)
+                turns.sort()
+                print(f"{layout_name} fleets, {name}: average {sum(turns) / len(turns):.2f} shots ({hunting / len(turns):.2f} hunting),"
+                      f" 95th percentile {gameFunctions.percentile(turns, 0.95)} over {len(turns)} games in {perf_counter() - time_start:.2f}s")
+    sampler_stats = sampler.stats()
+    print(f"Sampler: {sampler_stats['mean_samples']:.0f} samples per shot, {sampler_stats['mcmc_rate']:.1%} of shots used MCMC,"
+          f" {sampler_stats['extended_rate']:.1%} extended its chains, {sampler_stats['unmixed_rate']:.1%} had R-hat over {R_HAT_LIMIT}")
@@ -6,19 +6,55 @@
         
         display_board(board: List[List[dict]], own_board:bool) -> None:
             Display the game board in a readable format.    
+
+        display(own_board: bool, centre: Tuple[int, int]) -> None:
+            Display the whole board if it fits the terminal, otherwise an overview map and a viewport.
+
+        record_changes(board: List[List[dict]], cells: Iterable[Tuple[int, int]]) -> None:
+            Tell the overview map that cells were shot, or had a ship placed or cleared.
 """
 
-from typing import List
+from typing import Dict, Iterable, List, Tuple
+from types import MappingProxyType
+import shutil
 import ANSI
 import gameFunctions
 
 # Define the initial state of a cell in the game board
-cell_state: dict = {
+# Read only so boards in different threads can't change each other's template, use cell_state.copy() to get a cell
+cell_state: MappingProxyType = MappingProxyType({
     "tile": "~", # Default tile representation, changed to ship tile when a ship is placed
     "is_occupied": False, # Flag to indicate if the cell is occupied by a ship
     "is_shot": False, # Flag to indicate if the cell has been shot at
     "ship": None # Placeholder for ship object
-    }
+    })
+
+class BoardGrid(list):
+    """
+    The rows of a gameBoard. Once the overview map has been drawn, cells that are shot or have a ship placed or
+    cleared are listed in changed, so the map's block counts are updated from them instead of scanning every cell.
+
+    Attributes:
+        changed (list): Row and column of each cell changed since the overview was last drawn, None before it is first drawn.
+    """
+    __slots__ = ("changed",)
+
+    def __init__(self, rows: Iterable[List[dict]] = ()):
+        super().__init__(rows)
+        self.changed: list = None
+
+def record_changes(board: List[List[dict]], cells: Iterable[Tuple[int, int]]) -> None:
+    """
+    Tell the overview map that cells were shot, or had a ship placed or cleared. Call after changing is_shot or
+    is_occupied. Does nothing for boards that aren't a BoardGrid or haven't drawn an overview.
+
+    Args:
+        board (List[List[dict]]): Cells of the board that changed.
+        cells (Iterable[Tuple[int, int]]): Row and column of each changed cell.
+    """
+    changed = getattr(board, "changed", None)
+    if changed is not None:
+        changed.extend(cells)
 
 class gameBoard:
     """
@@ -39,6 +75,11 @@ class gameBoard:
         self.column_headers:str = None # Pregenerated column headers, eg. 1 2 3 4. Compute this once at board creation then just print the string
         self.top_bottom_border:str = None # Pregenerated top and bottom border of set length
         self.row_headers:list = [] # Pregenerated list of row headers, needs to be list so each row can index it.
+        self.rows:int = row
+        self.columns:int = column
+        self.last_shot:Tuple[int, int] = None # Most recent shot on this board, the viewport is centred on it
+        self.block_totals:list = None # [block_rows, block_columns, counts] of the last overview drawn
+        self.counted:Dict[Tuple[int, int], Tuple[bool, bool]] = {} # (is_shot, is_occupied) of each cell the block counts include
         
         self.board = self.create_board(row, column) # Create the board
 
@@ -56,7 +97,7 @@ class gameBoard:
         """
         # Create a 2D list (board) with the specified number of rows and columns
         # Each cell is initialized with a copy of the cell_state dictionary
-        board = [[cell_state.copy() for _ in range(columns)] for _ in range(rows)]
+        board = BoardGrid([cell_state.copy() for _ in range(columns)] for _ in range(rows))
 
         # Generate row headers
         # Get the letter code for each row
@@ -133,6 +174,178 @@ class gameBoard:
         # Print bottom border
         print(self.top_bottom_border)  
 
+    def display(self, own_board:bool, centre:Tuple[int, int] = None) -> None:
+        """
+        Display the game board, choosing the renderer based on the terminal size.
+        Boards that fit in the terminal are printed in full with display_board, larger boards
+        get a downsampled overview map followed by a viewport around the latest shot.
+
+        Args:
+            own_board (bool): Flag to indicate if the board is the player's own board or the opponent's board.
+            centre (Tuple[int, int]): Cell to centre the viewport on, defaults to the last shot on the board.
+        """
+        terminal_columns, terminal_rows = shutil.get_terminal_size()
+        # Each cell takes two characters, plus the row header and borders
+        if self.columns * 2 + len(self.row_headers[0]) + 2 <= terminal_columns and self.rows + 4 <= terminal_rows:
+            self.display_board(own_board)
+            return
+        # Split the terminal height between the overview and the viewport
+        window_rows = max((terminal_rows - 10) // 2, 3)
+        self.display_overview(own_board, max_rows=window_rows, max_columns=terminal_columns - 8)
+        self.display_viewport(own_board, centre, view_rows=window_rows, view_columns=terminal_columns)
+
+    def display_viewport(self, own_board:bool, centre:Tuple[int, int] = None, view_rows:int = None, view_columns:int = None) -> None:
+        """
+        Display a window of the game board around a cell. Only the cells inside the window are visited,
+        so the cost depends on the window size and not on the board size.
+        Column headers are padded to the widest column number in view so they align past column 9.
+
+        Args:
+            own_board (bool): Flag to indicate if the board is the player's own board or the opponent's board.
+            centre (Tuple[int, int]): Cell to centre the window on, defaults to the last shot on the board or the top left.
+            view_rows (int): Number of board rows to show, defaults to fit the terminal.
+            view_columns (int): Width of the window in characters, defaults to the terminal width.
+        """
+        if centre is None:
+            centre = self.last_shot if self.last_shot is not None else (0, 0)
+        terminal_columns, terminal_rows = shutil.get_terminal_size()
+        if view_rows is None:
+            view_rows = max(terminal_rows - 6, 1)
+        if view_columns is None:
+            view_columns = terminal_columns
+
+        header_width = len(self.row_headers[0])
+        cell_width = len(str(self.columns)) + 1 # Widest column number plus a space
+        view_rows = min(view_rows, self.rows)
+        view_cols = min(max((view_columns - header_width - 2) // cell_width, 1), self.columns)
+
+        # Clamp the window to the board so it stops scrolling at the edges
+        first_row = min(max(centre[0] - view_rows // 2, 0), self.rows - view_rows)
+        first_col = min(max(centre[1] - view_cols // 2, 0), self.columns - view_cols)
+
+        # Print title
+        if own_board:
+            print(ANSI.FG_BRIGHT_GREEN + "Your Board" + ANSI.RESET, end="")
+        else:
+            print(ANSI.FG_BRIGHT_RED + "Opponent's Board" + ANSI.RESET, end="")
+        print(f" - rows {self.row_headers[first_row].split()[0]}-{self.row_headers[first_row + view_rows - 1].split()[0]}, columns {first_col + 1}-{first_col + view_cols}")
+
+        # Column headers and borders are built for the window, each number right aligned to the cell width
+        column_headers = " " * header_width + "".join(str(j + 1).rjust(cell_width - 1) + " " for j in range(first_col, first_col + view_cols))
+        border = " " * (header_width - 2) + "#" * (view_cols * cell_width + 3)
+        padding = " " * (cell_width - 2)
+        lines = [column_headers, border]
+        for i in range(first_row, first_row + view_rows):
+            row = self.board[i]
+            line = [self.row_headers[i]]
+            for j in range(first_col, first_col + view_cols):
+                cell = row[j]
+                tile = cell["tile"] if own_board else "~"
+                if cell["is_shot"]:
+                    colour = ANSI.BG_RED if cell["is_occupied"] else ANSI.BG_WHITE
+                    line.append(padding + colour + tile + ANSI.RESET + " ")
+                else:
+                    line.append(padding + tile + " ")
+            line.append("#")
+            lines.append("".join(line))
+        lines.append(border)
+        print("\n".join(lines)) # One print per frame instead of one per cell
+
+    def block_counts(self, block_rows:int, block_columns:int) -> List[List[Tuple[int, int, int]]]:
+        """
+        Aggregate the board into blocks of cells, counting shots, hits and ship cells in each block.
+        Every cell is only scanned the first time a block size is asked for. After that only the cells listed in
+        board.changed are counted again, so the cost depends on the number of blocks and shots and not on the board size.
+
+        Args:
+            block_rows (int): Number of board rows in each block.
+            block_columns (int): Number of board columns in each block.
+
+        Returns:
+            List[List[Tuple[int, int, int]]]: (shots, hits, occupied) counts for each block, indexed [block row][block column].
+        """
+        changed = getattr(self.board, "changed", None)
+        if changed is None or self.block_totals is None or self.block_totals[:2] != [block_rows, block_columns]: # First overview or the terminal was resized
+            blocks_across = (self.columns + block_columns - 1) // block_columns
+            self.block_totals = [block_rows, block_columns, [[[0, 0, 0] for _ in range(blocks_across)] for _ in range(0, self.rows, block_rows)]]
+            self.counted = {}
+            cells = ((i, j) for i, row in enumerate(self.board) for j, cell in enumerate(row) if cell["is_shot"] or cell["is_occupied"])
+        else:
+            cells = changed
+        for i, j in cells:
+            self.count_cell(i, j)
+        if isinstance(self.board, BoardGrid):
+            self.board.changed = [] # Start listing changes, until now nothing needed them
+        return [[tuple(block) for block in row] for row in self.block_totals[2]]
+
+    def count_cell(self, row: int, column: int) -> None:
+        """
+        Count a cell in its block again, taking out what it was counted as before.
+
+        Args:
+            row (int): Row of the cell.
+            column (int): Column of the cell.
+        """
+        cell = self.board[row][column]
+        state = (cell["is_shot"], cell["is_occupied"])
+        old_shot, old_occupied = self.counted.get((row, column), (False, False))
+        if state == (old_shot, old_occupied):
+            return # Listed again with no change, eg. a salvo shot at the same cell
+        block_rows, block_columns, counts = self.block_totals
+        block = counts[row // block_rows][column // block_columns]
+        block[0] += state[0] - old_shot
+        block[1] += (state[0] and state[1]) - (old_shot and old_occupied)
+        block[2] += state[1] - old_occupied
+        if state == (False, False):
+            del self.counted[(row, column)]
+        else:
+            self.counted[(row, column)] = state
+
+    def display_overview(self, own_board:bool, max_rows:int = None, max_columns:int = None) -> None:
+        """
+        Display a downsampled map of the whole board where each character summarises a block of cells.
+            X (red)     Block contains a hit
+            S           Block contains an unhit ship, only shown on your own board
+            # . :       Fully, mostly or partly shot water
+            ~           Nothing shot in the block
+
+        Args:
+            own_board (bool): Flag to indicate if the board is the player's own board or the opponent's board.
+            max_rows (int): Maximum number of lines in the map, defaults to half the terminal height.
+            max_columns (int): Maximum number of characters per line, defaults to the terminal width.
+        """
+        terminal_columns, terminal_rows = shutil.get_terminal_size()
+        if max_rows is None:
+            max_rows = max(terminal_rows // 2, 1)
+        if max_columns is None:
+            max_columns = terminal_columns - 2
+        # Size blocks so the map fits, rounding up
+        block_rows = max(-(-self.rows // max_rows), 1)
+        block_columns = max(-(-self.columns // max(max_columns, 1)), 1)
+
+        print(ANSI.FG_BRIGHT_CYAN + f"Overview - each character is {block_rows}x{block_columns} cells" + ANSI.RESET)
+        lines = []
+        for block_row, row_counts in enumerate(self.block_counts(block_rows, block_columns)):
+            height = min(block_rows, self.rows - block_row * block_rows)
+            line = []
+            for block_column, (shots, hits, occupied) in enumerate(row_counts):
+                width = min(block_columns, self.columns - block_column * block_columns)
+                water = height * width - occupied
+                if hits:
+                    line.append(ANSI.BG_RED + "X" + ANSI.RESET)
+                elif own_board and occupied:
+                    line.append("S")
+                elif shots == 0:
+                    line.append("~")
+                elif shots >= water:
+                    line.append("#")
+                elif shots * 2 >= water:
+                    line.append(":")
+                else:
+                    line.append(".")
+            lines.append("".join(line))
+        print("\n".join(lines))
+
     def clear_board(self) -> None:
         """
         Clear the game board by resetting all cells to their initial state.
@@ -140,6 +353,7 @@ class gameBoard:
         for row in self.board:
             for cell in row:
                 cell.update(cell_state)
+        self.block_totals = None # Counted again from scratch by the next overview
 
 if __name__ == "__main__":
     # Initialize colorama for cross-platform compatibility
@@ -163,4 +377,14 @@ if __name__ == "__main__":
     opponent_board.board[1][1]["is_shot"] = True 
    
     player_board.display_board(own_board=False)
-    opponent_board.display_board(own_board=True)
\ No newline at end of file
+    opponent_board.display_board(own_board=True)
+
+    # Large board uses the overview map and viewport
+    large_board = gameBoard(1000, 1000)
+    large_board.board[500][500]["is_occupied"] = True
+    large_board.board[500][500]["tile"] = "C"
+    large_board.board[500][500]["is_shot"] = True
+    for i in range(0, 1000, 7):
+        large_board.board[i][i]["is_shot"] = True
+    large_board.last_shot = (500, 500)
+    large_board.display(own_board=True)
\ No newline at end of file
@@ -0,0 +1,355 @@
+""" Compressed checkpoints of games in progress, so interrupted runs can be resumed
+
+    Boards are lists of cell dictionaries holding Ship references, which are slow and bulky to pickle. A checkpoint
+    only keeps what can't be worked out again: the cells shot on each board as a bitmask (or a list of cell indexes
+    on sparse boards), where each ship is and how many hits it has taken, the bot's hunt and search state, and the
+    state of the random number generators. Ship cells, tiles and sunk flags are rebuilt by placing the ships again,
+    and the density targeter and board hash are rebuilt by replaying the shots.
+
+    File format: an 8 byte header (magic, version as little endian) then a zlib compressed payload of length prefixed
+    sections: the run's settings and counters as JSON, the random generator, then for each side of the game its
+    board, fleet and optionally the bot shooting at it, then any named arrays (eg. the scores of every game so far).
+    Checkpoints are written to a temporary file and moved over the old one, so a crash never leaves half a checkpoint.
+
+    Classes:
+        SideState:
+            A board, its fleet and the bot shooting at it, as read from a checkpoint.
+
+    Functions:
+        save_checkpoint(path: str, run: dict, sides: Sequence[Tuple[gameBoard, List[Ship], Bot]], rng: Random, arrays: Dict[str, array]) -> None:
+            Write a checkpoint atomically.
+
+        load_checkpoint(path: str) -> Tuple[dict, object, List[SideState], Dict[str, array]]:
+            Read a checkpoint.
+
+        read_run(path: str) -> dict:
+            The run's settings and counters from a checkpoint, eg. to offer to resume it.
+
+        restore_side(state: SideState, board: gameBoard, ships: List[Ship], bot: Bot) -> None:
+            Put a side back into the state it was saved in.
+"""
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+from array import array
+from collections import deque
+from itertools import repeat
+from operator import add, itemgetter, mul
+import json
+import os
+import random
+import struct
+import sys
+import zlib
+import gameFunctions
+import layoutCorpus
+import stateCache
+from bot import Bot
+from gameBoard import gameBoard
+from ship import Ship
+
+CHECKPOINT_DIR: str = gameFunctions.data_dir("checkpoints")
+SOLO_CHECKPOINT: str = os.path.join(CHECKPOINT_DIR, "computer_solo.checkpoint")
+PLAYER_CHECKPOINT: str = os.path.join(CHECKPOINT_DIR, "player_vs_computer.checkpoint")
+CHECKPOINT_MAGIC: bytes = b"BSCK"
+CHECKPOINT_VERSION: int = 1
+HEADER = struct.Struct("<4sI") # Magic, version
+COMPRESSION_LEVEL: int = 1 # Fastest, the payload is mostly bitmasks and small integers which compress well anyway
+DEFAULT_CHECKPOINT_EVERY: float = 5.0 # Seconds between checkpoints of a long run
+MAX_OVERHEAD: float = 0.01 # Fraction of a run's time checkpoints can take, checkpoints of huge boards are spaced out to keep under it
+
+
+class SideState(NamedTuple):
+    """
+    A board, its fleet and the bot shooting at it, as read from a checkpoint.
+
+    Attributes:
+        shots (List[int]): Flat index of every cell shot, row * columns + column, in increasing order.
+        last_shot (Tuple[int, int]): Most recent shot on the board, or None.
+        layout (Layout): Bow row, bow column and direction of each ship, in fleet order.
+        hits (List[int]): Hits taken by each ship, in fleet order.
+        bot (dict): The bot's hunt and search state, or None if no bot was saved with this side.
+    """
+    shots: List[int]
+    last_shot: Tuple[int, int]
+    layout: layoutCorpus.Layout
+    hits: List[int]
+    bot: dict
+
+
+class _Writer:
+    # Little endian, length prefixed fields
+    def __init__(self):
+        self.parts: List[bytes] = []
+
+    def uint(self, value: int) -> None:
+        self.parts.append(struct.pack("<Q", value))
+
+    def cell(self, cell: Tuple[int, int]) -> None:
+        self.parts.append(struct.pack("<qq", *(cell if cell is not None else (-1, -1))))
+
+    def blob(self, data: bytes) -> None:
+        self.uint(len(data))
+        self.parts.append(data)
+
+    def text(self, value: str) -> None:
+        self.blob(value.encode())
+
+    def values(self, values: array) -> None:
+        data = array(values.typecode, values)
+        if sys.byteorder == "big":
+            data.byteswap() # Files are always little endian
+        self.text(data.typecode)
+        self.blob(data.tobytes())
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.parts)
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.position = 0
+
+    def uint(self) -> int:
+        value, = struct.unpack_from("<Q", self.data, self.position)
+        self.position += 8
+        return value
+
+    def cell(self) -> Tuple[int, int]:
+        row, column = struct.unpack_from("<qq", self.data, self.position)
+        self.position += 16
+        return None if row < 0 else (row, column)
+
+    def blob(self) -> bytes:
+        length = self.uint()
+        data = bytes(self.data[self.position:self.position + length])
+        self.position += length
+        return data
+
+    def text(self) -> str:
+        return self.blob().decode()
+
+    def values(self) -> array:
+        data = array(self.text())
+        data.frombytes(self.blob())
+        if sys.byteorder == "big":
+            data.byteswap()
+        return data
+
+
+def _index_type(rows: int, columns: int) -> str:
+    # Array typecode that fits every flat index of a board
+    return "I" if rows * columns <= 2 ** 32 else "Q"
+
+
+def _flat_indexes(cells: Sequence[Tuple[int, int]], rows: int, columns: int) -> array:
+    # row * columns + column of each cell, in order, with C level maps as the bot's pattern can be millions of cells
+    cell_rows = map(itemgetter(0), cells)
+    cell_columns = map(itemgetter(1), cells)
+    return array(_index_type(rows, columns), map(add, map(mul, cell_rows, repeat(columns)), cell_columns))
+
+
+def _write_shots(writer: _Writer, board: gameBoard) -> None:
+    # Dense boards as a bitmask, sparse ones as the list of cells shot
+    grid = board.board
+    if hasattr(grid, "shot"):
+        writer.uint(1)
+        writer.values(array(_index_type(board.rows, board.columns), sorted(grid.shot)))
+    else:
+        writer.uint(0)
+        # One 0 or 1 byte per cell, turned into a bitmask with C level string operations, bit index is the flat index
+        is_shot = itemgetter("is_shot")
+        flags = b"".join(bytes(map(is_shot, row)) for row in grid)
+        mask = int(flags.translate(bytes.maketrans(b"\x00\x01", b"01"))[::-1], 2) if flags else 0
+        writer.blob(mask.to_bytes((len(flags) + 7) // 8, "little"))
+
+
+def _read_shots(reader: _Reader) -> List[int]:
+    if reader.uint() == 1:
+        return list(reader.values())
+    bits = format(int.from_bytes(reader.blob(), "little"), "b")[::-1] # Character i is bit i
+    shots = []
+    index = bits.find("1")
+    while index >= 0:
+        shots.append(index)
+        index = bits.find("1", index + 1)
+    return shots
+
+
+def _write_bot(writer: _Writer, bot: Bot) -> None:
+    state = {
+        "remaining_lengths": bot.remaining_lengths,
+        "checkboard_spacing": bot.checkboard_spacing,
+        "checkboard_offset": bot.checkboard_offset,
+        "pattern_listed": bot.checkboard_pattern is not None,
+        "hunt_mode_active": bot.hunt_mode_active,
+        "last_shot_hit": bot.last_shot_hit,
+    }
+    writer.text(json.dumps(state))
+    writer.cell(bot.last_shot)
+    writer.values(_flat_indexes(bot.checkboard_pattern or (), bot.rows, bot.columns)) # Order matters, it is popped from the end
+    writer.values(_flat_indexes(sorted(bot.unresolved_hits), bot.rows, bot.columns))
+    writer.values(_flat_indexes(bot.target_queue, bot.rows, bot.columns))
+    _write_rng(writer, bot.rng)
+
+
+def _read_bot(reader: _Reader) -> dict:
+    state = json.loads(reader.text())
+    state["last_shot"] = reader.cell()
+    state["checkboard_pattern"] = reader.values()
+    state["unresolved_hits"] = reader.values()
+    state["target_queue"] = reader.values()
+    state["rng"] = _read_rng(reader)
+    return state
+
+
+def _write_rng(writer: _Writer, rng: random.Random) -> None:
+    version, internal, gauss_next = rng.getstate()
+    writer.text(json.dumps([version, gauss_next]))
+    writer.values(array("Q", internal))
+
+
+def _read_rng(reader: _Reader) -> object:
+    version, gauss_next = json.loads(reader.text())
+    return version, tuple(reader.values()), gauss_next
+
+
+def save_checkpoint(path: str, run: dict, sides: Sequence[Tuple[gameBoard, List[Ship], Bot]], rng: random.Random = None,
+                    arrays: Dict[str, array] = None) -> None:
+    """
+    Write a checkpoint, replacing any existing one in a single step. Only call it between turns, when the boards,
+    fleets and bots agree with each other.
+
+    Args:
+        path (str): Checkpoint file.
+        run (dict): The run's settings and counters, anything JSON can store.
+        sides (Sequence[Tuple[gameBoard, List[Ship], Bot]]): Each board, the fleet on it and the bot shooting at it, or None if a player is.
+        rng (random.Random): The game's random number generator if it isn't a bot's, None for none.
+        arrays (Dict[str, array]): Larger lists of numbers to keep, eg. the score of every game so far.
+    """
+    writer = _Writer()
+    writer.text(json.dumps(run))
+    writer.uint(rng is not None)
+    if rng is not None:
+        _write_rng(writer, rng)
+    writer.uint(len(sides))
+    for board, ships, bot in sides:
+        writer.uint(board.rows)
+        writer.uint(board.columns)
+        _write_shots(writer, board)
+        writer.cell(board.last_shot)
+        directions = {direction: index for index, direction in enumerate(layoutCorpus.DIRECTIONS)}
+        writer.values(array("Q", (value for ship in ships for value in (ship.bow_coord[0], ship.bow_coord[1], directions[ship.direction], ship.hits))))
+        writer.uint(bot is not None)
+        if bot is not None:
+            _write_bot(writer, bot)
+    arrays = arrays or {}
+    writer.uint(len(arrays))
+    for name, values in arrays.items():
+        writer.text(name)
+        writer.values(values)
+
+    with gameFunctions.atomic_write(path, sync=True) as file: # On disk before it replaces the old checkpoint, so a crash leaves one or the other
+        file.write(HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION))
+        file.write(zlib.compress(writer.getvalue(), COMPRESSION_LEVEL))
+
+
+def load_checkpoint(path: str) -> Tuple[dict, object, List[SideState], Dict[str, array]]:
+    """
+    Read a checkpoint written by save_checkpoint.
+
+    Returns:
+        Tuple[dict, object, List[SideState], Dict[str, array]]: The run's settings and counters, the state of the game's
+            random number generator for random.Random.setstate (None if none was saved), each side, and the named arrays.
+
+    Raises:
+        ValueError: If the file isn't a checkpoint or is damaged.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a checkpoint")
+    magic, version = HEADER.unpack_from(data)
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} is not a version {CHECKPOINT_VERSION} checkpoint")
+    try:
+        reader = _Reader(zlib.decompress(data[HEADER.size:]))
+        run = json.loads(reader.text())
+        rng_state = _read_rng(reader) if reader.uint() else None
+        sides = []
+        for _ in range(reader.uint()):
+            reader.uint() # Rows and columns, the board is recreated from the run's settings
+            reader.uint()
+            shots = _read_shots(reader)
+            last_shot = reader.cell()
+            ship_values = reader.values()
+            layout = tuple((ship_values[i], ship_values[i + 1], layoutCorpus.DIRECTIONS[ship_values[i + 2]]) for i in range(0, len(ship_values), 4))
+            hits = list(ship_values[3::4])
+            bot = _read_bot(reader) if reader.uint() else None
+            sides.append(SideState(shots, last_shot, layout, hits, bot))
+        arrays = {}
+        for _ in range(reader.uint()):
+            name = reader.text()
+            arrays[name] = reader.values()
+    except (zlib.error, struct.error, ValueError, IndexError) as e:
+        raise ValueError(f"{path} is damaged: {e}") from e
+    return run, rng_state, sides, arrays
+
+
+def read_run(path: str) -> dict:
+    """
+    The run's settings and counters from a checkpoint, eg. to offer to resume it. None if there is no readable checkpoint.
+    """
+    try:
+        return load_checkpoint(path)[0]
+    except (OSError, ValueError):
+        return None
+
+
+def restore_side(state: SideState, board: gameBoard, ships: List[Ship], bot: Bot = None) -> None:
+    """
+    Put a side back into the state it was saved in. The board must be empty and the ships already placed on it
+    as in state.layout, eg. with GameContext.create_fleet(board, state.layout).
+
+    Args:
+        state (SideState): The side as read from the checkpoint.
+        board (gameBoard): The side's board, with its fleet placed.
+        ships (List[Ship]): The fleet on the board, in fleet order.
+        bot (Bot): The bot shooting at the board, newly created with the same settings, or None if a player is.
+    """
+    columns = board.columns
+    grid = board.board
+    for index in state.shots:
+        row, column = divmod(index, columns)
+        grid[row][column]["is_shot"] = True
+    board.last_shot = state.last_shot
+    for ship, hits in zip(ships, state.hits):
+        ship.hits = hits
+        ship.check_sunk()
+    if bot is None or state.bot is None:
+        return
+
+    saved = state.bot
+    bot.remaining_lengths = list(saved["remaining_lengths"])
+    bot.checkboard_spacing = saved["checkboard_spacing"]
+    bot.checkboard_offset = saved["checkboard_offset"]
+    bot.checkboard_pattern = [divmod(index, columns) for index in saved["checkboard_pattern"]] if saved["pattern_listed"] else None
+    bot.hunt_mode_active = saved["hunt_mode_active"]
+    bot.unresolved_hits = {divmod(index, columns) for index in saved["unresolved_hits"]}
+    bot.target_queue = deque(divmod(index, columns) for index in saved["target_queue"])
+    bot.last_shot = saved["last_shot"]
+    bot.last_shot_hit = saved["last_shot_hit"]
+    bot.rng.setstate(saved["rng"])
+    bot.sunk_ships = [list(ship.occupied_cells) for ship in ships if ship.is_sunk]
+    if bot.endgame is not None:
+        bot.endgame.planned = None # Its plan was for the board before the checkpoint, list the configurations again
+    # The density targeter and board hash are rebuilt from the shots
+    for index in state.shots:
+        row, column = divmod(index, columns)
+        if bot.density is not None:
+            bot.density.record_shot(row, column, grid[row][column]["is_occupied"])
+        if bot.board_hash is not None:
+            cell = grid[row][column]
+            if not cell["is_occupied"]:
+                bot.board_hash.set_state(row, column, stateCache.MISS)
+            else:
+                bot.board_hash.set_state(row, column, stateCache.SUNK if cell["ship"].is_sunk else stateCache.HIT)
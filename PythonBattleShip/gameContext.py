@@ -0,0 +1,99 @@
+""" Per game context, so games can run at the same time in different threads
+
+    Everything that changes during a game (boards, ships, bots and the random number generator) is created from
+    a GameContext and belongs to that game only. The things games do share are read only: fleet templates,
+    cell_state, cached search patterns and neighbour tables, and memory mapped priors.
+
+    Classes:
+        GameContext:
+            Settings and random number generator for one game, with factories for its boards, fleets and bots.
+"""
+from typing import TYPE_CHECKING, List, Sequence
+import random
+import fleet
+import sparseBoard
+from bot import Bot
+from gameBoard import gameBoard
+from ship import Layout, Ship, place_fleet, place_layout
+
+if TYPE_CHECKING: # Only named in annotations, callers create these themselves
+    from densityTargeting import DensityTargeter
+    from endgameSolver import EndgameSolver
+    from fleetSampler import FleetSampler
+    from gameEvents import EventBus
+    from stateCache import StateCache
+
+
+class GameContext:
+    """
+    Settings and random number generator for one game.
+
+    Attributes:
+        rows (int): Number of rows on the game boards.
+        columns (int): Number of columns on the game boards.
+        fleet_template (FleetTemplate): Fleet each side places.
+        priors (Sequence[float]): Cell priors for the bots, or None.
+        rng (random.Random): Random number generator used for everything random in this game.
+        events (EventBus): Bus the game's bots emit shots into, None to not emit them.
+    """
+
+    def __init__(self, rows: int, columns: int, fleet_template: fleet.FleetTemplate = fleet.STANDARD_FLEET, seed: int = None, priors: Sequence[float] = None,
+                 events: "EventBus" = None):
+        """
+        Args:
+            rows (int): Number of rows on the game boards.
+            columns (int): Number of columns on the game boards.
+            fleet_template (FleetTemplate): Fleet each side places.
+            seed (int): Seed for the game's random number generator, None for an unseeded game.
+            priors (Sequence[float]): Cell priors for the bots, or None.
+            events (EventBus): Bus the game's bots emit shots into, None to not emit them.
+        """
+        self.rows: int = rows
+        self.columns: int = columns
+        self.fleet_template: fleet.FleetTemplate = fleet_template
+        self.priors: Sequence[float] = priors
+        self.rng: random.Random = random.Random(seed)
+        self.events: "EventBus" = events
+
+    def create_board(self) -> gameBoard:
+        """
+        Create an empty board, sparse if the board is very large.
+        """
+        return sparseBoard.create_board(self.rows, self.columns)
+
+    def create_fleet(self, board: gameBoard, layout: Layout = None) -> List[Ship]:
+        """
+        Create the fleet and place it on a board, randomly or as given by a layout.
+
+        Args:
+            board (gameBoard): Board to place the ships on.
+            layout (Layout): Bow row, bow column and direction of each ship, eg. from a layout corpus. None to place randomly.
+
+        Returns:
+            List[Ship]: The placed ships.
+
+        Raises:
+            ValueError: If a ship of the layout can't be placed, or the fleet can't be placed randomly.
+        """
+        ships = self.fleet_template.create_ships()
+        if layout is not None:
+            if not place_layout(board, ships, layout):
+                raise ValueError(f"Layout {layout} can't be placed on a {self.rows}x{self.columns} board")
+            return ships
+        place_fleet(board.board, ships, self.rows, self.columns, rng=self.rng)
+        return ships
+
+    def create_bot(self, name: str = "Computer", density: "DensityTargeter" = None, state_cache: "StateCache" = None,
+                   endgame: "EndgameSolver" = None, sampler: "FleetSampler" = None) -> Bot:
+        """
+        Create a bot that draws its random numbers from this game's generator and emits into its event bus.
+
+        Args:
+            name (str): Name of the bot.
+            density (DensityTargeter): Search by placement density with this targeter, None to use the checkboard pattern.
+            state_cache (StateCache): Cache of density shots shared between games, None to not cache them.
+            endgame (EndgameSolver): Solve the last few shots exactly with this solver, None to not solve them.
+            sampler (FleetSampler): Hunt by sampling whole fleet configurations with this sampler, None to hunt around hits.
+        """
+        return Bot(name, self.rows, self.columns, ship_lengths=self.fleet_template.ship_lengths, priors=self.priors, rng=self.rng,
+                   density=density, state_cache=state_cache, endgame=endgame, sampler=sampler, events=self.events)
@@ -0,0 +1,150 @@
+""" Game events for observers such as renderers, loggers and stats collectors
+
+    Game loops and the bot emit events into an EventBus as the game is played: each turn starting and ending,
+    each shot fired, each hit, each ship sunk and the game ending. Observers subscribe a handler to the events they
+    want and are called with a GameEvent as each one happens.
+
+    Emitting has to cost nothing in headless runs. Every emit site checks `events is not None and events.active`
+    before building an event, and active is only True while something is subscribed, so a game with no bus or an
+    unobserved bus pays one attribute check per event.
+
+    Classes:
+        GameEvent:
+            What happened, to whom and where.
+
+        EventBus:
+            Handlers subscribed by event kind, called as events are emitted.
+"""
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+TURN_START: str = "turn_start"
+TURN_END: str = "turn_end"
+SHOT: str = "shot" # Every shot, hit or miss
+HIT: str = "hit" # After SHOT, when the shot hit a ship
+SUNK: str = "sunk" # After HIT, when the hit sank the ship
+GAME_OVER: str = "game_over"
+EVENTS: Tuple[str, ...] = (TURN_START, TURN_END, SHOT, HIT, SUNK, GAME_OVER)
+
+
+class GameEvent(NamedTuple):
+    """
+    An event emitted during a game.
+
+    Attributes:
+        kind (str): One of EVENTS.
+        shooter (str): Name of the side taking the turn or firing the shot, the winner for GAME_OVER.
+        turn (int): Turn number, counted by the game loop. 0 where the emitter doesn't count turns.
+        board (List[List[dict]]): Cells of the board being shot at, for SHOT, HIT, SUNK and GAME_OVER. None otherwise.
+        cell (Tuple[int, int]): Row and column of the shot, for SHOT, HIT and SUNK. None otherwise.
+        ship (Ship): Ship hit or sunk, for HIT and SUNK. None otherwise.
+    """
+    kind: str
+    shooter: str
+    turn: int = 0
+    board: object = None
+    cell: Tuple[int, int] = None
+    ship: object = None
+
+
+class EventBus:
+    """
+    Handlers subscribed by event kind. Handlers are called in the order they were subscribed, on the thread
+    that emits the event, and an exception in a handler stops the game so observers can't fail silently.
+
+    Attributes:
+        active (bool): True while any handler is subscribed, emit sites check it before building an event.
+    """
+
+    def __init__(self):
+        self.handlers: Dict[str, List[Callable[[GameEvent], None]]] = {kind: [] for kind in EVENTS}
+        self.active: bool = False
+
+    def subscribe(self, kinds, handler: Callable[[GameEvent], None]) -> None:
+        """
+        Call a handler for one kind of event, or for each of a sequence of kinds.
+
+        Raises:
+            ValueError: If a kind isn't one of EVENTS.
+        """
+        for kind in (kinds,) if isinstance(kinds, str) else kinds:
+            if kind not in self.handlers:
+                raise ValueError(f"Unknown event {kind}, expected one of {EVENTS}")
+            self.handlers[kind].append(handler)
+        self.active = True
+
+    def unsubscribe(self, kinds, handler: Callable[[GameEvent], None]) -> None:
+        """
+        Stop calling a handler for one kind of event, or for each of a sequence of kinds.
+        """
+        for kind in (kinds,) if isinstance(kinds, str) else kinds:
+            if handler in self.handlers.get(kind, ()):
+                self.handlers[kind].remove(handler)
+        self.active = any(self.handlers.values())
+
+    def emit(self, kind: str, shooter: str, turn: int = 0, board=None, cell: Tuple[int, int] = None, ship=None) -> None:
+        """
+        Call every handler subscribed to an event kind.
+        """
+        handlers = self.handlers[kind]
+        if handlers:
+            event = GameEvent(kind, shooter, turn, board, cell, ship)
+            for handler in tuple(handlers): # A copy, so a handler can unsubscribe without the next one being skipped
+                handler(event)
+
+    def shot(self, shooter: str, board, cell: Tuple[int, int], turn: int = 0) -> None:
+        """
+        Emit SHOT for a shot that has been resolved on a board, then HIT and SUNK if it hit and sank a ship.
+
+        Args:
+            shooter (str): Name of the side that fired.
+            board (List[List[dict]]): Cells of the board shot at, the cell must already be marked shot and the ship's hits counted.
+            cell (Tuple[int, int]): Row and column of the shot.
+            turn (int): Turn number, 0 if the caller doesn't count turns.
+        """
+        tile = board[cell[0]][cell[1]]
+        ship = tile["ship"] if tile["is_occupied"] else None
+        self.resolved(shooter, board, cell, ship, ship is not None and ship.is_sunk, turn)
+
+    def resolved(self, shooter: str, board, cell: Tuple[int, int], ship, sunk: bool, turn: int = 0) -> None:
+        """
+        Emit SHOT, then HIT and SUNK, for a shot whose result the caller already has. Used for salvos, where the board
+        has moved on by the time each shot is reported, eg. a later shot of the salvo sank the ship an earlier one hit.
+
+        Args:
+            shooter (str): Name of the side that fired.
+            board (List[List[dict]]): Cells of the board shot at.
+            cell (Tuple[int, int]): Row and column of the shot.
+            ship (Ship): Ship the shot hit, None for a miss.
+            sunk (bool): True if the shot sank the ship.
+            turn (int): Turn number, 0 if the caller doesn't count turns.
+        """
+        self.emit(SHOT, shooter, turn, board, cell)
+        if ship is not None:
+            self.emit(HIT, shooter, turn, board, cell, ship)
+            if sunk:
+                self.emit(SUNK, shooter, turn, board, cell, ship)
+
+
+if __name__ == "__main__":
+    # Cost of emitting: headless solo games with no bus, an unobserved bus and a bus counting every event
+    import argparse
+    from collections import Counter
+    from time import perf_counter
+    import fleet
+    import gameModes
+    from gameContext import GameContext
+    parser = argparse.ArgumentParser(description="Time headless solo games with and without event observers")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--games", type=int, default=2000)
+    args = parser.parse_args()
+
+    counts = Counter()
+    observed = EventBus()
+    observed.subscribe(EVENTS, lambda event: counts.update((event.kind,)))
+    for label, bus in (("No bus", None), ("Unobserved bus", EventBus()), ("Counting observer", observed)):
+        time_start = perf_counter()
+        turns = sum(gameModes.play_solo_game(GameContext(args.rows, args.columns, fleet.STANDARD_FLEET, seed=seed, events=bus))
+                    for seed in range(args.games))
+        print(f"{label}: {perf_counter() - time_start:.2f}s, {turns / args.games:.2f} turns per game")
+    print(", ".join(f"{kind} {counts[kind]}" for kind in EVENTS))
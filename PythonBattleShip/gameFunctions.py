@@ -1,7 +1,10 @@
 """
 Miscillanious functions for the game
 """
+from contextlib import contextmanager
+from typing import IO, Iterator, Sequence
 import os
+import sys
 
 def clear_console():
     """Clears the console screen"""
@@ -49,6 +52,72 @@ def int_to_letters(number:int) -> str:
     string = string.join(num_list)
     return string
 
+def data_dir(name:str="") -> str:
+    """
+    Directory generated files are kept in, eg. priors and checkpoints. They aren't kept next to the modules, a game
+    packaged into a single exe runs from a temporary directory that is deleted when it exits.
+    The directory is BATTLESHIP_DATA_DIR if it is set, otherwise PythonBattleShip in the user's data directory:
+    %LOCALAPPDATA% on Windows, ~/Library/Application Support on macOS and $XDG_DATA_HOME or ~/.local/share elsewhere.
+
+    Args:
+        name (str): Subdirectory for one kind of file, empty for the directory itself.
+
+    Returns:
+        str: Path of the directory, it is created by whatever writes to it.
+    """
+    base = os.environ.get("BATTLESHIP_DATA_DIR")
+    if not base:
+        if os.name == 'nt':
+            root = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+        elif sys.platform == "darwin":
+            root = os.path.join(os.path.expanduser("~"), "Library", "Application Support")
+        else:
+            root = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+        base = os.path.join(root, "PythonBattleShip")
+    return os.path.join(base, name) if name else base
+
+@contextmanager
+def atomic_write(path:str, mode:str="wb", sync:bool=False) -> Iterator[IO]:
+    """
+    Write a file through a temporary file that replaces it in a single step when the with block finishes, so anything
+    reading it sees the old file or the new one and never a half written one. If the block raises, the temporary
+    file is removed and the old file is left as it was.
+
+    Args:
+        path (str): File to write, its directory is created if it doesn't exist.
+        mode (str): "wb" to write bytes, "w" to write text.
+        sync (bool): True to flush the file to disk before it replaces the old one, so a crash leaves one or the other.
+
+    Yields:
+        IO: The open temporary file.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, mode) as file:
+            yield file
+            if sync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def percentile(sorted_values:Sequence, fraction:float):
+    """
+    Value a fraction of the way through sorted values, eg. 0.95 for the 95th percentile.
+
+    Args:
+        sorted_values (Sequence): Values sorted smallest first, at least one.
+        fraction (float): How far through the values, from 0 to 1.
+
+    Returns:
+        The value at that percentile.
+    """
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
 if __name__ == "__main__":
     clear_console()
 
@@ -9,15 +9,46 @@
 
         computer_solo(player: Player) -> None:
             Handle the game logic for a solo computer game.
+
+        computer_vs_computer(board_rows: int, board_columns: int, max_games: int) -> dict:
+            Play a batch of headless matches between two bots.
 """
 import gameBoard
+from gameContext import GameContext
 import gameFunctions
 import playerInput
 import ANSI
-from ship import Ship
+import fleet
+import priors
+import opponentModel
+import tickScheduler
+import telemetry
+import densityTargeting
+import stateCache
+import endgameSolver
+import fleetSampler
+import layoutCorpus
+import gameCheckpoint
+import gameEvents
+import shotResolution
+import strategyTuner
+import os
+from array import array
 from bot import Bot
-from time import sleep, time
-from copy import deepcopy
+from ship import place_fleet
+from time import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Sequence
+
+# Settings of each bot in computer_match, the targeting keys are the same as computer_solo's keyword arguments
+DEFAULT_BOT_SETTINGS: dict = {
+    "turn_time": 0.0, # Time budget per shot, with the checkboard pattern 0 skips the anytime search
+    "density_targeting": False,
+    "endgame_solver": False,
+    "sample_fleets": 0,
+    "density_workers": None, # Worker processes for density targeting, None for densityTargeting.default_workers
+}
 
 
 def player_vs_player():
@@ -28,36 +59,55 @@ def player_vs_player():
     print("Not yet implemented.")
     return
 
-def player_vs_computer(board_rows:int, board_columns:int, bot_turn_time:float=1.0, debug_mode=False):
+def player_vs_computer(board_rows:int, board_columns:int, bot_turn_time:float=1.0, debug_mode=False, fleet_name:str=fleet.DEFAULT_FLEET, habit_blend:float=opponentModel.DEFAULT_BLEND, checkpoint_file:str=None, resume:bool=False, events:gameEvents.EventBus=None, salvo:bool=False):
     """
     Handle the game logic for player vs computer mode.
 
     Args:
         board_rows (int): Number of rows on the game board.
         board_columns (int): Number of columns on the game board.
-        bot_turn_time (float): How long the bot sleeps for between turns.
+        bot_turn_time (float): How long the bot can spend choosing its shot each turn.
+        fleet_name (str): Name of the fleet from the fleet config each side plays with.
+        habit_blend (float): How much the bot searches where players put ships in earlier games on this board size, 0 to not use it.
+        checkpoint_file (str): File to save the game to at the start of every turn, so it can be resumed if it is closed. None to not save it.
+        resume (bool): True to carry on with the game saved in checkpoint_file, the other settings must match the saved game.
+        events (EventBus): Bus to emit turns, shots and the end of the game into, for observers. None to not emit them.
+        salvo (bool): True to play the salvo variant, each side fires one shot for each of its ships still afloat every turn.
     """
     # Ships
-    frigate = Ship("Frigate", "F", 2)
-    destroyer = Ship("Destroyer", "D", 3)
-    battleship = Ship("Battleship", "B", 4)
-    carrier = Ship("Carrier", "C", 5)
-    ship_list = [frigate, destroyer, battleship, carrier]
+    fleet_template = fleet.get_fleet(fleet_name)
+    fleet_template.validate(board_rows, board_columns)
+    game_settings = {"rows": board_rows, "columns": board_columns, "fleet": fleet_name, "bot_turn_time": bot_turn_time, "habit_blend": habit_blend, "salvo": salvo}
+    saved = None # Each side of the saved game, the bot's board first
+    if checkpoint_file is not None and resume and os.path.exists(checkpoint_file):
+        run, _, saved, _ = gameCheckpoint.load_checkpoint(checkpoint_file)
+        if run["settings"] != game_settings:
+            raise ValueError(f"{checkpoint_file} is for a game with different settings: {run['settings']}")
 
     # Bot setup
     bot_board = gameBoard.gameBoard(board_rows, board_columns)
-    bot = Bot("Computer", board_rows, board_columns)
-    bot_ship_list = deepcopy(ship_list)
-    for ship in bot_ship_list:
-        ship.random_place(bot_board.board, board_rows, board_columns)
+    bot = Bot("Computer", board_rows, board_columns, ship_lengths=fleet_template.ship_lengths, priors=priors.load_priors(board_rows, board_columns, fleet_template),
+              habits=opponentModel.habit_weights(board_rows, board_columns, habit_blend), events=events)
+    bot_ship_list = fleet_template.create_ships()
+    if saved is None:
+        place_fleet(bot_board.board, bot_ship_list, board_rows, board_columns)
 
     # Player setup
     player_board = gameBoard.gameBoard(board_rows, board_columns)
-    player_ship_list = deepcopy(ship_list)
+    player_ship_list = fleet_template.create_ships()
+
+    turn_counter = 0
+    if saved is not None: # Put both fleets back where they were and skip placing ships
+        for board, ships, side in ((bot_board, bot_ship_list, saved[0]), (player_board, player_ship_list, saved[1])):
+            for ship, (row, column, direction) in zip(ships, side.layout):
+                ship.place(board.board, row, column, direction, board_rows, board_columns)
+        gameCheckpoint.restore_side(saved[0], bot_board, bot_ship_list)
+        gameCheckpoint.restore_side(saved[1], player_board, player_ship_list, bot)
+        turn_counter = run["turns"]
 
     # Have player place ships
     message = "" # Message to indicate certain things to player, such as ship couldn't be placed
-    while True:
+    while saved is None:
         # Set to none after exiting placement menu
         gameFunctions.clear_console()
         player_board.display_board(own_board=True)
@@ -73,9 +123,11 @@ def player_vs_computer(board_rows:int, board_columns:int, bot_turn_time:float=1.
         ship_choice = playerInput.player_input_int(f"Select Choice (1-{len(player_ship_list) + 1}): ", 1, len(player_ship_list) + 2)
 
         if ship_choice == len(player_ship_list) + 1: # Randomly place ships
-            for ship in player_ship_list:
-                ship.random_place(player_board.board, board_rows, board_columns)
-            message = "All ships randomly placed"
+            try:
+                place_fleet(player_board.board, player_ship_list, board_rows, board_columns)
+                message = "All ships randomly placed"
+            except ValueError:
+                message = "Ships could not be placed"
             continue
 
         if ship_choice == len(player_ship_list) + 2: # Start game
@@ -110,7 +162,10 @@ def player_vs_computer(board_rows:int, board_columns:int, bot_turn_time:float=1.
                 player_ship_list[ship_choice].clear_ship(player_board.board)
             
             elif place_choice == 3: # Random placement
-                player_ship_list[ship_choice].random_place(board=player_board.board, board_rows=board_rows, board_columns=board_columns)
+                try:
+                    player_ship_list[ship_choice].random_place(board=player_board.board, board_rows=board_rows, board_columns=board_columns)
+                except ValueError:
+                    message = "Ship could not be placed"
             
             elif place_choice == 4: # Back
                 break
@@ -118,15 +173,22 @@ def player_vs_computer(board_rows:int, board_columns:int, bot_turn_time:float=1.
         message = "" # Reset message
 
     # Play the game
-    turn_counter = 0
+    # The bot thinks about its reply on a worker thread while the player is typing their shot.
+    # Its move only depends on the player's board, which the player's shot doesn't change.
+    bot_worker = ThreadPoolExecutor(max_workers=1)
     while True:
+        if checkpoint_file is not None:
+            gameCheckpoint.save_checkpoint(checkpoint_file, {"settings": game_settings, "turns": turn_counter},
+                                           [(bot_board, bot_ship_list, None), (player_board, player_ship_list, bot)])
         turn_counter += 1
+        if events is not None and events.active:
+            events.emit(gameEvents.TURN_START, "Player", turn_counter)
 
         # Debug mode
         if debug_mode:
             gameFunctions.clear_console()
-            bot_board.display_board(own_board = True)
-            player_board.display_board(own_board = True)
+            bot_board.display(own_board = True)
+            player_board.display(own_board = True)
             print(ANSI.FG_BRIGHT_CYAN + "Debug Mode" + ANSI.RESET)
             print(f"1. Take turn")
             print(f"2. Sink own ships")
@@ -146,48 +208,69 @@ def player_vs_computer(board_rows:int, board_columns:int, bot_turn_time:float=1.
                 for ship in ships:
                     for cell in ship.occupied_cells:
                         board[cell[0]][cell[1]]["is_shot"] = True
+                        gameBoard.record_changes(board, (cell,))
                         ship.hits += 1
-                    ship.check_sunk()
+                        ship.check_sunk()
+                        if events is not None and events.active:
+                            events.shot("Debug", board, cell, turn_counter)
 
         # Player Turn
+        # In the salvo variant each side fires one shot per ship it has afloat at the start of the turn
+        # At least one, the debug menu can sink a whole fleet, and no more than the cells left to shoot at
+        player_shots = min(max(shotResolution.salvo_size(player_ship_list), 1), sum(not cell["is_shot"] for row in bot_board.board for cell in row)) if salvo else 1
+        bot_shots = min(max(shotResolution.salvo_size(bot_ship_list), 1), sum(not cell["is_shot"] for row in player_board.board for cell in row)) if salvo else 1
+        if salvo:
+            bot_reply = bot_worker.submit(bot.choose_salvo, player_board.board, bot_shots, bot_turn_time) # Start the bot's reply now
+        else:
+            bot_reply = bot_worker.submit(bot.choose_shot, player_board.board, bot_turn_time)
+        player_salvo = [] # Shots the player has picked this turn
         message = "" # Reset message
-        while True:
+        while len(player_salvo) < player_shots:
             gameFunctions.clear_console()
-            bot_board.display_board(own_board = False)
-            player_board.display_board(own_board = True)
-            print(ANSI.FG_BRIGHT_GREEN + "Your Turn" + ANSI.RESET)
+            bot_board.display(own_board = False)
+            player_board.display(own_board = True)
+            print(ANSI.FG_BRIGHT_GREEN + "Your Turn" + ANSI.RESET + (f" shot {len(player_salvo) + 1} of {player_shots}" if salvo else ""))
             print(message)
             # Get a shot from the player
             player_shot = playerInput.player_input_coord(board_rows=board_rows, board_columns=board_columns)
             message = f"Your shot: {player_shot}"
             # Check if the cell is not yet shot
-            if bot_board.board[player_shot[0]][player_shot[1]]["is_shot"]:
+            if bot_board.board[player_shot[0]][player_shot[1]]["is_shot"] or player_shot in player_salvo:
                 message = "Cell has already been shot, try again"
                 continue
-            # If not shot then update board and check if ship was hit
-            bot_board.board[player_shot[0]][player_shot[1]]['is_shot'] = True  # Mark the cell as shot at
-            if bot_board.board[player_shot[0]][player_shot[1]]['is_occupied']:
-                bot_board.board[player_shot[0]][player_shot[1]]["ship"].hits += 1  # Increment the hit count of the ship
-                # If the ship is hit check if it is sunk, if so check all ships
-                bot_board.board[player_shot[0]][player_shot[1]]["ship"].check_sunk()
-            
-            # Check if the ships are sunk
-            sunk_counter = 0
-            for ship in bot_ship_list:
-                if ship.is_sunk:
-                    sunk_counter += 1
-            if sunk_counter >= len(bot_ship_list): # If all ships are sunk end the game
-                gameFunctions.clear_console()
-                bot_board.display_board(own_board=True) # Show the ship tiles once the game is over
-                player_board.display_board(own_board=True)
-                print(ANSI.BG_BRIGHT_GREEN + "Game Over: You sunk all the opponents ships" + ANSI.RESET)
-                print(f"Turn Count: {turn_counter}")
-                return
-            # If a valid shot was made exit loop
-            break
+            player_salvo.append(player_shot)
+
+        # Fire every shot at once, then check if the ships are sunk
+        result = shotResolution.resolve_salvo(bot_board.board, player_salvo, bot_ship_list)
+        bot_board.last_shot = player_salvo[-1]
+        if events is not None and events.active:
+            for cell, hit, sunk_ship in zip(player_salvo, result.hits, result.sunk):
+                events.resolved("Player", bot_board.board, cell, bot_board.board[cell[0]][cell[1]]["ship"] if hit else None, sunk_ship is not None, turn_counter)
+            events.emit(gameEvents.TURN_END, "Player", turn_counter)
+        if result.game_over: # If all ships are sunk end the game
+            gameFunctions.clear_console()
+            bot_board.display(own_board=True) # Show the ship tiles once the game is over
+            player_board.display(own_board=True)
+            print(ANSI.BG_BRIGHT_GREEN + "Game Over: You sunk all the opponents ships" + ANSI.RESET)
+            if events is not None and events.active:
+                events.emit(gameEvents.GAME_OVER, "Player", turn_counter, bot_board.board)
+            print(f"Turn Count: {turn_counter}")
+            opponentModel.record_placement(board_rows, board_columns, player_ship_list) # Learn where this player puts ships
+            bot_worker.shutdown(wait=False, cancel_futures=True)
+            if checkpoint_file is not None and os.path.exists(checkpoint_file):
+                os.remove(checkpoint_file) # The game is over, nothing to resume
+            return
 
         # Computers Turn
-        bot.bot_turn(player_board.board) # Bot takes turn, if ship is sunk will return true
+        if events is not None and events.active:
+            events.emit(gameEvents.TURN_START, bot.name, turn_counter)
+        if salvo:
+            bot.salvo_turn(player_board.board, bot_shots, salvo=bot_reply.result(), turn=turn_counter)
+        else:
+            bot.bot_turn(player_board.board, shot=bot_reply.result(), turn=turn_counter) # Bot takes turn, if ship is sunk will return true
+        player_board.last_shot = bot.last_shot
+        if events is not None and events.active:
+            events.emit(gameEvents.TURN_END, bot.name, turn_counter)
         # Check of the players ships are sunk
         sunk_counter = 0
         for ship in player_ship_list: # If a ship gets sunk check if all ships are sunk
@@ -195,13 +278,19 @@ def player_vs_computer(board_rows:int, board_columns:int, bot_turn_time:float=1.
                 sunk_counter += 1
         if sunk_counter >= len(player_ship_list):
             gameFunctions.clear_console()
-            bot_board.display_board(own_board=True) # Show the ship tiles once the game is over
-            player_board.display_board(own_board=True)
+            bot_board.display(own_board=True) # Show the ship tiles once the game is over
+            player_board.display(own_board=True)
             print(ANSI.BG_BRIGHT_RED + "Game Over: Your opponent sunk all your ships" + ANSI.RESET)
+            if events is not None and events.active:
+                events.emit(gameEvents.GAME_OVER, bot.name, turn_counter, player_board.board)
             print(f"Turn Count: {turn_counter}")
+            opponentModel.record_placement(board_rows, board_columns, player_ship_list)
+            bot_worker.shutdown(wait=False, cancel_futures=True)
+            if checkpoint_file is not None and os.path.exists(checkpoint_file):
+                os.remove(checkpoint_file)
             return
 
-def computer_solo(board_rows:int, board_columns:int, max_games:int=1, show_board_every_turn:bool=True, show_final_board:bool=True, bot_slow_turn:bool=False, bot_turn_time:float=1.0, clear_screen_bewteen_turns:bool=False):
+def computer_solo(board_rows:int, board_columns:int, max_games:int=1, show_board_every_turn:bool=True, show_final_board:bool=True, bot_slow_turn:bool=False, bot_turn_time:float=1.0, clear_screen_bewteen_turns:bool=False, fleet_name:str=fleet.DEFAULT_FLEET, stats_file:str=None, stats_port:int=None, seed:int=None, density_targeting:bool=False, cache_size:int=stateCache.DEFAULT_CACHE_SIZE, endgame_solver:bool=False, sample_fleets:int=0, density_workers:int=None, corpus_file:str=None, checkpoint_file:str=None, checkpoint_every:float=gameCheckpoint.DEFAULT_CHECKPOINT_EVERY, resume:bool=False, events:gameEvents.EventBus=None, move_budget:float=None):
     """
     Handle the game logic for a solo computer game.
 
@@ -211,67 +300,400 @@ def computer_solo(board_rows:int, board_columns:int, max_games:int=1, show_board
         max_games (int): Number of games the bot will play.
         show_board_every_turn (bool): True to show display the board every turn.
         show_final_board (bool): True to show display the board at end of game.
-        bot_slow_turn (bool): True to make the bot sleep between turns so it can be watched.
-        bot_turn_time (float): How long the bot sleeps for between turns.
+        bot_slow_turn (bool): True to play turns at a fixed rate so it can be watched, with keys to pause, fast-forward and quit.
+        bot_turn_time (float): How long each turn lasts when bot_slow_turn, the bot uses what is left after rendering to choose its shot.
         clear_screen_between_turns (bool): True to clear the console sreen between turns.
+        fleet_name (str): Name of the fleet from the fleet config the bot plays against.
+        stats_file (str): File to write live progress and throughput stats to every second, None for no file.
+        stats_port (int): Port to serve the stats on at http://127.0.0.1:port/metrics in Prometheus format, None to not serve them.
+        seed (int): Seed for the first game, each game after uses the next seed. None for unseeded games.
+        density_targeting (bool): True to search by placement density instead of the checkboard pattern. Ignored on boards over densityTargeting.DENSITY_MAX_CELLS.
+        cache_size (int): Density shots cached by board state over the whole run, so states that come up again are looked up. 0 to not cache.
+        endgame_solver (bool): True to solve the last shots of each game exactly once few fleet configurations are left. Ignored on large boards.
+        sample_fleets (int): Whole fleet configurations sampled per shot to hunt with, 0 to hunt around hits. Ignored on large boards.
+        density_workers (int): Worker processes counting placement density, 0 or 1 to count in this process.
+            None for one per CPU on boards of densityTargeting.DENSITY_POOL_MIN_CELLS or more. Doesn't change the shots played.
+        corpus_file (str): Layout corpus to play, game n plays layout n - 1, wrapping round. None to place the fleet randomly.
+        checkpoint_file (str): File to checkpoint the run to, so it can be resumed after being quit or interrupted. None to not checkpoint.
+        checkpoint_every (float): Seconds between checkpoints, longer if saving would take more than MAX_OVERHEAD of the run. The run is also checkpointed when quit.
+        resume (bool): True to carry on from checkpoint_file if it exists, it must be for a run with the same settings.
+        events (EventBus): Bus to emit turns, shots and the end of each game into, for observers. None to not emit them.
+        move_budget (float): Seconds a move may take. If given, the strategy that shoots best within it on this machine is picked
+            by the strategy tuner, tuning the board size and fleet first if needed, and replaces density_targeting, endgame_solver and sample_fleets.
+
+    Raises:
+        ValueError: If resuming from a checkpoint of a run with different settings.
     """
     game_number:int = 0
     total_score:int = 0
+    scores:list = [] # Turns taken in each game, for the percentile
+    fleet_template = fleet.get_fleet(fleet_name)
+    fleet_template.validate(board_rows, board_columns)
+    if move_budget is not None:
+        profile = strategyTuner.choose_strategy(board_rows, board_columns, fleet_template, move_budget)
+        print(f"Strategy: {profile.strategy}, {profile.move_p90 * 1000:.3f} ms per move")
+        strategy = strategyTuner.STRATEGY_SETTINGS[profile.strategy]
+        density_targeting, endgame_solver, sample_fleets = strategy["density_targeting"], strategy["endgame_solver"], strategy["sample_fleets"]
+    # Settings that change which shots are played, a checkpoint can only be resumed with the same ones
+    run_settings = {"rows": board_rows, "columns": board_columns, "max_games": max_games, "fleet": fleet_name, "seed": seed,
+                    "density_targeting": density_targeting, "endgame_solver": endgame_solver, "sample_fleets": sample_fleets, "corpus_file": corpus_file}
+    resume_side = None # The unfinished game from the checkpoint
+    if checkpoint_file is not None and resume and os.path.exists(checkpoint_file):
+        run, _, sides, arrays = gameCheckpoint.load_checkpoint(checkpoint_file)
+        if run["settings"] != run_settings:
+            raise ValueError(f"{checkpoint_file} is for a run with different settings: {run['settings']}")
+        game_number = run["games_finished"]
+        total_score = run["total_score"]
+        scores = list(arrays["scores"])
+        if sides:
+            resume_side = sides[0]
+            resume_turns = run["turns"]
+    cell_priors = priors.load_priors(board_rows, board_columns, fleet_template) # None if no priors file has been built
+    corpus = None
+    if corpus_file is not None:
+        corpus = layoutCorpus.load_corpus(corpus_file, fleet_template)
+        if (corpus.rows, corpus.columns) != (board_rows, board_columns):
+            raise ValueError(f"{corpus_file} is for a {corpus.rows}x{corpus.columns} board")
+
+    # Watched games tick at a fixed rate, the bot thinks for whatever is left of the tick after rendering
+    keys = tickScheduler.KeyReader(enabled=bot_slow_turn)
+    scheduler = tickScheduler.TickScheduler(bot_turn_time, keys)
+    if bot_slow_turn and keys.enabled:
+        print("Press p to pause, f to fast-forward, q to quit")
     
-    while game_number < max_games:
-        game_number += 1
-        # Bot setup
-        bot_board = gameBoard.gameBoard(board_rows, board_columns)
-        bot = Bot("Computer", board_rows, board_columns)
-        bot_turn_counter = 0
-
-        # Ship setup
-        frigate = Ship("Frigate", "F", 2)
-        destroyer = Ship("Destroyer", "D", 3)
-        battleship = Ship("Battleship", "B", 4)
-        carrier = Ship("Carrier", "C", 5)
-        ship_list = [frigate, destroyer, battleship, carrier]
-        for ship in ship_list:
-            ship.random_place(bot_board.board, board_rows, board_columns)
-        
-        # Show initial board
-        if show_board_every_turn:
-            if clear_screen_bewteen_turns:
-                gameFunctions.clear_console()
-            bot_board.display_board(own_board=True)
-        if bot_slow_turn:
-                sleep(bot_turn_time)
-
-        while True:
-            bot_turn_counter += 1
-            if bot.bot_turn(bot_board.board): # Bot takes turn, if ship is sunk will return true
-                sunk_counter = 0
-                for ship in ship_list: # If a ship gets sunk check if all ships are sunk
-                    if ship.is_sunk: # If any ship is not sunk break out of the loop
-                        sunk_counter += 1
-                if sunk_counter >= len(ship_list):
-                    # If all ships are sunk end the game
-                    if show_final_board:
-                        if clear_screen_bewteen_turns:
-                            gameFunctions.clear_console()
-                        if bot_slow_turn:
-                            sleep(bot_turn_time)
-                        bot_board.display_board(own_board=True)
-                    print(f"Game: {game_number}, Turns: {bot_turn_counter}")
-                    break
+    # Stats are written by a background thread, the loop only counts games and turns
+    run_stats = telemetry.Telemetry(stats_file=stats_file, port=stats_port, max_games=max_games - game_number)
+
+    # One density targeter is cleared and reused for every game, the cache is kept for the whole run
+    density = None
+    if density_targeting and board_rows * board_columns <= densityTargeting.DENSITY_MAX_CELLS:
+        density = densityTargeting.DensityTargeter(board_rows, board_columns, density_workers)
+    state_cache = None
+    if density is not None and cache_size > 0 and board_rows * board_columns <= stateCache.STATE_CACHE_MAX_CELLS:
+        state_cache = stateCache.StateCache(cache_size)
+    endgame = None
+    if endgame_solver and board_rows * board_columns <= endgameSolver.ENDGAME_MAX_CELLS:
+        endgame = endgameSolver.EndgameSolver(board_rows, board_columns)
+    sampler = None
+    if sample_fleets > 0 and board_rows * board_columns <= fleetSampler.SAMPLER_MAX_CELLS:
+        sampler = fleetSampler.FleetSampler(board_rows, board_columns, sample_fleets)
+
+    def save_run(games_finished:int, turns:int, sides:list) -> None:
+        # The bot shares the game's random generator, so it is saved with the bot
+        gameCheckpoint.save_checkpoint(checkpoint_file, {"settings": run_settings, "games_finished": games_finished, "total_score": total_score, "turns": turns},
+                                       sides, arrays={"scores": array("I", scores)})
+    last_checkpoint = time()
+    checkpoint_interval = checkpoint_every
+
+    with keys, run_stats, density or nullcontext():
+        while game_number < max_games and not scheduler.quit:
+            game_number += 1
+            context = GameContext(board_rows, board_columns, fleet_template, seed=None if seed is None else seed + game_number - 1, priors=cell_priors, events=events)
+            # Bot setup
+            bot_board = context.create_board() # Sparse board if the board is very large
+            if density is not None:
+                density.clear()
+            bot = context.create_bot(density=density, state_cache=state_cache, endgame=endgame, sampler=sampler)
+            bot_turn_counter = 0
+
+            # Ship setup
+            if resume_side is not None: # Carry on with the game the checkpoint was taken in
+                ship_list = context.create_fleet(bot_board, resume_side.layout)
+                gameCheckpoint.restore_side(resume_side, bot_board, ship_list, bot)
+                bot_turn_counter = resume_turns
+                resume_side = None
+            else:
+                ship_list = context.create_fleet(bot_board, corpus.layout((game_number - 1) % len(corpus)) if corpus is not None else None)
 
+            # Show initial board
             if show_board_every_turn:
                 if clear_screen_bewteen_turns:
                     gameFunctions.clear_console()
-                bot_board.display_board(own_board=True)
-                if bot_slow_turn:
-                    sleep(bot_turn_time)
-        
-        total_score += bot_turn_counter
+                bot_board.display(own_board=True)
+            if bot_slow_turn:
+                scheduler.wait() # Quitting here skips the turns, the unfinished game is checkpointed and not counted below
+
+            while not scheduler.quit:
+                if checkpoint_file is not None and time() - last_checkpoint >= checkpoint_interval:
+                    save_start = time()
+                    save_run(game_number - 1, bot_turn_counter, [(bot_board, ship_list, bot)])
+                    last_checkpoint = time()
+                    # Huge boards take a while to save, space their checkpoints out so saving stays a small part of the run
+                    checkpoint_interval = max(checkpoint_every, (last_checkpoint - save_start) / gameCheckpoint.MAX_OVERHEAD)
+                bot_turn_counter += 1
+                run_stats.record_turn()
+                if events is not None and events.active:
+                    events.emit(gameEvents.TURN_START, bot.name, bot_turn_counter)
+                # When every turn is being watched the bot can spend the rest of the tick thinking
+                ship_sunk = bot.bot_turn(bot_board.board, time_budget=scheduler.time_left() if bot_slow_turn and show_board_every_turn else 0.0, turn=bot_turn_counter) # Bot takes turn, if ship is sunk will return true
+                bot_board.last_shot = bot.last_shot
+                if events is not None and events.active:
+                    events.emit(gameEvents.TURN_END, bot.name, bot_turn_counter)
+                if ship_sunk:
+                    sunk_counter = 0
+                    for ship in ship_list: # If a ship gets sunk check if all ships are sunk
+                        if ship.is_sunk: # If any ship is not sunk break out of the loop
+                            sunk_counter += 1
+                    if sunk_counter >= len(ship_list):
+                        # If all ships are sunk end the game
+                        if events is not None and events.active:
+                            events.emit(gameEvents.GAME_OVER, bot.name, bot_turn_counter, bot_board.board)
+                        if show_final_board:
+                            if bot_slow_turn:
+                                scheduler.wait()
+                            if clear_screen_bewteen_turns:
+                                gameFunctions.clear_console()
+                            bot_board.display(own_board=True)
+                        print(f"Game: {game_number}, Turns: {bot_turn_counter}")
+                        break
+
+                if show_board_every_turn:
+                    if bot_slow_turn and not scheduler.wait():
+                        break
+                    if clear_screen_bewteen_turns:
+                        gameFunctions.clear_console()
+                    bot_board.display(own_board=True)
+            
+            if scheduler.quit and not all(ship.is_sunk for ship in ship_list):
+                if checkpoint_file is not None:
+                    save_run(game_number - 1, bot_turn_counter, [(bot_board, ship_list, bot)])
+                    print(f"Checkpointed to {checkpoint_file}")
+                game_number -= 1 # Don't count the unfinished game
+                break
+            total_score += bot_turn_counter
+            scores.append(bot_turn_counter)
+            run_stats.record_game(bot_turn_counter)
+            if scheduler.quit and checkpoint_file is not None: # Quit while the final board was shown, the next game starts on resume
+                save_run(game_number, 0, [])
+                print(f"Checkpointed to {checkpoint_file}")
+
+    if checkpoint_file is not None and game_number >= max_games and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file) # Nothing left to resume
 
     print("Game Over")
-    print(f"Total Games: {max_games}")
-    print(f"Average Score: {total_score / max_games}")
+    print(f"Total Games: {game_number}")
+    if game_number > 0:
+        scores.sort()
+        print(f"Average Score: {total_score / game_number}")
+        print(f"95th Percentile Score: {gameFunctions.percentile(scores, 0.95)}")
+    if state_cache is not None:
+        cache_stats = state_cache.stats()
+        print(f"State Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['hit_rate']:.1%} hit rate, {cache_stats['size']} states")
+    if sampler is not None:
+        sampler_stats = sampler.stats()
+        print(f"Fleet Sampler: {sampler_stats['mean_samples']:.0f} samples per shot, {sampler_stats['mcmc_rate']:.1%} of shots used MCMC, {sampler_stats['extended_rate']:.1%} extended its chains, {sampler_stats['unmixed_rate']:.1%} had R-hat over {fleetSampler.R_HAT_LIMIT}")
+
+def play_solo_game(context:GameContext, density:densityTargeting.DensityTargeter=None, layout:layoutCorpus.Layout=None) -> int:
+    """
+    Play one headless solo game, the bot shooting at its own randomly placed fleet. Nothing is displayed,
+    and everything the game changes comes from the context, so games can run in parallel threads.
+    Turns, shots and the end of the game are emitted into the context's event bus, if it has one.
+
+    Args:
+        context (GameContext): Settings and random number generator for the game.
+        density (DensityTargeter): Search by placement density with this targeter, cleared first. None to use the checkboard pattern.
+        layout (Layout): Where to place the fleet, eg. from a layout corpus. None to place it randomly.
+
+    Returns:
+        int: Number of turns the bot took to sink every ship.
+    """
+    board = context.create_board()
+    context.create_fleet(board, layout)
+    if density is not None:
+        density.clear()
+    bot = context.create_bot(density=density)
+    events = context.events
+    ship_count = len(context.fleet_template.ships)
+    sunk = 0
+    turns = 0
+    while sunk < ship_count:
+        turns += 1
+        if events is not None and events.active:
+            events.emit(gameEvents.TURN_START, bot.name, turns)
+        if bot.bot_turn(board.board, turn=turns):
+            sunk += 1
+        if events is not None and events.active:
+            events.emit(gameEvents.TURN_END, bot.name, turns)
+    if events is not None and events.active:
+        events.emit(gameEvents.GAME_OVER, bot.name, turns, board.board)
+    return turns
+
+def play_salvo_game(context:GameContext, density:densityTargeting.DensityTargeter=None, salvo_size:int=None, layout:layoutCorpus.Layout=None) -> tuple:
+    """
+    Play one headless solo game of the salvo variant, the bot firing a whole salvo at its own fleet each turn.
+
+    Args:
+        context (GameContext): Settings and random number generator for the game.
+        density (DensityTargeter): Search by placement density with this targeter, cleared first. None to use the checkboard pattern.
+        salvo_size (int): Shots in every salvo, None for one per ship still afloat.
+        layout (Layout): Where to place the fleet, eg. from a layout corpus. None to place it randomly.
+
+    Returns:
+        tuple: (turns, shots) the bot took to sink every ship.
+    """
+    board = context.create_board()
+    ships = context.create_fleet(board, layout)
+    if density is not None:
+        density.clear()
+    bot = context.create_bot(density=density)
+    events = context.events
+    turns = 0
+    shots = 0
+    while True:
+        turns += 1
+        if events is not None and events.active:
+            events.emit(gameEvents.TURN_START, bot.name, turns)
+        size = salvo_size if salvo_size is not None else shotResolution.salvo_size(ships)
+        size = min(size, context.rows * context.columns - shots) # Every shot is at a new cell, don't ask for more than are left
+        result = bot.salvo_turn(board.board, size, ships, turn=turns)
+        shots += size
+        if events is not None and events.active:
+            events.emit(gameEvents.TURN_END, bot.name, turns)
+        if result.game_over:
+            if events is not None and events.active:
+                events.emit(gameEvents.GAME_OVER, bot.name, turns, board.board)
+            return turns, shots
+
+def bot_settings(settings:dict=None) -> dict:
+    """
+    A bot's settings for computer_match with DEFAULT_BOT_SETTINGS filled in for any that aren't given.
+    """
+    unknown = set(settings or {}) - set(DEFAULT_BOT_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown bot settings: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_BOT_SETTINGS, **(settings or {})}
+
+def create_strategy(board_rows:int, board_columns:int, settings:dict=None) -> dict:
+    """
+    Create the targeting a bot's settings turn on. Density targeting, the endgame solver and the fleet sampler are skipped past their size limits, as in computer_solo.
+
+    Args:
+        board_rows (int): Number of rows on the game board.
+        board_columns (int): Number of columns on the game board.
+        settings (dict): The bot's settings, see DEFAULT_BOT_SETTINGS.
+
+    Returns:
+        dict: Density targeter, endgame solver and fleet sampler as keyword arguments of GameContext.create_bot.
+            The density targeter must be closed when the bot is done with it.
+    """
+    settings = bot_settings(settings)
+    cells = board_rows * board_columns
+    return {
+        "density": densityTargeting.DensityTargeter(board_rows, board_columns, settings["density_workers"]) if settings["density_targeting"] and cells <= densityTargeting.DENSITY_MAX_CELLS else None,
+        "endgame": endgameSolver.EndgameSolver(board_rows, board_columns) if settings["endgame_solver"] and cells <= endgameSolver.ENDGAME_MAX_CELLS else None,
+        "sampler": fleetSampler.FleetSampler(board_rows, board_columns, settings["sample_fleets"]) if settings["sample_fleets"] > 0 and cells <= fleetSampler.SAMPLER_MAX_CELLS else None,
+    }
+
+def close_strategy(strategy:dict) -> None:
+    """
+    Release what create_strategy created.
+    """
+    if strategy["density"] is not None:
+        strategy["density"].close()
+
+def computer_match(board_rows:int, board_columns:int, fleet_template:fleet.FleetTemplate, bot_1_settings:dict=None, bot_2_settings:dict=None, bot_1_first:bool=True, seed:int=None, events:gameEvents.EventBus=None, strategies:Sequence[dict]=None) -> tuple:
+    """
+    Play one headless match between two bots, each shooting at the other's randomly placed fleet. Nothing is displayed.
+
+    Args:
+        board_rows (int): Number of rows on each game board.
+        board_columns (int): Number of columns on each game board.
+        fleet_template (FleetTemplate): Fleet each bot places.
+        bot_1_settings (dict): Turn time and targeting of bot 1, see DEFAULT_BOT_SETTINGS. None for the defaults.
+        bot_2_settings (dict): Turn time and targeting of bot 2.
+        bot_1_first (bool): True if bot 1 takes the first shot.
+        seed (int): Seed for the match, None for an unseeded match.
+        events (EventBus): Bus to emit turns, shots and the end of the match into, for observers. None to not emit them.
+        strategies (Sequence[dict]): Each bot's targeting from create_strategy, to reuse it over many matches. None to create it for this match.
+
+    Returns:
+        tuple: (winner, turns) where winner is 1 or 2 and turns is the number of shots the winner took.
+    """
+    settings = [bot_settings(bot_1_settings), bot_settings(bot_2_settings)]
+    own_strategies = strategies is None
+    if own_strategies:
+        strategies = [create_strategy(board_rows, board_columns, side_settings) for side_settings in settings]
+    ship_count = len(fleet_template.ships)
+    cell_priors = priors.load_priors(board_rows, board_columns, fleet_template) # Mapped once, then a dictionary lookup
+    context = GameContext(board_rows, board_columns, fleet_template, seed=seed, priors=cell_priors, events=events)
+    try:
+        # Each side is [bot, the board it shoots at, ships sunk on that board, time budget, bot number]
+        sides = []
+        for number, (side_settings, strategy) in enumerate(zip(settings, strategies), 1):
+            target_board = context.create_board()
+            context.create_fleet(target_board)
+            if strategy["density"] is not None:
+                strategy["density"].clear()
+            sides.append([context.create_bot(f"Computer {number}", **strategy), target_board.board, 0, side_settings["turn_time"], number])
+        if not bot_1_first:
+            sides.reverse()
+
+        turns = 0
+        while True:
+            turns += 1
+            for side in sides:
+                if events is not None and events.active:
+                    events.emit(gameEvents.TURN_START, side[0].name, turns)
+                # bot_turn only returns True when a ship sinks, so the sunk count is kept here instead of checking every ship
+                ship_sunk = side[0].bot_turn(side[1], time_budget=side[3], turn=turns)
+                if events is not None and events.active:
+                    events.emit(gameEvents.TURN_END, side[0].name, turns)
+                if ship_sunk:
+                    side[2] += 1
+                    if side[2] >= ship_count:
+                        if events is not None and events.active:
+                            events.emit(gameEvents.GAME_OVER, side[0].name, turns, side[1])
+                        return side[4], turns
+    finally:
+        if own_strategies:
+            for strategy in strategies:
+                close_strategy(strategy)
+
+def computer_vs_computer(board_rows:int, board_columns:int, max_games:int=1, bot_1_settings:dict=None, bot_2_settings:dict=None, fleet_name:str=fleet.DEFAULT_FLEET, show_results:bool=True, seed:int=None) -> dict:
+    """
+    Play a batch of headless matches between two bots with rendering disabled, alternating who shoots first.
+
+    Args:
+        board_rows (int): Number of rows on each game board.
+        board_columns (int): Number of columns on each game board.
+        max_games (int): Number of matches to play.
+        bot_1_settings (dict): Turn time and targeting of bot 1, see DEFAULT_BOT_SETTINGS. None for the defaults.
+        bot_2_settings (dict): Turn time and targeting of bot 2.
+        fleet_name (str): Name of the fleet from the fleet config both bots play with.
+        show_results (bool): True to print the summary at the end.
+        seed (int): Seed for the first match, each match after uses the next seed. None for unseeded matches.
+
+    Returns:
+        dict: Results with the wins of each bot, the winner and turns of every match, and the time taken.
+    """
+    fleet_template = fleet.get_fleet(fleet_name)
+    fleet_template.validate(board_rows, board_columns)
+    results = {"wins": {1: 0, 2: 0}, "winners": [], "turns": [], "time": 0.0}
+
+    # Each bot's targeting is created once and cleared for every match
+    strategies = [create_strategy(board_rows, board_columns, settings) for settings in (bot_1_settings, bot_2_settings)]
+    time_start = time()
+    try:
+        for game_number in range(max_games):
+            winner, turns = computer_match(board_rows, board_columns, fleet_template, bot_1_settings, bot_2_settings, bot_1_first=game_number % 2 == 0,
+                                           seed=None if seed is None else seed + game_number, strategies=strategies)
+            results["wins"][winner] += 1
+            results["winners"].append(winner)
+            results["turns"].append(turns)
+    finally:
+        for strategy in strategies:
+            close_strategy(strategy)
+    results["time"] = time() - time_start
+
+    if show_results:
+        print("Game Over")
+        print(f"Total Games: {max_games}")
+        if max_games > 0:
+            for number in (1, 2):
+                print(f"Computer {number} Wins: {results['wins'][number]} ({results['wins'][number] / max_games:.1%})")
+            print(f"Average Winning Turns: {sum(results['turns']) / max_games}")
+            print(f"Games per Second: {max_games / max(results['time'], 1e-9):.1f}")
+    return results
 
 def bot_test():
     rows = 10
@@ -289,6 +711,9 @@ def bot_test():
     time_end = time()
     print(f"Total Time: {time_end - time_start}")
 
+def match_test():
+    computer_vs_computer(board_rows=10, board_columns=10, max_games=1000, bot_1_settings={"turn_time": 0.0}, bot_2_settings={"density_targeting": True})
+
 def player_test():
     player_vs_computer(board_rows=10, board_columns=10, bot_turn_time=1.0, debug_mode=True)
 
@@ -0,0 +1,241 @@
+""" Frozen corpus of fleet layouts for reproducible benchmarks
+
+    Benchmarks that place ships with Ship.random_place are only as reproducible as the random state behind them,
+    and placing ships costs time every game. A corpus is a file of fleet layouts generated once with random_place,
+    so they are placed exactly as in normal play, and written as fixed width records. Runners memory map the file
+    and place the ships of layout i straight from its record, so every experiment plays the same layouts, in the
+    same order, with no placement cost beyond putting the ships on the board.
+
+    Layouts are generated in chunks, each from its own seed, so a corpus is the same whatever the number of worker
+    processes used to build it.
+
+    File format: a 36 byte header (magic, version, rows, columns, ships, layouts, seed as little endian), the length
+    of each ship as uint32, then one record per layout. A record is the bow row and column (uint32) and direction
+    (uint8, an index into DIRECTIONS) of each ship, in fleet order, little endian.
+
+    Run this file to build a corpus, eg.
+        python layoutCorpus.py --rows 10 --columns 10 --fleet Standard --layouts 1000000
+
+    Classes:
+        LayoutCorpus:
+            Memory mapped corpus file, layouts are read by index.
+
+    Functions:
+        build_corpus(rows: int, columns: int, fleet_template: FleetTemplate, layouts: int, seed: int, workers: int) -> str:
+            Generate layouts and write them to the corpus file.
+
+        load_corpus(path: str, fleet_template: FleetTemplate) -> LayoutCorpus:
+            Memory map a corpus file, shared by every caller in the process.
+"""
+from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+import os
+import random
+import struct
+import threading
+import fleet
+import gameFunctions
+import sparseBoard
+from ship import DIRECTIONS, Layout, place_fleet
+
+CORPUS_DIR: str = gameFunctions.data_dir("corpus")
+CORPUS_MAGIC: bytes = b"BSLC"
+CORPUS_VERSION: int = 1
+HEADER = struct.Struct("<4sIIIIQQ") # Magic, version, rows, columns, ships, layouts, seed
+CHUNK_LAYOUTS: int = 10000 # Layouts per chunk, each chunk is generated from its own seed
+
+_loaded: Dict[str, "LayoutCorpus"] = {} # Corpora already mapped, by file path
+_lock = threading.Lock() # Guards _loaded, games in different threads can load a corpus at the same time
+
+
+def record_struct(ships: int) -> struct.Struct:
+    """
+    Struct of one layout record for a fleet of a number of ships.
+    """
+    return struct.Struct("<" + "IIB" * ships)
+
+
+def corpus_path(rows: int, columns: int, fleet_template: fleet.FleetTemplate, seed: int = 0) -> str:
+    """
+    Path of the corpus file for a board size, fleet and seed.
+    """
+    lengths = "-".join(str(length) for length in fleet_template.ship_lengths)
+    return os.path.join(CORPUS_DIR, f"{rows}x{columns}_{lengths}_seed{seed}.layouts")
+
+
+def generate_chunk(rows: int, columns: int, fleet_name: str, seed: int, chunk: int, layouts: int) -> bytes:
+    """
+    Generate one chunk of layouts with Ship.random_place and pack them into records. Run in pool workers.
+    One board is reused for the whole chunk, ships are cleared off it after each layout.
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        fleet_name (str): Name of the fleet from the fleet config.
+        seed (int): Seed of the corpus.
+        chunk (int): Number of the chunk, the chunk's random generator is seeded from the seed and this.
+        layouts (int): Layouts in the chunk.
+
+    Returns:
+        bytes: The packed records.
+    """
+    rng = random.Random(f"{seed} {chunk}")
+    board = sparseBoard.create_board(rows, columns).board # Sparse if the board is very large
+    ships = fleet.get_fleet(fleet_name).create_ships()
+    record = record_struct(len(ships))
+    direction_index = {direction: index for index, direction in enumerate(DIRECTIONS)}
+    data = bytearray(record.size * layouts)
+    for layout in range(layouts):
+        values = []
+        place_fleet(board, ships, rows, columns, rng=rng)
+        for ship in ships:
+            values += (ship.bow_coord[0], ship.bow_coord[1], direction_index[ship.direction])
+        record.pack_into(data, layout * record.size, *values)
+        for ship in ships:
+            ship.clear_ship(board)
+    return bytes(data)
+
+
+def build_corpus(rows: int, columns: int, fleet_template: fleet.FleetTemplate, layouts: int, seed: int = 0, workers: int = None,
+                 path: str = None) -> str:
+    """
+    Generate a corpus of layouts and write it to a file, replacing any existing one in a single step.
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        fleet_template (FleetTemplate): Fleet to place, must be in the fleet config so workers can look it up.
+        layouts (int): Number of layouts.
+        seed (int): Seed of the corpus, the same seed always gives the same layouts.
+        workers (int): Worker processes, None for one per CPU, 0 or 1 to generate in this process.
+        path (str): File to write, None for corpus_path.
+
+    Returns:
+        str: Path of the corpus file.
+    """
+    fleet_template.validate(rows, columns)
+    if path is None:
+        path = corpus_path(rows, columns, fleet_template, seed)
+    lengths = fleet_template.ship_lengths
+    chunks = [(chunk, min(CHUNK_LAYOUTS, layouts - start)) for chunk, start in enumerate(range(0, layouts, CHUNK_LAYOUTS))]
+    arguments = ([rows] * len(chunks), [columns] * len(chunks), [fleet_template.name] * len(chunks), [seed] * len(chunks),
+                 [chunk for chunk, _ in chunks], [size for _, size in chunks])
+
+    with gameFunctions.atomic_write(path) as file:
+        file.write(HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, rows, columns, len(lengths), layouts, seed))
+        file.write(struct.pack(f"<{len(lengths)}I", *lengths))
+        if workers is not None and workers <= 1:
+            for data in map(generate_chunk, *arguments):
+                file.write(data)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for data in pool.map(generate_chunk, *arguments): # In chunk order, so the file is the same for any number of workers
+                    file.write(data)
+    with _lock:
+        _loaded.pop(os.path.abspath(path), None) # Anything still using the old map keeps it, new callers map the new file
+    return path
+
+
+class LayoutCorpus:
+    """
+    Memory mapped corpus file. Layouts are unpacked from their record when asked for, so opening a corpus of millions
+    of layouts costs nothing and only the pages read are loaded. Read only, safe to share between threads.
+    Use as a context manager, or call close.
+
+    Attributes:
+        path (str): The corpus file.
+        rows (int): Number of rows of the board the layouts are for.
+        columns (int): Number of columns of the board the layouts are for.
+        ship_lengths (List[int]): Length of each ship, in fleet order.
+        seed (int): Seed the corpus was generated from.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Corpus file written by build_corpus.
+
+        Raises:
+            ValueError: If the file isn't a corpus file or is truncated.
+        """
+        self.path: str = path
+        with open(path, "rb") as file:
+            self.mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, self.columns, ships, self.layouts, self.seed = HEADER.unpack_from(self.mapped)
+        if magic != CORPUS_MAGIC or version != CORPUS_VERSION:
+            self.mapped.close()
+            raise ValueError(f"{path} is not a version {CORPUS_VERSION} layout corpus")
+        self.ship_lengths: List[int] = list(struct.unpack_from(f"<{ships}I", self.mapped, HEADER.size))
+        self.record = record_struct(ships)
+        self.offset: int = HEADER.size + 4 * ships # Where the records start
+        if len(self.mapped) != self.offset + self.record.size * self.layouts:
+            self.mapped.close()
+            raise ValueError(f"{path} is truncated")
+
+    def __len__(self) -> int:
+        return self.layouts
+
+    def layout(self, index: int) -> Layout:
+        """
+        The bow row, bow column and direction of each ship of layout index.
+        """
+        if not 0 <= index < self.layouts:
+            raise IndexError(f"Layout {index} is out of range, {self.path} has {self.layouts} layouts")
+        values = self.record.unpack_from(self.mapped, self.offset + index * self.record.size)
+        return tuple((values[i], values[i + 1], DIRECTIONS[values[i + 2]]) for i in range(0, len(values), 3))
+
+    def close(self) -> None:
+        self.mapped.close()
+
+    def __enter__(self) -> "LayoutCorpus":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def load_corpus(path: str, fleet_template: fleet.FleetTemplate = None) -> LayoutCorpus:
+    """
+    Memory map a corpus file. The file is only mapped the first time it is asked for, and the map is shared by every
+    caller in the process, so don't close it.
+
+    Args:
+        path (str): Corpus file written by build_corpus.
+        fleet_template (FleetTemplate): Fleet the layouts will be placed for, None to not check.
+
+    Returns:
+        LayoutCorpus: The mapped corpus.
+
+    Raises:
+        ValueError: If the file isn't a corpus file, is truncated or is for a different fleet.
+    """
+    path = os.path.abspath(path)
+    with _lock:
+        if path not in _loaded:
+            _loaded[path] = LayoutCorpus(path)
+        corpus = _loaded[path]
+    if fleet_template is not None and corpus.ship_lengths != fleet_template.ship_lengths:
+        raise ValueError(f"{path} is for ships of length {corpus.ship_lengths}, not the {fleet_template.name} fleet")
+    return corpus
+
+
+if __name__ == "__main__":
+    import argparse
+    from time import perf_counter
+    parser = argparse.ArgumentParser(description="Build a corpus of fleet layouts for a board size and fleet")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--fleet", default=fleet.DEFAULT_FLEET, help="Fleet name from the fleet config")
+    parser.add_argument("--layouts", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, default one per CPU")
+    parser.add_argument("--output", default=None, help="Corpus file, default in the corpus directory")
+    args = parser.parse_args()
+
+    template = fleet.get_fleet(args.fleet)
+    time_start = perf_counter()
+    written = build_corpus(args.rows, args.columns, template, args.layouts, args.seed, args.workers, args.output)
+    print(f"Wrote {args.layouts} layouts to {written} ({os.path.getsize(written) / 2 ** 20:.1f} MiB) in {perf_counter() - time_start:.2f}s")
+    corpus = load_corpus(written, template)
+    print(f"Layout 0: {corpus.layout(0)}")
@@ -8,16 +8,28 @@ import ANSI
 import gameModes
 import gameFunctions
 import playerInput
+import fleet
+import opponentModel
+import gameCheckpoint
+import strategyTuner
+import os
 
-# Global Settings
-debug_mode:bool = False
-default_board_rows:int = 10
-default_board_columns:int = 10
+class Settings:
+    """
+    Settings chosen in the settings menu. One is created in main and passed to each menu, instead of module globals.
+    """
+    def __init__(self):
+        self.debug_mode:bool = False
+        self.default_board_rows:int = 10
+        self.default_board_columns:int = 10
+        self.default_fleet:str = fleet.DEFAULT_FLEET
+        self.habit_blend:float = opponentModel.DEFAULT_BLEND
 
 def main():
     # Initialize colorama for cross-platform compatibility
     ANSI.colorama.init()
 
+    settings = Settings()
     splash_screen()
 
     while True:
@@ -27,20 +39,23 @@ def main():
         print("1. Player vs Player")
         print("2. Player vs Computer")
         print("3. Computer Solo")
-        print("4. Settings")
-        print("5. Exit")
+        print("4. Computer vs. Computer")
+        print("5. Settings")
+        print("6. Exit")
 
-        choice = playerInput.player_input_int("Enter your choice (1-5): ", 1, 5)
+        choice = playerInput.player_input_int("Enter your choice (1-6): ", 1, 6)
 
         if choice == 1: # Player vs. Player
             gamemode_1()
         elif choice == 2: # Player vs. Computer
-            gamemode_2()
+            gamemode_2(settings)
         elif choice == 3: # Computer Solo
-            gamemode_3()
-        elif choice == 4: # Setting Menu
-            settings_menu()
-        elif choice == 5: # Exit game
+            gamemode_3(settings)
+        elif choice == 4: # Computer vs. Computer
+            gamemode_4(settings)
+        elif choice == 5: # Setting Menu
+            settings_menu(settings)
+        elif choice == 6: # Exit game
             break
         else:
             print("Invalid choice, please try again.")
@@ -73,33 +88,44 @@ def splash_screen():
     """)
     playerInput.player_input_continue("\t\t\t\t" + ANSI.FG_BRIGHT_GREEN + "Press enter to continue" + ANSI.RESET)
 
-def settings_menu():
+def settings_menu(settings:Settings):
     """
     Displays the settings menu and allows the user to change game settings.
 
         Settings:   Debug Mode
                     Board Size
+                    Fleet
+                    Player Habits
     """
     while True:
         gameFunctions.clear_console()
-        global debug_mode
-        global default_board_rows
-        global default_board_columns
         print(ANSI.FG_BRIGHT_CYAN + "Settings Menu" + ANSI.RESET)
-        print(f"1. Debug Mode: {'On' if debug_mode else 'Off'}")
-        print(f"2. Board Size: Rows = {default_board_rows}, Columns = {default_board_columns}")
-        print("3. Back")
-        choice = playerInput.player_input_int("Enter your choice (1-2): ", 1, 3)
+        print(f"1. Debug Mode: {'On' if settings.debug_mode else 'Off'}")
+        print(f"2. Board Size: Rows = {settings.default_board_rows}, Columns = {settings.default_board_columns}")
+        print(f"3. Fleet: {settings.default_fleet}")
+        print(f"4. Learn Player Habits: {settings.habit_blend}")
+        print("5. Back")
+        choice = playerInput.player_input_int("Enter your choice (1-5): ", 1, 5)
 
         if choice == 1: # Set debug mode
-            debug_mode = playerInput.player_input_confirm("Debug Mode On?")
+            settings.debug_mode = playerInput.player_input_confirm("Debug Mode On?")
 
         elif choice == 2: # Set board size
             print("Set Default Board Size")
-            default_board_rows = playerInput.player_input_int("Number of Rows? (1-1000): ", 1, 1000)
-            default_board_columns = playerInput.player_input_int("Number of Columns? (1-1000): ", 1, 1000)
+            settings.default_board_rows = playerInput.player_input_int("Number of Rows? (1-1000): ", 1, 1000)
+            settings.default_board_columns = playerInput.player_input_int("Number of Columns? (1-1000): ", 1, 1000)
 
-        elif choice == 3: # Back
+        elif choice == 3: # Set fleet
+            fleet_names = list(fleet.load_fleets())
+            for i, name in enumerate(fleet_names):
+                template = fleet.get_fleet(name)
+                print(f"{i + 1}. {name}: {len(template.ships)} ships, lengths {template.ship_lengths}")
+            settings.default_fleet = fleet_names[playerInput.player_input_int(f"Select fleet (1-{len(fleet_names)}): ", 1, len(fleet_names)) - 1]
+
+        elif choice == 4: # Set how much the computer uses where players put ships in earlier games
+            settings.habit_blend = playerInput.player_input_float("How much should the computer search where you put ships before? (0.0-1.0): ", 0, 1.0)
+
+        elif choice == 5: # Back
             break
 
 # Player vs. Player
@@ -109,11 +135,23 @@ def gamemode_1():
     playerInput.player_input_continue(ANSI.FG_BRIGHT_GREEN + "Press enter to return to main menu" + ANSI.RESET)
 
 # Player vs. Computer
-def gamemode_2():
+def gamemode_2(settings:Settings):
     # Options to set
-    rows = default_board_rows
-    columns = default_board_columns
+    rows = settings.default_board_rows
+    columns = settings.default_board_columns
     turn_time:float = 1 # How long the bot sleeps for between turns
+    salvo:bool = False # Each side fires one shot for every ship it has afloat each turn
+
+    # Offer to carry on with a game that was closed before it finished
+    saved = gameCheckpoint.read_run(gameCheckpoint.PLAYER_CHECKPOINT)
+    if saved is not None and saved["settings"]["fleet"] == settings.default_fleet:
+        gameFunctions.clear_console()
+        if playerInput.player_input_confirm(f"Resume your unfinished {saved['settings']['rows']}x{saved['settings']['columns']} game from turn {saved['turns'] + 1}?"):
+            gameModes.player_vs_computer(board_rows=saved["settings"]["rows"], board_columns=saved["settings"]["columns"], bot_turn_time=saved["settings"]["bot_turn_time"],
+                                         debug_mode=settings.debug_mode, fleet_name=saved["settings"]["fleet"], habit_blend=saved["settings"]["habit_blend"],
+                                         salvo=saved["settings"].get("salvo", False), checkpoint_file=gameCheckpoint.PLAYER_CHECKPOINT, resume=True)
+            playerInput.player_input_continue(ANSI.FG_BRIGHT_GREEN + "Press enter to return to main menu" + ANSI.RESET)
+            return
 
     while True:
         gameFunctions.clear_console()
@@ -121,10 +159,11 @@ def gamemode_2():
         print("Set game options")
         print(f"1. Board dimensions: {rows, columns}")
         print(f"2. Computer Turn Time: {turn_time} seconds")
-        print(f"3. Start game")
-        print(f"4. Back")
+        print(f"3. Salvo: {salvo}")
+        print(f"4. Start game")
+        print(f"5. Back")
 
-        choice = playerInput.player_input_int("Enter your choice (1-4): ", 1, 4)
+        choice = playerInput.player_input_int("Enter your choice (1-5): ", 1, 5)
 
         if choice == 1: # Set board size
             print("Set Board Size")
@@ -132,24 +171,51 @@ def gamemode_2():
             columns = playerInput.player_input_int("Number of Columns? (1-64): ", 1, 64)
         elif choice == 2: # Turn time
             turn_time = playerInput.player_input_float("How long is the computers turn in seconds? (0.0-10.0): ", 0, 10.0)
-        elif choice == 3: # Start game
+        elif choice == 3: # Salvo
+            salvo = playerInput.player_input_confirm("Fire one shot for each ship afloat every turn?")
+        elif choice == 4: # Start game
+            try:
+                fleet.get_fleet(settings.default_fleet).validate(rows, columns)
+            except ValueError as e:
+                playerInput.player_input_continue(f"{e}, press enter to continue")
+                continue
             break
-        elif choice == 4: # Back
+        elif choice == 5: # Back
             return
 
-    gameModes.player_vs_computer(board_rows=rows, board_columns=columns, bot_turn_time=turn_time, debug_mode=debug_mode)
+    gameModes.player_vs_computer(board_rows=rows, board_columns=columns, bot_turn_time=turn_time, debug_mode=settings.debug_mode, fleet_name=settings.default_fleet,
+                                 habit_blend=settings.habit_blend, salvo=salvo, checkpoint_file=gameCheckpoint.PLAYER_CHECKPOINT)
     playerInput.player_input_continue(ANSI.FG_BRIGHT_GREEN + "Press enter to return to main menu" + ANSI.RESET)
 
 # Computer Solo
-def gamemode_3():
+def gamemode_3(settings:Settings):
     # Options to set
-    rows = default_board_rows
-    columns = default_board_columns
+    rows = settings.default_board_rows
+    columns = settings.default_board_columns
     games:int = 1 # Max number of games the bot will play
     show_turn:bool = True # Show every turn the bot makes
     show_end:bool = True # Show the winning game board, this allows only showing the end and not every turn
     turn_time:float = 0.1 # How long the bot sleeps for between turns
     clear_screen:bool = True # Clear the screen between turns, can turn off to look back at previous turns
+    stats_file:str = None # File live progress stats are written to, for watching long runs
+    density:bool = False # Search by placement density, with repeated board states looked up in a cache
+    density_workers:int = None # Processes counting placement density, None for one per CPU on large boards
+    endgame:bool = False # Solve the last shots exactly once few fleet configurations are left
+    move_budget:float = None # Pick the targeting strategy that fits this many seconds a move, instead of the density and endgame options
+    checkpoint:bool = False # Checkpoint the run every few seconds and when quit, so it can be resumed
+    resume:bool = False
+
+    # Offer to carry on with a run that was quit before it finished, with the settings it was started with
+    saved = gameCheckpoint.read_run(gameCheckpoint.SOLO_CHECKPOINT)
+    if saved is not None and saved["settings"]["fleet"] == settings.default_fleet and saved["settings"]["seed"] is None \
+            and saved["settings"]["corpus_file"] is None and saved["settings"]["sample_fleets"] == 0: # Only runs started from this menu
+        gameFunctions.clear_console()
+        if playerInput.player_input_confirm(f"Resume the unfinished run, {saved['games_finished']} of {saved['settings']['max_games']} games played?"):
+            rows, columns = saved["settings"]["rows"], saved["settings"]["columns"]
+            games = saved["settings"]["max_games"]
+            density = saved["settings"]["density_targeting"]
+            endgame = saved["settings"]["endgame_solver"]
+            checkpoint = resume = True
     
     while True:
         gameFunctions.clear_console()
@@ -162,17 +228,23 @@ def gamemode_3():
         print(f"4. Show final turn: {show_end}")
         print(f"5. Clear screen between turns: {clear_screen}")
         print(f"6. Turn time: {turn_time} seconds")
-        print(f"7. Start game")
-        print(f"8. Back")
+        print(f"7. Live stats file: {stats_file}")
+        print(f"8. Density targeting: {density}")
+        print(f"9. Density targeting processes: {'one per CPU on large boards' if density_workers is None else density_workers}")
+        print(f"10. Endgame solver: {endgame}")
+        print(f"11. Pick strategy by move time: {move_budget if move_budget is None else f'{move_budget} seconds'}")
+        print(f"12. Checkpoint the run: {checkpoint}")
+        print(f"13. Start game")
+        print(f"14. Back")
 
-        choice = playerInput.player_input_int("Enter your choice (1-8): ", 1, 8)
+        choice = playerInput.player_input_int("Enter your choice (1-14): ", 1, 14)
 
         if choice == 1: # Numbers of games
             games = playerInput.player_input_int("How many games will the computer play? (0-999999): ", 0, 999999)
         elif choice == 2: # Set board size
             print("Set Board Size")
-            rows = playerInput.player_input_int("Number of Rows? (1-1000): ", 1, 1000)
-            columns = playerInput.player_input_int("Number of Columns? (1-1000): ", 1, 1000)
+            rows = playerInput.player_input_int("Number of Rows? (1-100000): ", 1, 100000)
+            columns = playerInput.player_input_int("Number of Columns? (1-100000): ", 1, 100000)
         elif choice == 3: # Show turns
             show_turn = playerInput.player_input_confirm("Show every turn the computer plays?")
         elif choice == 4: # Show end
@@ -181,11 +253,35 @@ def gamemode_3():
             clear_screen = playerInput.player_input_confirm("Clear the console screen between turns?")
         elif choice == 6: # Turn time
             turn_time = playerInput.player_input_float("How long is the computers turn in seconds? (0.0-10.0): ", 0, 10.0)
-        elif choice == 7: # Start game
+        elif choice == 7: # Stats file
+            stats_file = "battleship_stats.txt" if playerInput.player_input_confirm("Write live progress stats to battleship_stats.txt?") else None
+        elif choice == 8: # Density targeting
+            density = playerInput.player_input_confirm("Search where the most ship placements fit instead of the checkboard pattern?")
+        elif choice == 9: # Density targeting processes
+            density_workers = None
+            if not playerInput.player_input_confirm("Use one process per CPU to count placement density on large boards?"):
+                density_workers = playerInput.player_input_int(f"How many processes? (1-{os.cpu_count() or 1}): ", 1, os.cpu_count() or 1)
+        elif choice == 10: # Endgame solver
+            endgame = playerInput.player_input_confirm("Work out the best shots exactly once only a few ship placements are left?")
+        elif choice == 11: # Strategy by move time
+            move_budget = None
+            if playerInput.player_input_confirm("Pick the targeting strategy from how long each move takes on this computer?"):
+                move_budget = playerInput.player_input_float("How long can a move take in seconds? (0.0-10.0): ", 0, 10.0)
+        elif choice == 12: # Checkpoints
+            checkpoint = playerInput.player_input_confirm("Checkpoint the run every few seconds so it can be resumed if it is quit?")
+        elif choice == 13: # Start game
+            try:
+                fleet.get_fleet(settings.default_fleet).validate(rows, columns)
+            except ValueError as e:
+                playerInput.player_input_continue(f"{e}, press enter to continue")
+                continue
             break
-        elif choice == 8: # Back
+        elif choice == 14: # Back
             return
 
+    if resume and (move_budget is not None or (rows, columns, games, density, endgame) != (saved["settings"]["rows"], saved["settings"]["columns"], saved["settings"]["max_games"],
+                                                                                       saved["settings"]["density_targeting"], saved["settings"]["endgame_solver"])):
+        resume = False # Settings were changed after choosing to resume, start a new run
     gameModes.computer_solo(board_rows=rows, 
                             board_columns=columns, 
                             max_games=games, 
@@ -193,9 +289,74 @@ def gamemode_3():
                             show_final_board=show_end, 
                             bot_slow_turn=True, 
                             bot_turn_time=turn_time,
-                            clear_screen_bewteen_turns=clear_screen)
+                            clear_screen_bewteen_turns=clear_screen,
+                            fleet_name=settings.default_fleet,
+                            stats_file=stats_file,
+                            density_targeting=density,
+                            endgame_solver=endgame,
+                            density_workers=density_workers,
+                            move_budget=move_budget,
+                            checkpoint_file=gameCheckpoint.SOLO_CHECKPOINT if checkpoint else None,
+                            resume=resume)
     print("Game Complete")
     playerInput.player_input_continue(ANSI.FG_BRIGHT_GREEN + "Press enter to return to main menu" + ANSI.RESET)
 
+# Computer vs. Computer
+def gamemode_4(settings:Settings):
+    # Options to set
+    rows = settings.default_board_rows
+    columns = settings.default_board_columns
+    games:int = 100 # Number of matches to play
+    # Targeting and turn time of each computer, targeting is a strategy from the strategy tuner
+    bots:list = [{"strategy": "checkboard", "turn_time": 0.0}, {"strategy": "checkboard", "turn_time": 0.0}]
+
+    while True:
+        gameFunctions.clear_console()
+        print(ANSI.FG_BRIGHT_CYAN + "Computer vs. Computer" + ANSI.RESET)
+        print("This game mode plays two computers against each other without showing the boards\n")
+        print("Set game options")
+        print(f"1. Number of games: {games}")
+        print(f"2. Board dimesnions: {rows, columns}")
+        print(f"3. Computer 1: {bots[0]['strategy']} targeting, {bots[0]['turn_time']} seconds per turn")
+        print(f"4. Computer 2: {bots[1]['strategy']} targeting, {bots[1]['turn_time']} seconds per turn")
+        print(f"5. Start game")
+        print(f"6. Back")
+
+        choice = playerInput.player_input_int("Enter your choice (1-6): ", 1, 6)
+
+        if choice == 1: # Numbers of games
+            games = playerInput.player_input_int("How many games will the computers play? (0-999999): ", 0, 999999)
+        elif choice == 2: # Set board size
+            print("Set Board Size")
+            rows = playerInput.player_input_int("Number of Rows? (1-100000): ", 1, 100000)
+            columns = playerInput.player_input_int("Number of Columns? (1-100000): ", 1, 100000)
+            for bot in bots: # Targeting that doesn't fit the new board goes back to the checkboard pattern
+                if bot["strategy"] not in strategyTuner.available_strategies(rows, columns):
+                    bot["strategy"] = "checkboard"
+        elif choice in (3, 4): # Computer 1 or 2 settings
+            bot = bots[choice - 3]
+            strategies = strategyTuner.available_strategies(rows, columns) # Only the targeting that fits the board
+            for number, strategy in enumerate(strategies):
+                print(f"{number + 1}. {strategy}")
+            bot["strategy"] = strategies[playerInput.player_input_int(f"Which targeting does computer {choice - 2} use? (1-{len(strategies)}): ", 1, len(strategies)) - 1]
+            bot["turn_time"] = playerInput.player_input_float(f"How long can computer {choice - 2} think each turn in seconds? (0.0-10.0): ", 0, 10.0)
+        elif choice == 5: # Start game
+            try:
+                fleet.get_fleet(settings.default_fleet).validate(rows, columns)
+            except ValueError as e:
+                playerInput.player_input_continue(f"{e}, press enter to continue")
+                continue
+            break
+        elif choice == 6: # Back
+            return
+
+    gameModes.computer_vs_computer(board_rows=rows,
+                                   board_columns=columns,
+                                   max_games=games,
+                                   bot_1_settings=dict(strategyTuner.STRATEGY_SETTINGS[bots[0]["strategy"]], turn_time=bots[0]["turn_time"]),
+                                   bot_2_settings=dict(strategyTuner.STRATEGY_SETTINGS[bots[1]["strategy"]], turn_time=bots[1]["turn_time"]),
+                                   fleet_name=settings.default_fleet)
+    playerInput.player_input_continue(ANSI.FG_BRIGHT_GREEN + "Press enter to return to main menu" + ANSI.RESET)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,167 @@
+""" Learn where human players like to put their ships
+
+    People don't place ships at random, they favour edges, corners or clusters and tend to do the same thing
+    game after game. After every player vs computer game the player's ship cells are added to a histogram for that
+    board size, kept in a small binary file. The bot turns the histogram into a weight per cell and blends it with
+    the uniform weight of 1, so cells the player keeps using are searched first.
+
+    File format: a 20 byte header (magic, version, rows, columns, games as little endian) then rows * columns
+    little endian uint32 counts of how many games had a ship on each cell, in row order.
+
+    Run this file to measure the effect against a simulated player who always hugs the edges, eg.
+        python opponentModel.py --games 200 --blend 0.5
+
+    Functions:
+        load_habits(rows: int, columns: int) -> Tuple[int, array]:
+            Read the histogram for a board size.
+
+        record_placement(rows: int, columns: int, ships: List[Ship]) -> None:
+            Add one game's ship cells to the histogram.
+
+        habit_weights(rows: int, columns: int, blend: float) -> array:
+            Weight of each cell for the bot's search, or None if nothing has been learnt yet.
+"""
+from typing import List, Tuple
+from array import array
+import os
+import struct
+import sys
+import gameFunctions
+from ship import Ship
+
+HABITS_DIR: str = gameFunctions.data_dir("habits")
+HABITS_MAGIC: bytes = b"BSHB"
+HABITS_VERSION: int = 1
+HEADER = struct.Struct("<4sIIII") # Magic, version, rows, columns, games
+DEFAULT_BLEND: float = 0.5 # How much the histogram counts against the uniform weight, 0 to ignore it
+
+
+def habits_path(rows: int, columns: int, directory: str = HABITS_DIR) -> str:
+    """
+    Path of the histogram file for a board size.
+    """
+    return os.path.join(directory, f"{rows}x{columns}.habits")
+
+
+def load_habits(rows: int, columns: int, directory: str = HABITS_DIR) -> Tuple[int, array]:
+    """
+    Read the histogram for a board size.
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        directory (str): Directory the histogram files are kept in.
+
+    Returns:
+        Tuple[int, array]: Number of games recorded and the uint32 count of each cell, indexed by row * columns + column.
+            (0, all zeros) if nothing has been recorded, or the file is unreadable.
+    """
+    counts = array("I", [0]) * (rows * columns)
+    path = habits_path(rows, columns, directory)
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return 0, counts
+    if len(data) != HEADER.size + rows * columns * 4:
+        return 0, counts
+    magic, version, file_rows, file_columns, games = HEADER.unpack_from(data)
+    if magic != HABITS_MAGIC or version != HABITS_VERSION or (file_rows, file_columns) != (rows, columns):
+        return 0, counts # Not worth stopping a game over, start learning again
+    counts = array("I", data[HEADER.size:])
+    if sys.byteorder == "big":
+        counts.byteswap() # Files are always little endian
+    return games, counts
+
+
+def record_placement(rows: int, columns: int, ships: List[Ship], directory: str = HABITS_DIR) -> None:
+    """
+    Add one game's ship cells to the histogram for the board size, replacing the file in a single step.
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        ships (List[Ship]): The player's placed ships.
+        directory (str): Directory the histogram files are kept in.
+    """
+    games, counts = load_habits(rows, columns, directory)
+    for ship in ships:
+        for row, column in ship.occupied_cells:
+            counts[row * columns + column] += 1
+    if sys.byteorder == "big":
+        counts.byteswap()
+
+    path = habits_path(rows, columns, directory)
+    with gameFunctions.atomic_write(path) as file:
+        file.write(HEADER.pack(HABITS_MAGIC, HABITS_VERSION, rows, columns, games + 1))
+        counts.tofile(file)
+
+
+def habit_weights(rows: int, columns: int, blend: float = DEFAULT_BLEND, directory: str = HABITS_DIR) -> array:
+    """
+    Weight of each cell for the bot's search. A cell's habit weight is how often it had a ship compared to the average
+    cell, so 1 is average, and it is blended with the uniform weight of 1:
+        weight = (1 - blend) + blend * habit weight
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        blend (float): 0 to ignore the histogram, 1 to only use it.
+        directory (str): Directory the histogram files are kept in.
+
+    Returns:
+        array: Float32 weight of each cell, indexed by row * columns + column, or None if blend is 0 or no games have been recorded.
+    """
+    if blend <= 0:
+        return None
+    games, counts = load_habits(rows, columns, directory)
+    total = sum(counts)
+    if games == 0 or total == 0:
+        return None
+    scale = blend * len(counts) / total # Habit weight of a cell is count * cells / total
+    return array("f", ((1 - blend) + scale * count for count in counts))
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import tempfile
+    from gameContext import GameContext
+    parser = argparse.ArgumentParser(description="Compare shots needed against a player who always places ships on the edges")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--games", type=int, default=200, help="Games to learn from, then games to measure")
+    parser.add_argument("--blend", type=float, default=DEFAULT_BLEND)
+    parser.add_argument("--turn-time", type=float, default=0.0, help="Bot thinking time per shot, the player vs computer default is 1")
+    args = parser.parse_args()
+
+    def place_on_edges(context: GameContext, board) -> List[Ship]:
+        # Simulated habit: every ship touches the edge of the board
+        ships = context.fleet_template.create_ships()
+        for ship in ships:
+            while True:
+                ship.random_place(board.board, context.rows, context.columns, rng=context.rng)
+                if any(row in (0, context.rows - 1) or column in (0, context.columns - 1) for row, column in ship.occupied_cells):
+                    break
+        return ships
+
+    def play(seed: int, weights: array) -> Tuple[int, List[Ship]]:
+        context = GameContext(args.rows, args.columns, seed=seed)
+        board = context.create_board()
+        ships = place_on_edges(context, board)
+        bot = context.create_bot()
+        bot.habits = weights
+        bot.search_generate()
+        turns = 0
+        while not all(ship.is_sunk for ship in ships):
+            turns += 1
+            bot.bot_turn(board.board, time_budget=args.turn_time)
+        return turns, ships
+
+    with tempfile.TemporaryDirectory() as directory:
+        for seed in range(args.games):
+            record_placement(args.rows, args.columns, play(seed, None)[1], directory)
+        weights = habit_weights(args.rows, args.columns, args.blend, directory)
+        for name, game_weights in (("Uniform", None), (f"Blend {args.blend}", weights)):
+            turns = [play(random.Random(seed).randrange(2 ** 31), game_weights)[0] for seed in range(args.games)]
+            print(f"{name}: average {sum(turns) / len(turns):.2f} shots over {len(turns)} games")
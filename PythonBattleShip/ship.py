@@ -9,10 +9,21 @@
         
         validate_ship_placement(board: List[List[dict]], ship: dict, row: int, column: int, direction: str) -> bool:
             Validate if a ship can be placed at the specified coordinates and direction.
+
+        place_layout(board: gameBoard, ships: List[Ship], layout: Layout) -> bool:
+            Place ships on a board as given by a layout.
+
+        place_fleet(board: List[List[dict]], ships: List[Ship], board_rows: int, board_columns: int, rng: random.Random) -> None:
+            Randomly place every ship of a fleet, starting again if the ships placed so far leave no room.
 """
 from typing import List, Tuple
 import random
-from gameBoard import cell_state
+from gameBoard import cell_state, gameBoard, record_changes
+
+DIRECTIONS: Tuple[str, ...] = ("up", "down", "left", "right")
+Layout = Tuple[Tuple[int, int, str], ...] # Bow row, bow column and direction of each ship, in fleet order
+PLACE_ATTEMPTS_PER_CELL: int = 8 # Random placements tried per board cell before a ship gives up, 4 directions each
+MAX_FLEET_ATTEMPTS: int = 100 # Times a fleet is placed from scratch before it is taken as not fitting
 
 
 class Ship:
@@ -110,12 +121,13 @@ class Ship:
                 board[row][column + i]['ship'] = self
                 self.occupied_cells.append((row, column + i))
 
+        record_changes(board, self.occupied_cells)
         self.bow_coord = (row, column)
         self.direction = direction
         self.is_placed = True
         return True # To indicate successful placement
 
-    def random_place(self, board:List[List[dict]], board_rows:int, board_columns:int):
+    def random_place(self, board:List[List[dict]], board_rows:int, board_columns:int, rng:random.Random=None):
         """
         Randomly place a ship on the board.
 
@@ -124,22 +136,25 @@ class Ship:
             board: The game board the ship is being place on.
             board_rows: Number of rows the game board has.
             board_columns: Number of columns the game board has.
+            rng: Random number generator to use, pass one per game when games run in threads. None uses the random module.
 
-        Returns:
-            bool: True if ship was succesfully place, if not place for whatever reason it will return False.
+        Raises:
+            ValueError: If no place was found in PLACE_ATTEMPTS_PER_CELL tries per cell, eg. the board is full.
         """
         # Just uses the place function with a random direction and location chosen
+        if rng is None:
+            rng = random
+        max_attempts:int = max(100, PLACE_ATTEMPTS_PER_CELL * board_rows * board_columns)
         attempts:int = 0
         while True:
             attempts += 1
-            random_row = random.randint(0, board_rows - 1)
-            random_column = random.randint(0, board_columns - 1)
-            direction_str = ('up', 'down', 'left', 'right')
-            random_direction = direction_str[random.randint(0, 3)]
+            random_row = rng.randint(0, board_rows - 1)
+            random_column = rng.randint(0, board_columns - 1)
+            random_direction = DIRECTIONS[rng.randint(0, 3)]
             if self.place(board, random_row, random_column, random_direction, board_rows, board_columns):
                 break # If the ship is succesfully placed then exit the loop
-            if attempts > 100:
-                ValueError("Error: Bot cannot place ship randomly")
+            if attempts >= max_attempts:
+                raise ValueError(f"{self.name} can't be placed randomly on a {board_rows}x{board_columns} board")
 
     def check_sunk(self) -> bool:
         """ Check if the ship is sunk. A ship is sunk if it has been hit as many times as its length.
@@ -155,6 +170,7 @@ class Ship:
     def clear_ship(self, board: List[List[dict]]):
         for coord in self.occupied_cells:
             board[coord[0]][coord[1]] = cell_state.copy()
+        record_changes(board, self.occupied_cells)
         self.occupied_cells = [] # Clear if being replaced
         self.bow_coord = None
         self.direction = None
@@ -171,3 +187,42 @@ class Ship:
         print(f"Hit Count: {self.hits}")
         print(f"is_placed: {self.is_placed}")
         print(f"is_sunk: {self.is_sunk}")
+
+
+def place_layout(board: gameBoard, ships: List[Ship], layout: Layout) -> bool:
+    """
+    Place ships on a board as given by a layout.
+
+    Returns:
+        bool: False if any ship can't be placed there, the board is left part placed.
+    """
+    for ship, (row, column, direction) in zip(ships, layout):
+        if not ship.place(board.board, row, column, direction, board.rows, board.columns):
+            return False
+    return True
+
+
+def place_fleet(board: List[List[dict]], ships: List[Ship], board_rows: int, board_columns: int, rng: random.Random = None) -> None:
+    """
+    Randomly place every ship of a fleet. A fleet that fits the board can still be placed so that the last ships
+    have no room, so then every ship is taken off the board and the fleet is placed again.
+
+    Args:
+        board: The game board the ships are being placed on.
+        ships: Ships to place, in fleet order.
+        board_rows: Number of rows the game board has.
+        board_columns: Number of columns the game board has.
+        rng: Random number generator to use, None uses the random module.
+
+    Raises:
+        ValueError: If the fleet could not be placed in MAX_FLEET_ATTEMPTS tries, eg. the ships can't be packed onto the board.
+    """
+    for _ in range(MAX_FLEET_ATTEMPTS):
+        try:
+            for ship in ships:
+                ship.random_place(board, board_rows, board_columns, rng=rng)
+            return
+        except ValueError:
+            for ship in ships:
+                ship.clear_ship(board)
+    raise ValueError(f"Ships of lengths {[ship.length for ship in ships]} could not be placed on a {board_rows}x{board_columns} board")
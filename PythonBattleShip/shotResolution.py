@@ -0,0 +1,165 @@
+""" Resolving shots on a board, one at a time or a whole salvo at once
+
+    Every shot is resolved the same way whoever fires it: the cell is marked shot, and if a ship is on it the ship
+    takes a hit and is checked for sinking. resolve_shot does this for one shot, for the bot's turns and the player's.
+
+    In the salvo variant each side fires several shots a turn, one for each of its ships still afloat, and only hears
+    what they hit once the whole salvo has landed. resolve_salvo takes the salvo's cells and resolves them in one pass,
+    returning what each shot hit and sank and whether the fleet is finished together. The per salvo work (looking up
+    the board's storage, checking the fleet for game over) is done once, and on sparse boards the cells are resolved
+    straight against the board's sets of flat indexes instead of through a cell object per shot.
+
+    Classes:
+        SalvoResult:
+            What each shot of a salvo hit and sank, and whether the fleet is finished.
+
+    Functions:
+        resolve_shot(board: List[List[dict]], cell: Tuple[int, int]) -> Tuple[bool, Ship]:
+            Fire one shot.
+
+        resolve_salvo(board: List[List[dict]], cells: Sequence[Tuple[int, int]], fleet: Sequence[Ship]) -> SalvoResult:
+            Fire a salvo.
+
+        salvo_size(fleet: Sequence[Ship]) -> int:
+            Shots in a salvo, one for each ship still afloat.
+"""
+from typing import TYPE_CHECKING, List, NamedTuple, Sequence, Tuple
+from gameBoard import record_changes
+
+if TYPE_CHECKING: # Only named in annotations
+    from ship import Ship
+
+
+class SalvoResult(NamedTuple):
+    """
+    What a salvo did, shot by shot in the order the cells were given.
+
+    Attributes:
+        hits (List[bool]): True for each shot that hit a ship.
+        sunk (List[Ship]): The ship each shot sank, None if it didn't sink one.
+        game_over (bool): True if every ship of the fleet is sunk, False if no fleet was given.
+    """
+    hits: List[bool]
+    sunk: List["Ship"]
+    game_over: bool
+
+
+def resolve_shot(board: List[List[dict]], cell: Tuple[int, int]) -> Tuple[bool, "Ship"]:
+    """
+    Fire one shot at an unshot cell: mark it shot, and hit the ship on it if there is one.
+
+    Args:
+        board (List[List[dict]]): Cells of the board being shot at.
+        cell (Tuple[int, int]): Row and column of the shot.
+
+    Returns:
+        Tuple[bool, Ship]: True if the shot hit a ship, and the ship if the shot sank it, otherwise None.
+    """
+    tile = board[cell[0]][cell[1]]
+    tile["is_shot"] = True
+    record_changes(board, (cell,))
+    if not tile["is_occupied"]:
+        return False, None
+    ship = tile["ship"]
+    ship.hits += 1
+    return True, ship if ship.check_sunk() else None
+
+
+def resolve_salvo(board: List[List[dict]], cells: Sequence[Tuple[int, int]], fleet: Sequence["Ship"] = None) -> SalvoResult:
+    """
+    Fire a salvo, every shot landing before anything is reported. Shots at cells that were already shot,
+    before the salvo or earlier in it, are wasted: they miss and change nothing.
+
+    Args:
+        board (List[List[dict]]): Cells of the board being shot at.
+        cells (Sequence[Tuple[int, int]]): Row and column of each shot.
+        fleet (Sequence[Ship]): Every ship on the board, to check for game over. None to not check.
+
+    Returns:
+        SalvoResult: What each shot hit and sank, and whether the fleet is finished.
+    """
+    hits = []
+    sunk = []
+    if hasattr(board, "shot"):
+        # Sparse board, resolve against its sets directly instead of building a SparseCell for each shot
+        shot, occupied, ships, columns = board.shot, board.occupied, board.ships, board.columns
+        for row, column in cells:
+            index = row * columns + column
+            if index in shot:
+                hits.append(False)
+                sunk.append(None)
+                continue
+            shot.add(index)
+            if index not in occupied:
+                hits.append(False)
+                sunk.append(None)
+                continue
+            ship = ships[index]
+            ship.hits += 1
+            hits.append(True)
+            sunk.append(ship if ship.check_sunk() else None)
+    else:
+        for row, column in cells:
+            tile = board[row][column]
+            if tile["is_shot"]:
+                hits.append(False)
+                sunk.append(None)
+                continue
+            tile["is_shot"] = True
+            if not tile["is_occupied"]:
+                hits.append(False)
+                sunk.append(None)
+                continue
+            ship = tile["ship"]
+            ship.hits += 1
+            hits.append(True)
+            sunk.append(ship if ship.check_sunk() else None)
+        record_changes(board, cells)
+    # The fleet can only have just finished if this salvo sank something
+    game_over = fleet is not None and any(sunk) and all(ship.is_sunk for ship in fleet)
+    return SalvoResult(hits, sunk, game_over)
+
+
+def salvo_size(fleet: Sequence["Ship"]) -> int:
+    """
+    Shots in a salvo under the usual rule, one for each ship of the firing side's fleet still afloat.
+    """
+    return sum(1 for ship in fleet if not ship.is_sunk)
+
+
+if __name__ == "__main__":
+    # Per shot cost of headless salvo games as the salvo grows, against plain one shot turns
+    import argparse
+    from time import perf_counter
+    import densityTargeting
+    import fleet
+    import gameModes
+    from gameContext import GameContext
+    parser = argparse.ArgumentParser(description="Time headless salvo games at different salvo sizes")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--density", action="store_true", help="Search by placement density instead of the checkboard pattern")
+    args = parser.parse_args()
+
+    template = fleet.STANDARD_FLEET
+    density = densityTargeting.DensityTargeter(args.rows, args.columns) if args.density else None
+    try:
+        time_start = perf_counter()
+        shots = sum(gameModes.play_solo_game(GameContext(args.rows, args.columns, template, seed=seed), density) for seed in range(args.games))
+        elapsed = perf_counter() - time_start
+        print(f"One shot turns: {elapsed / shots * 1e6:.1f} us per shot, {shots / args.games:.2f} shots per game")
+        for size in args.sizes + [None]:
+            time_start = perf_counter()
+            turns = shots = 0
+            for seed in range(args.games):
+                game_turns, game_shots = gameModes.play_salvo_game(GameContext(args.rows, args.columns, template, seed=seed), density, size)
+                turns += game_turns
+                shots += game_shots
+            elapsed = perf_counter() - time_start
+            label = f"Salvo of {size}" if size is not None else "Salvo per ship afloat"
+            print(f"{label}: {elapsed / shots * 1e6:.1f} us per shot, {shots / args.games:.2f} shots and {turns / args.games:.2f} turns per game")
+    finally:
+        if density is not None:
+            density.close()
@@ -0,0 +1,252 @@
+""" Sparse game board for very large boards
+
+    A normal gameBoard allocates a cell dictionary for every cell up front. A sparse board only stores the cells
+    that have a ship on them or have been shot at, in sets and dictionaries keyed by flat index (row * columns + column).
+    Memory is proportional to the number of ship cells and shots instead of the board area.
+
+    board[row][column] returns a cell that reads and writes those sets, so Ship placement and the Bot work on a
+    sparse board the same way they do on a normal one.
+
+    Functions:
+        create_board(rows: int, columns: int) -> gameBoard:
+            Create a normal or sparse board, depending on the board size.
+"""
+from typing import Iterator, List, Tuple
+from collections.abc import MutableMapping
+import gameBoard
+import gameFunctions
+
+SPARSE_BOARD_MIN_CELLS: int = 250000 # Boards with more cells than this are created sparse by create_board, a dense cell takes about 250 bytes
+
+
+class SparseCell(MutableMapping):
+    """
+    A single cell of a sparse board. Behaves like the cell dictionaries of a normal board,
+    but reads and writes the sparse board's sets.
+    """
+    __slots__ = ("grid", "index")
+
+    def __init__(self, grid: "SparseGrid", index: int):
+        self.grid = grid
+        self.index = index # Flat index of the cell, row * columns + column
+
+    def __getitem__(self, key: str):
+        if key == "is_shot":
+            return self.index in self.grid.shot
+        if key == "is_occupied":
+            return self.index in self.grid.occupied
+        if key == "ship":
+            return self.grid.ships.get(self.index)
+        if key == "tile":
+            return self.grid.tiles.get(self.index, gameBoard.cell_state["tile"])
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key == "is_shot":
+            self.grid.shot.add(self.index) if value else self.grid.shot.discard(self.index)
+        elif key == "is_occupied":
+            self.grid.occupied.add(self.index) if value else self.grid.occupied.discard(self.index)
+        elif key == "ship":
+            if value is None:
+                self.grid.ships.pop(self.index, None)
+            else:
+                self.grid.ships[self.index] = value
+        elif key == "tile":
+            if value == gameBoard.cell_state["tile"]:
+                self.grid.tiles.pop(self.index, None)
+            else:
+                self.grid.tiles[self.index] = value
+        else:
+            raise KeyError(key)
+
+    def __delitem__(self, key: str) -> None:
+        raise TypeError("Cells of a sparse board always have every key")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(gameBoard.cell_state)
+
+    def __len__(self) -> int:
+        return len(gameBoard.cell_state)
+
+    def copy(self) -> dict:
+        return dict(self)
+
+
+class SparseRow:
+    """
+    A row of a sparse board, indexing it gives a SparseCell.
+    """
+    __slots__ = ("grid", "start")
+
+    def __init__(self, grid: "SparseGrid", row: int):
+        self.grid = grid
+        self.start = row * grid.columns # Flat index of the first cell in the row
+
+    def __getitem__(self, column: int) -> SparseCell:
+        if not 0 <= column < self.grid.columns:
+            raise IndexError("Column out of range")
+        return SparseCell(self.grid, self.start + column)
+
+    def __setitem__(self, column: int, state: dict) -> None:
+        # Replacing a cell with a new state dictionary, eg. Ship.clear_ship resetting to cell_state
+        cell = self[column]
+        for key in gameBoard.cell_state:
+            cell[key] = state.get(key, gameBoard.cell_state[key])
+
+    def __len__(self) -> int:
+        return self.grid.columns
+
+
+class SparseGrid:
+    """
+    Stores the state of a sparse board. Only cells that differ from the initial cell_state are kept.
+
+    Attributes:
+        shot (set): Flat index of every cell that has been shot at.
+        occupied (set): Flat index of every cell with a ship on it.
+        ships (dict): Ship object on each occupied cell, keyed by flat index.
+        tiles (dict): Tiles that are not the default water tile, keyed by flat index.
+    """
+
+    def __init__(self, rows: int, columns: int):
+        self.rows = rows
+        self.columns = columns
+        self.shot: set = set()
+        self.occupied: set = set()
+        self.ships: dict = {}
+        self.tiles: dict = {}
+
+    def __getitem__(self, row: int) -> SparseRow:
+        if not 0 <= row < self.rows:
+            raise IndexError("Row out of range")
+        return SparseRow(self, row)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __iter__(self) -> Iterator[SparseRow]:
+        return (SparseRow(self, row) for row in range(self.rows))
+
+
+class RowHeaders:
+    """
+    Row headers worked out when they are asked for, instead of pregenerating one for every row.
+    """
+
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.header_length = len(gameFunctions.int_to_letters(rows - 1)) # Longest header is the last one
+
+    def __getitem__(self, row: int) -> str:
+        header = gameFunctions.int_to_letters(row)
+        return header + " " * (self.header_length - len(header) + 1) + "# "
+
+    def __len__(self) -> int:
+        return self.rows
+
+
+class SparseBoard(gameBoard.gameBoard):
+    """
+    Game board that only stores occupied and shot cells. Drop in replacement for gameBoard on very large boards.
+
+    Attributes:
+        board (SparseGrid): Indexable like the 2D list of a normal gameBoard, board[row][column] gives a cell.
+    """
+
+    def create_board(self, rows: int, columns: int) -> SparseGrid:
+        """
+        Create the sparse grid. Nothing is allocated per cell, and headers are generated when displayed.
+
+        Args:
+            rows (int): Number of rows in the board.
+            columns (int): Number of columns in the board.
+
+        Returns:
+            SparseGrid: Empty sparse grid.
+        """
+        self.row_headers = RowHeaders(rows)
+        return SparseGrid(rows, columns)
+
+    def display(self, own_board: bool, centre: Tuple[int, int] = None) -> None:
+        """
+        Display an overview map and a viewport, a sparse board is never printed in full.
+        """
+        self.display_overview(own_board)
+        self.display_viewport(own_board, centre)
+
+    def display_board(self, own_board: bool) -> None:
+        """
+        Printing every cell defeats the point of a sparse board, show the viewport instead.
+        """
+        self.display_viewport(own_board)
+
+    def block_counts(self, block_rows: int, block_columns: int) -> List[List[Tuple[int, int, int]]]:
+        """
+        Aggregate the board into blocks of cells, counting shots, hits and ship cells in each block.
+        Only the stored cells are visited, so the cost is proportional to the number of shots and ship cells.
+
+        Args:
+            block_rows (int): Number of board rows in each block.
+            block_columns (int): Number of board columns in each block.
+
+        Returns:
+            List[List[Tuple[int, int, int]]]: (shots, hits, occupied) counts for each block, indexed [block row][block column].
+        """
+        grid = self.board
+        blocks_down = (self.rows + block_rows - 1) // block_rows
+        blocks_across = (self.columns + block_columns - 1) // block_columns
+        counts = [[[0, 0, 0] for _ in range(blocks_across)] for _ in range(blocks_down)]
+        for index in grid.shot:
+            row, column = divmod(index, self.columns)
+            block = counts[row // block_rows][column // block_columns]
+            block[0] += 1
+            if index in grid.occupied:
+                block[1] += 1
+        for index in grid.occupied:
+            row, column = divmod(index, self.columns)
+            counts[row // block_rows][column // block_columns][2] += 1
+        return [[tuple(block) for block in row] for row in counts]
+
+    def clear_board(self) -> None:
+        """
+        Clear the game board by resetting all cells to their initial state.
+        """
+        self.board.shot.clear()
+        self.board.occupied.clear()
+        self.board.ships.clear()
+        self.board.tiles.clear()
+
+
+def create_board(rows: int, columns: int) -> gameBoard.gameBoard:
+    """
+    Create a game board, using a sparse board when the board is too large to allocate every cell.
+
+    Args:
+        rows (int): Number of rows in the board.
+        columns (int): Number of columns in the board.
+
+    Returns:
+        gameBoard: A gameBoard, or a SparseBoard for boards with more than SPARSE_BOARD_MIN_CELLS cells.
+    """
+    if rows * columns > SPARSE_BOARD_MIN_CELLS:
+        return SparseBoard(rows, columns)
+    return gameBoard.gameBoard(rows, columns)
+
+
+if __name__ == "__main__":
+    import ANSI
+    from ship import Ship
+    from bot import Bot
+    ANSI.colorama.init()
+
+    rows = columns = 100000
+    board = create_board(rows, columns)
+    ships = [Ship("Frigate", "F", 2), Ship("Destroyer", "D", 3), Ship("Battleship", "B", 4), Ship("Carrier", "C", 5)]
+    for ship in ships:
+        ship.random_place(board.board, rows, columns)
+    bot = Bot("Computer", rows, columns, ship_lengths=[ship.length for ship in ships])
+    for _ in range(1000):
+        bot.bot_turn(board.board)
+    print(f"Cells stored: {len(board.board.occupied)} occupied, {len(board.board.shot)} shot")
+    board.last_shot = ships[0].bow_coord
+    board.display(own_board=True)
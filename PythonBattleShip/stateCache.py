@@ -0,0 +1,196 @@
+""" Zobrist hashing of board states and an LRU cache of targeting results
+
+    The same board states come up again and again over many games, the empty board every game, the same openings
+    and their mirror images. BoardHash keeps a 64 bit Zobrist hash of the shot, hit and sunk state of every cell,
+    updated with a couple of XORs whenever a cell changes. A hash is kept for each rotation and reflection of the
+    board, and the smallest is the canonical hash, so mirror images of a state share one key.
+
+    StateCache keeps targeting results by canonical hash in a bounded LRU cache. Results are stored in the canonical
+    orientation and turned back into the board's own orientation when they are looked up.
+
+    Classes:
+        BoardHash:
+            Incremental Zobrist hash of a board's state under each of its symmetries.
+
+        StateCache:
+            Bounded LRU cache of targeting results keyed by canonical state, with hit rate statistics.
+"""
+from typing import Dict, Hashable, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+import random
+import threading
+
+UNKNOWN: int = 0
+MISS: int = 1
+HIT: int = 2
+SUNK: int = 3
+STATES: int = 4 # Number of cell states, keys are indexed by cell * STATES + state
+
+DEFAULT_CACHE_SIZE: int = 100000 # Results kept before the least recently used are dropped
+STATE_CACHE_MAX_CELLS: int = 10000 # Larger boards rarely repeat a state and their key tables get big, don't cache them
+
+
+@lru_cache(maxsize=8)
+def symmetry_maps(rows: int, columns: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Where each cell goes under every rotation and reflection of the board. Square boards have 8, others only 4
+    since turning them a quarter turn changes their shape. Cached and read only, shared by every hash of this size.
+
+    Returns:
+        Tuple[Tuple[int, ...], ...]: For each symmetry, the flat index each flat index maps to, the identity first.
+    """
+    last_row, last_column = rows - 1, columns - 1
+    transforms = [
+        lambda row, column: (row, column),
+        lambda row, column: (last_row - row, column),
+        lambda row, column: (row, last_column - column),
+        lambda row, column: (last_row - row, last_column - column),
+    ]
+    if rows == columns:
+        transforms += [
+            lambda row, column: (column, row),
+            lambda row, column: (last_column - column, row),
+            lambda row, column: (column, last_row - row),
+            lambda row, column: (last_column - column, last_row - row),
+        ]
+    maps = []
+    for transform in transforms:
+        mapping = []
+        for row in range(rows):
+            for column in range(columns):
+                new_row, new_column = transform(row, column)
+                mapping.append(new_row * columns + new_column)
+        maps.append(tuple(mapping))
+    return tuple(maps)
+
+
+@lru_cache(maxsize=8)
+def inverse_symmetry_maps(rows: int, columns: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    The inverse of each map from symmetry_maps, where each cell comes from.
+    """
+    inverses = []
+    for mapping in symmetry_maps(rows, columns):
+        inverse = [0] * len(mapping)
+        for cell, new_cell in enumerate(mapping):
+            inverse[new_cell] = cell
+        inverses.append(tuple(inverse))
+    return tuple(inverses)
+
+
+@lru_cache(maxsize=8)
+def zobrist_tables(rows: int, columns: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Random 64 bit keys for every cell and state, one table per symmetry. The table for a symmetry gives each cell the
+    key of the cell it maps to, so XORing a cell's keys into every table hashes every orientation at once.
+    Keys come from a fixed seed so hashes are the same every run.
+
+    Returns:
+        Tuple[Tuple[int, ...], ...]: For each symmetry, the key of each cell and state, indexed by cell * STATES + state.
+    """
+    rng = random.Random(f"zobrist {rows}x{columns}")
+    keys = [rng.getrandbits(64) for _ in range(rows * columns * STATES)]
+    for cell in range(rows * columns):
+        keys[cell * STATES + UNKNOWN] = 0 # Unknown cells don't change the hash, so an empty board hashes to 0
+    return tuple(tuple(keys[mapping[cell] * STATES + state] for cell in range(rows * columns) for state in range(STATES))
+                 for mapping in symmetry_maps(rows, columns))
+
+
+class BoardHash:
+    """
+    Zobrist hash of a board's cell states in every orientation, updated as cells change.
+
+    Attributes:
+        rows (int): Number of rows on the board.
+        columns (int): Number of columns on the board.
+        hashes (List[int]): Hash of the board in each orientation.
+    """
+
+    def __init__(self, rows: int, columns: int):
+        self.rows: int = rows
+        self.columns: int = columns
+        self.tables = zobrist_tables(rows, columns)
+        self.maps = symmetry_maps(rows, columns)
+        self.inverse_maps = inverse_symmetry_maps(rows, columns)
+        self.hashes = [0] * len(self.tables)
+        self.states = bytearray(rows * columns)
+
+    def set_state(self, row: int, column: int, state: int) -> None:
+        """
+        Change the state of a cell to UNKNOWN, MISS, HIT or SUNK.
+        """
+        cell = row * self.columns + column
+        old_key = cell * STATES + self.states[cell]
+        new_key = cell * STATES + state
+        hashes = self.hashes
+        for symmetry, table in enumerate(self.tables):
+            hashes[symmetry] ^= table[old_key] ^ table[new_key]
+        self.states[cell] = state
+
+    def canonical(self) -> Tuple[int, int]:
+        """
+        The canonical hash, the smallest over every orientation, and the symmetry it came from.
+        """
+        best = min(self.hashes)
+        return best, self.hashes.index(best)
+
+    def to_canonical(self, cell: Tuple[int, int], symmetry: int) -> Tuple[int, int]:
+        """
+        Where a cell of this board is in the canonical orientation given by symmetry.
+        """
+        return divmod(self.maps[symmetry][cell[0] * self.columns + cell[1]], self.columns)
+
+    def from_canonical(self, cell: Tuple[int, int], symmetry: int) -> Tuple[int, int]:
+        """
+        Where a cell of the canonical orientation given by symmetry is on this board.
+        """
+        return divmod(self.inverse_maps[symmetry][cell[0] * self.columns + cell[1]], self.columns)
+
+
+class StateCache:
+    """
+    Bounded LRU cache of targeting results by canonical board state. Safe to share between games in different threads.
+
+    Attributes:
+        max_size (int): Results kept before the least recently used are dropped.
+        hits (int): Lookups that found a result.
+        misses (int): Lookups that didn't.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        self.max_size: int = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+        self.results: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[int, int]:
+        """
+        Look up the result for a state, None if it isn't cached.
+        """
+        with self.lock:
+            result = self.results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: Hashable, result: Tuple[int, int]) -> None:
+        """
+        Cache the result for a state, dropping the least recently used result if the cache is full.
+        """
+        with self.lock:
+            self.results[key] = result
+            self.results.move_to_end(key)
+            if len(self.results) > self.max_size:
+                self.results.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Hits, misses, hit rate and number of results cached.
+        """
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0, "size": len(self.results)}
@@ -0,0 +1,339 @@
+""" Pick a targeting strategy by what it costs on this machine
+
+    The targeting strategies cost very different amounts per move as the board grows. The checkboard pattern is cheap
+    on any board, while counting ship placements for density targeting, listing fleet configurations for the endgame
+    solver and sampling whole fleets all get expensive on big boards. The tuner plays each strategy on a board size
+    and fleet, timing every move and counting its hits, and keeps the profile in a small JSON file per
+    (rows, columns, fleet). At the start of a run choose_strategy picks the strategy that hits most often out of those
+    whose moves fit a per move time budget, on average, at the 90th percentile and, within MAX_MOVE_SLACK, at their
+    slowest. It tunes first if there is no profile yet or the profile was measured on another machine.
+
+    Quality is the hit rate over the first MIN_GAMES seeded games, the fleet's cells over the turns taken, so it ranks
+    strategies the same as turns per game. Every strategy plays the same seeds, so they see the same fleets, and fewer
+    games are mostly noise. The moves are timed for TUNE_SECONDS, which cheap strategies finish MIN_GAMES well inside.
+    Slower strategies are left unmeasured by tuning, and choose_strategy plays their quality games untimed, only for
+    strategies that fit the budget, then saves the hit rate with the profile.
+
+    File format: JSON with the profile version, the machine it was measured on and one profile per strategy.
+
+    Run this file to tune a board size and fleet and see which strategy a budget picks, eg.
+        python strategyTuner.py --rows 10 --columns 10 --fleet Standard --budget 0.001
+
+    Classes:
+        StrategyProfile:
+            Measured cost and quality of one strategy.
+
+    Functions:
+        available_strategies(rows: int, columns: int) -> List[str]:
+            Strategies that can be played on a board size.
+
+        profile_strategy(rows: int, columns: int, fleet_template: FleetTemplate, strategy: str) -> StrategyProfile:
+            Play a strategy for a while and measure it.
+
+        measure_quality(rows: int, columns: int, fleet_template: FleetTemplate, strategy: str) -> Tuple[float, float]:
+            Hit rate and mean turns of a strategy over MIN_GAMES seeded games, however long they take.
+
+        tune_strategies(rows: int, columns: int, fleet_template: FleetTemplate) -> List[StrategyProfile]:
+            Profile every available strategy and write the profiles file.
+
+        load_profiles(rows: int, columns: int, fleet_template: FleetTemplate) -> List[StrategyProfile]:
+            Read the profiles for a board size and fleet, or None if they need tuning.
+
+        choose_strategy(rows: int, columns: int, fleet_template: FleetTemplate, move_budget: float) -> StrategyProfile:
+            The best strategy whose moves fit the budget.
+"""
+from typing import Dict, List, NamedTuple, Tuple
+from contextlib import nullcontext
+from time import perf_counter
+import json
+import os
+import platform
+import densityTargeting
+import endgameSolver
+import fleet
+import fleetSampler
+import gameFunctions
+import priors
+from gameContext import GameContext
+
+PROFILES_DIR: str = gameFunctions.data_dir("profiles")
+PROFILES_VERSION: int = 3 # 3: hit rates are over the first MIN_GAMES games
+TUNE_SECONDS: float = 2.0 # Time each strategy's moves are timed for while tuning
+TUNE_GAMES: int = 200 # Games each strategy plays at most, small boards finish this many well inside TUNE_SECONDS
+MIN_GAMES: int = 30 # Seeded games a strategy's hit rate is measured over
+MOVE_PERCENTILE: float = 0.9 # Moves are compared to the budget at this percentile as well as on average
+MAX_MOVE_SLACK: float = 10.0 # The slowest move may take this many budgets, the first move of a game builds the search pattern
+
+# What each strategy turns on in computer_solo, as its keyword arguments
+STRATEGY_SETTINGS: Dict[str, Dict[str, object]] = {
+    "checkboard": {"density_targeting": False, "endgame_solver": False, "sample_fleets": 0},
+    "density": {"density_targeting": True, "endgame_solver": False, "sample_fleets": 0},
+    "endgame": {"density_targeting": True, "endgame_solver": True, "sample_fleets": 0},
+    "sampler": {"density_targeting": True, "endgame_solver": False, "sample_fleets": fleetSampler.DEFAULT_SAMPLES},
+}
+
+
+class StrategyProfile(NamedTuple):
+    """
+    Measured cost and quality of one strategy on a board size and fleet.
+
+    Attributes:
+        strategy (str): Name of the strategy, a key of STRATEGY_SETTINGS.
+        moves (int): Moves timed.
+        games (int): Games finished while timing moves.
+        move_mean (float): Mean seconds per move.
+        move_p90 (float): Seconds per move at MOVE_PERCENTILE.
+        move_max (float): Seconds the slowest move took.
+        hit_rate (float): Hits over shots of the first MIN_GAMES games, None until they have been played.
+        mean_turns (float): Mean turns of the first MIN_GAMES games, None until they have been played.
+    """
+    strategy: str
+    moves: int
+    games: int
+    move_mean: float
+    move_p90: float
+    move_max: float
+    hit_rate: float
+    mean_turns: float
+
+    def fits(self, move_budget: float) -> bool:
+        """
+        True if the strategy's moves fit a budget of seconds per move, on average, at MOVE_PERCENTILE and, within MAX_MOVE_SLACK, at their slowest.
+        """
+        return self.move_mean <= move_budget and self.move_p90 <= move_budget and self.move_max <= MAX_MOVE_SLACK * move_budget
+
+
+def machine_id() -> str:
+    """
+    What the profiles were measured on, profiles from any other machine or Python are tuned again.
+    """
+    return f"{platform.node()} {platform.machine()} {platform.python_implementation()} {platform.python_version()}"
+
+
+def profiles_path(rows: int, columns: int, fleet_template: fleet.FleetTemplate) -> str:
+    """
+    Path of the profiles file for a board size and fleet. Fleets with the same ship lengths share a file.
+    """
+    lengths = "-".join(str(length) for length in sorted(fleet_template.ship_lengths))
+    return os.path.join(PROFILES_DIR, f"{rows}x{columns}_{lengths}.json")
+
+
+def available_strategies(rows: int, columns: int) -> List[str]:
+    """
+    Strategies that can be played on a board size, in order of how much work they do per move.
+    computer_solo quietly skips density targeting, the endgame solver and the fleet sampler past their size limits, so they aren't offered there.
+    """
+    cells = rows * columns
+    strategies = ["checkboard"]
+    if cells <= densityTargeting.DENSITY_MAX_CELLS:
+        strategies.append("density")
+    if cells <= endgameSolver.ENDGAME_MAX_CELLS:
+        strategies.append("endgame")
+    if cells <= fleetSampler.SAMPLER_MAX_CELLS:
+        strategies.append("sampler")
+    return strategies
+
+
+def play_strategy(rows: int, columns: int, fleet_template: fleet.FleetTemplate, strategy: str, seed: int = 0, seconds: float = None,
+                  max_games: int = MIN_GAMES) -> Tuple[List[float], List[Tuple[int, int]]]:
+    """
+    Play seeded headless solo games with a strategy, timing every move. Game n is seeded seed + n, so every strategy
+    sees the same fleets. The game being played when time runs out is stopped there, its moves are timed but it isn't finished.
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        fleet_template (FleetTemplate): Fleet the bot plays against.
+        strategy (str): Name of the strategy, a key of STRATEGY_SETTINGS.
+        seed (int): Seed of the first game.
+        seconds (float): How long to play for, None to play every game however long it takes.
+        max_games (int): Games to play.
+
+    Returns:
+        Tuple[List[float], List[Tuple[int, int]]]: Seconds each move took, and (shots, hits) of each finished game.
+    """
+    settings = STRATEGY_SETTINGS[strategy]
+    cell_priors = priors.load_priors(rows, columns, fleet_template)
+    # Set up the same way as computer_solo, without the state cache so every move is counted in full
+    density = densityTargeting.DensityTargeter(rows, columns) if settings["density_targeting"] else None
+    endgame = endgameSolver.EndgameSolver(rows, columns) if settings["endgame_solver"] else None
+    sampler = fleetSampler.FleetSampler(rows, columns, settings["sample_fleets"]) if settings["sample_fleets"] > 0 else None
+    move_times = []
+    finished = []
+    start = perf_counter()
+
+    def out_of_time() -> bool:
+        return seconds is not None and perf_counter() - start >= seconds
+
+    with density or nullcontext():
+        while len(finished) < max_games and not out_of_time():
+            context = GameContext(rows, columns, fleet_template, seed=seed + len(finished), priors=cell_priors)
+            board = context.create_board()
+            ships = context.create_fleet(board)
+            if density is not None:
+                density.clear()
+            bot = context.create_bot(density=density, endgame=endgame, sampler=sampler)
+            shots = hits = 0
+            while not out_of_time():
+                move_start = perf_counter()
+                sunk = bot.bot_turn(board.board)
+                move_times.append(perf_counter() - move_start)
+                shots += 1
+                hits += board.board[bot.last_shot[0]][bot.last_shot[1]]["is_occupied"]
+                if sunk and all(ship.is_sunk for ship in ships):
+                    finished.append((shots, hits))
+                    break
+    return move_times, finished
+
+
+def quality(games: List[Tuple[int, int]]) -> Tuple[float, float]:
+    """
+    Hit rate and mean turns over the first MIN_GAMES of a strategy's finished games, (None, None) if fewer finished.
+    """
+    if len(games) < MIN_GAMES:
+        return None, None
+    shots = sum(game_shots for game_shots, _ in games[:MIN_GAMES])
+    hits = sum(game_hits for _, game_hits in games[:MIN_GAMES])
+    return hits / shots, shots / MIN_GAMES
+
+
+def profile_strategy(rows: int, columns: int, fleet_template: fleet.FleetTemplate, strategy: str, seconds: float = TUNE_SECONDS,
+                     max_games: int = TUNE_GAMES, seed: int = 0) -> StrategyProfile:
+    """
+    Play seeded headless solo games with a strategy for a while, timing every move. Play stops after max_games or once
+    seconds have passed. If the first MIN_GAMES games finished in that time they give the hit rate, otherwise it is left
+    for measure_quality.
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        fleet_template (FleetTemplate): Fleet the bot plays against.
+        strategy (str): Name of the strategy, a key of STRATEGY_SETTINGS.
+        seconds (float): How long to play for.
+        max_games (int): Games to stop after if they finish in time.
+        seed (int): Seed of the first game, each game after uses the next seed.
+
+    Returns:
+        StrategyProfile: The measured profile.
+    """
+    move_times, games = play_strategy(rows, columns, fleet_template, strategy, seed, seconds, max_games)
+    move_times.sort()
+    hit_rate, mean_turns = quality(games)
+    return StrategyProfile(strategy=strategy, moves=len(move_times), games=len(games),
+                           move_mean=sum(move_times) / max(len(move_times), 1),
+                           move_p90=move_times[int(MOVE_PERCENTILE * (len(move_times) - 1))] if move_times else 0.0,
+                           move_max=move_times[-1] if move_times else 0.0,
+                           hit_rate=hit_rate, mean_turns=mean_turns)
+
+
+def measure_quality(rows: int, columns: int, fleet_template: fleet.FleetTemplate, strategy: str, seed: int = 0) -> Tuple[float, float]:
+    """
+    Play the first MIN_GAMES seeded games of a strategy untimed, for strategies too slow to finish them while tuning.
+
+    Returns:
+        Tuple[float, float]: Hit rate and mean turns, the same as a profile_strategy that finished MIN_GAMES would give.
+    """
+    _, games = play_strategy(rows, columns, fleet_template, strategy, seed)
+    return quality(games)
+
+
+def write_profiles(path: str, profiles: List[StrategyProfile]) -> None:
+    """
+    Write a profiles file, replacing any existing one in a single step.
+    """
+    with gameFunctions.atomic_write(path, "w") as file:
+        json.dump({"version": PROFILES_VERSION, "machine": machine_id(), "profiles": [profile._asdict() for profile in profiles]}, file, indent=4)
+
+
+def tune_strategies(rows: int, columns: int, fleet_template: fleet.FleetTemplate, seconds: float = TUNE_SECONDS) -> List[StrategyProfile]:
+    """
+    Profile every strategy that can be played on a board size and write them to the profiles file.
+
+    Returns:
+        List[StrategyProfile]: The profiles, in the order of available_strategies.
+    """
+    fleet_template.validate(rows, columns)
+    profiles = [profile_strategy(rows, columns, fleet_template, strategy, seconds) for strategy in available_strategies(rows, columns)]
+    write_profiles(profiles_path(rows, columns, fleet_template), profiles)
+    return profiles
+
+
+def load_profiles(rows: int, columns: int, fleet_template: fleet.FleetTemplate) -> List[StrategyProfile]:
+    """
+    Read the profiles for a board size and fleet.
+
+    Returns:
+        List[StrategyProfile]: The profiles, or None if there is no profiles file or it needs tuning again:
+            it is an older version, from another machine or is missing a strategy that can be played on the board.
+    """
+    path = profiles_path(rows, columns, fleet_template)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        data = json.load(file)
+    if data.get("version") != PROFILES_VERSION or data.get("machine") != machine_id():
+        return None
+    profiles = [StrategyProfile(**profile) for profile in data["profiles"]]
+    if [profile.strategy for profile in profiles] != available_strategies(rows, columns):
+        return None
+    return profiles
+
+
+def choose_strategy(rows: int, columns: int, fleet_template: fleet.FleetTemplate, move_budget: float, retune: bool = False) -> StrategyProfile:
+    """
+    Pick the strategy with the best hit rate whose moves fit a time budget, tuning the board size and fleet first
+    if they haven't been tuned on this machine. Ties go to the cheaper strategy. Strategies that fit but were too
+    slow to finish MIN_GAMES while tuning have their hit rate measured now, and saved with the profiles.
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        fleet_template (FleetTemplate): Fleet being played.
+        move_budget (float): Seconds a move may take, see StrategyProfile.fits.
+        retune (bool): True to tune again even if there are profiles.
+
+    Returns:
+        StrategyProfile: Profile of the chosen strategy, the cheapest on average if none fit the budget.
+    """
+    profiles = None if retune else load_profiles(rows, columns, fleet_template)
+    if profiles is None:
+        profiles = tune_strategies(rows, columns, fleet_template)
+    fitting = [profile for profile in profiles if profile.fits(move_budget)]
+    if not fitting:
+        return min(profiles, key=lambda profile: profile.move_mean)
+    unmeasured = [profile for profile in fitting if profile.hit_rate is None]
+    if unmeasured:
+        for profile in unmeasured:
+            hit_rate, mean_turns = measure_quality(rows, columns, fleet_template, profile.strategy)
+            measured = profile._replace(hit_rate=hit_rate, mean_turns=mean_turns)
+            profiles[profiles.index(profile)] = measured
+            fitting[fitting.index(profile)] = measured
+        write_profiles(profiles_path(rows, columns, fleet_template), profiles)
+    return max(fitting, key=lambda profile: (profile.hit_rate, -profile.move_mean))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Profile the targeting strategies on a board size and fleet, and pick one for a move time budget")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--fleet", default=fleet.DEFAULT_FLEET, help="Fleet name from the fleet config")
+    parser.add_argument("--budget", type=float, default=0.001, help="Seconds a move may take")
+    parser.add_argument("--seconds", type=float, default=TUNE_SECONDS, help="Seconds each strategy is played for")
+    parser.add_argument("--retune", action="store_true", help="Tune again even if this machine has profiles")
+    args = parser.parse_args()
+
+    template = fleet.get_fleet(args.fleet)
+    template.validate(args.rows, args.columns)
+    if args.retune or load_profiles(args.rows, args.columns, template) is None:
+        tune_strategies(args.rows, args.columns, template, args.seconds)
+        print(f"Wrote {profiles_path(args.rows, args.columns, template)}")
+    chosen = choose_strategy(args.rows, args.columns, template, args.budget) # Measures the hit rate of strategies that fit first
+    for profile in load_profiles(args.rows, args.columns, template):
+        if profile.hit_rate is not None:
+            games_quality = f"{profile.hit_rate:.1%} hit rate, {profile.mean_turns:.2f} turns per game over {MIN_GAMES} games"
+        else:
+            games_quality = "hit rate unmeasured, doesn't fit the budget"
+        print(f"{profile.strategy}: {profile.move_mean * 1e6:.0f} us mean, {profile.move_p90 * 1e6:.0f} us p90, {profile.move_max * 1e6:.0f} us max "
+              f"over {profile.moves} moves, {games_quality}")
+    print(f"Budget {args.budget}s per move: {chosen.strategy}")
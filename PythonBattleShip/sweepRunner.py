@@ -0,0 +1,319 @@
+""" Parameter sweeps of solo games with a local result store
+
+    A sweep plays seeded headless solo games for every combination of board size, fleet and targeting. The turns of
+    every game are kept in a SQLite file, keyed by a hash of the configuration, the seed and the engine: the source of
+    the modules a game runs, the fleet config, any priors file and the layout corpus if the games play one. Running the same sweep again only plays the games
+    that aren't stored yet, so finished configurations are skipped, half finished ones carry on where they stopped,
+    and changing a module only replays the configurations that use it. Games are played by a process pool, and
+    results are saved as each chunk of games finishes so an interrupted sweep loses very little.
+
+    Density games don't use the state cache, a cached shot can break a tie differently, and stored results must
+    only depend on the seed.
+
+    A configuration with a layout corpus plays layout n of the corpus in game n instead of placing the fleet from
+    the seed, so every configuration on that board is played against the same fleets. It is keyed by the corpus
+    file's name and contents, not where it is, so moving the file keeps its results.
+
+    Run this file to sweep, eg.
+        python sweepRunner.py --sizes 10 20 50 --fleets Standard Armada --density off on --games 1000
+        python sweepRunner.py --corpus <data dir>/corpus/10x10_2-3-4-5_seed0.layouts --density off on --games 100000
+    where the data directory is from gameFunctions.data_dir, eg. ~/.local/share/PythonBattleShip on Linux.
+
+    Classes:
+        SweepConfig:
+            One combination of settings in a sweep.
+
+        ResultStore:
+            SQLite store of game results by configuration key.
+
+    Functions:
+        engine_files(roots: Tuple[str, ...]) -> Tuple[str, ...]:
+            Source files of some modules and every module of the game they import.
+
+        engine_hash(config: SweepConfig) -> str:
+            Hash of everything the games of a configuration depend on.
+
+        run_sweep(configs: List[SweepConfig], games: int, store: ResultStore, workers: int) -> List[dict]:
+            Play every game that isn't stored yet and summarise each configuration.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+import ast
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import densityTargeting
+import fleet
+import gameFunctions
+import gameModes
+import layoutCorpus
+import priors
+from gameContext import GameContext
+
+MODULE_DIR: str = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE_PATH: str = os.path.join(gameFunctions.data_dir(), "sweep_results.sqlite")
+# Modules the solo game loop uses, the modules they import are found by engine_files. densityTargeting is added for density configurations
+ENGINE_ROOTS: Tuple[str, ...] = ("gameContext", "gameEvents")
+DENSITY_ROOTS: Tuple[str, ...] = ("densityTargeting",)
+CHUNK_GAMES: int = 50 # Games per pool task, results are saved after each chunk
+
+
+class SweepConfig(NamedTuple):
+    """
+    One combination of settings in a sweep. Game n of a configuration uses seed + n, and layout n of the corpus if it has one.
+    """
+    rows: int
+    columns: int
+    fleet_name: str = fleet.DEFAULT_FLEET
+    density_targeting: bool = False
+    seed: int = 0
+    corpus: str = None # Layout corpus file
+
+
+def _settings(config: SweepConfig) -> str:
+    # Settings as stored, a configuration without a corpus keeps the key it had before corpora were added
+    settings = config._asdict()
+    if config.corpus is None:
+        del settings["corpus"]
+    else:
+        settings["corpus"] = os.path.basename(config.corpus) # The contents are in the engine hash, the directory doesn't matter
+    return json.dumps(settings, sort_keys=True)
+
+
+def _hash_file(digest, path: str) -> None:
+    digest.update(os.path.basename(path).encode() + b"\0")
+    if os.path.exists(path):
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    digest.update(b"\0")
+
+
+@lru_cache(maxsize=None)
+def engine_files(roots: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Source files of some modules and every module of the game they import, directly or not. Only imports at the
+    top level of a module are followed, so modules imported just for type checking don't count.
+
+    Args:
+        roots (Tuple[str, ...]): Module names to start from.
+
+    Returns:
+        Tuple[str, ...]: File names, sorted.
+    """
+    found = set()
+    pending = list(roots)
+    while pending:
+        name = pending.pop()
+        path = os.path.join(MODULE_DIR, name + ".py")
+        if name in found or not os.path.exists(path): # Already seen, or not a module of the game
+            continue
+        found.add(name)
+        with open(path, "rb") as file:
+            tree = ast.parse(file.read())
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module)
+    return tuple(sorted(name + ".py" for name in found))
+
+
+def engine_hash(config: SweepConfig) -> str:
+    """
+    Hash of everything the games of a configuration depend on besides its settings: the engine modules it runs,
+    the solo game loop, the fleet config, the priors file for its board size if there is one and its layout corpus.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    for name in engine_files(ENGINE_ROOTS + (DENSITY_ROOTS if config.density_targeting else ())):
+        _hash_file(digest, os.path.join(MODULE_DIR, name))
+    _hash_file(digest, fleet.FLEET_CONFIG_PATH)
+    # Only the solo game loop of gameModes, so changes to the menus and other modes don't invalidate results
+    digest.update(inspect.getsource(gameModes.play_solo_game).encode())
+    _hash_file(digest, priors.priors_path(config.rows, config.columns, fleet.get_fleet(config.fleet_name)))
+    if config.corpus is not None:
+        _hash_file(digest, config.corpus)
+    return digest.hexdigest()
+
+
+def config_key(config: SweepConfig) -> str:
+    """
+    Content address of a configuration, its settings and engine hash together.
+    """
+    return hashlib.sha256((_settings(config) + engine_hash(config)).encode()).hexdigest()
+
+
+class ResultStore:
+    """
+    SQLite store of the turns of every game played, by configuration key and game number.
+    Use as a context manager, or call close.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        """
+        Args:
+            path (str): SQLite file, created if it doesn't exist.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS configs (config_key TEXT PRIMARY KEY, settings TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS results (
+                config_key TEXT NOT NULL,
+                game INTEGER NOT NULL,
+                turns INTEGER NOT NULL,
+                PRIMARY KEY (config_key, game)
+            ) WITHOUT ROWID;
+        """)
+
+    def stored_games(self, key: str) -> set:
+        """
+        Game numbers already stored for a configuration.
+        """
+        return {row[0] for row in self.connection.execute("SELECT game FROM results WHERE config_key = ?", (key,))}
+
+    def add_results(self, key: str, config: SweepConfig, results: Iterable[Tuple[int, int]]) -> None:
+        """
+        Store (game number, turns) results for a configuration, committed straight away.
+        """
+        with self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO configs VALUES (?, ?)", (key, _settings(config)))
+            self.connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", ((key, game, turns) for game, turns in results))
+
+    def turns(self, key: str, games: int) -> List[int]:
+        """
+        Turns of games 0 to games - 1 of a configuration, in game order.
+        """
+        return [row[0] for row in self.connection.execute(
+            "SELECT turns FROM results WHERE config_key = ? AND game < ? ORDER BY game", (key, games))]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def play_games(config: SweepConfig, game_numbers: List[int], density_workers: int = 0) -> List[Tuple[int, int]]:
+    """
+    Play some of the games of a configuration, run in a pool worker.
+
+    Args:
+        config (SweepConfig): The configuration to play.
+        game_numbers (List[int]): Games to play, each is seeded with the configuration's seed plus its number.
+        density_workers (int): Worker processes for density targeting, 0 in a pool worker as the sweep already uses
+            every CPU. None for densityTargeting.default_workers when the sweep plays in one process.
+
+    Returns:
+        List[Tuple[int, int]]: (game number, turns) for each game.
+    """
+    fleet_template = fleet.get_fleet(config.fleet_name)
+    cell_priors = priors.load_priors(config.rows, config.columns, fleet_template)
+    corpus = layoutCorpus.load_corpus(config.corpus, fleet_template) if config.corpus is not None else None
+    density = densityTargeting.DensityTargeter(config.rows, config.columns, density_workers) if config.density_targeting else None
+    try:
+        return [(game, gameModes.play_solo_game(GameContext(config.rows, config.columns, fleet_template, seed=config.seed + game, priors=cell_priors), density,
+                                                corpus.layout(game) if corpus is not None else None))
+                for game in game_numbers]
+    finally:
+        if density is not None:
+            density.close()
+
+
+def run_sweep(configs: List[SweepConfig], games: int, store: ResultStore, workers: int = None) -> List[Dict]:
+    """
+    Play every game of every configuration that isn't in the store yet, then summarise each configuration.
+
+    Args:
+        configs (List[SweepConfig]): Configurations to sweep.
+        games (int): Games per configuration.
+        store (ResultStore): Where results are looked up and saved.
+        workers (int): Worker processes, None for one per CPU, 0 or 1 to play in this process.
+
+    Returns:
+        List[Dict]: For each configuration, its settings, the games played now and the mean and 95th percentile turns.
+
+    Raises:
+        ValueError: If a configuration can't be played, checked before any game is.
+    """
+    keys = [config_key(config) for config in configs]
+    tasks = []
+    played = {key: 0 for key in keys}
+    for config, key in zip(configs, keys):
+        fleet.get_fleet(config.fleet_name).validate(config.rows, config.columns)
+        if config.density_targeting and config.rows * config.columns > densityTargeting.DENSITY_MAX_CELLS:
+            raise ValueError(f"Density targeting is limited to {densityTargeting.DENSITY_MAX_CELLS} cells, not a {config.rows}x{config.columns} board")
+        if config.corpus is not None:
+            corpus = layoutCorpus.load_corpus(config.corpus, fleet.get_fleet(config.fleet_name))
+            if (corpus.rows, corpus.columns) != (config.rows, config.columns) or len(corpus) < games:
+                raise ValueError(f"{config.corpus} doesn't have {games} layouts for a {config.rows}x{config.columns} board")
+        missing = sorted(set(range(games)) - store.stored_games(key))
+        played[key] = len(missing)
+        tasks += [(config, key, missing[start:start + CHUNK_GAMES]) for start in range(0, len(missing), CHUNK_GAMES)]
+
+    if workers is not None and workers <= 1:
+        for config, key, game_numbers in tasks:
+            store.add_results(key, config, play_games(config, game_numbers, density_workers=None))
+    elif tasks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(play_games, config, game_numbers): (config, key) for config, key, game_numbers in tasks}
+            for future in as_completed(futures):
+                config, key = futures[future]
+                store.add_results(key, config, future.result())
+
+    summaries = []
+    for config, key in zip(configs, keys):
+        turns = sorted(store.turns(key, games))
+        summaries.append({
+            **config._asdict(),
+            "games": len(turns),
+            "played": played[key],
+            "mean_turns": sum(turns) / len(turns) if turns else 0.0,
+            "p95_turns": gameFunctions.percentile(turns, 0.95) if turns else 0,
+        })
+    return summaries
+
+
+if __name__ == "__main__":
+    import argparse
+    from itertools import product
+    from time import perf_counter
+    parser = argparse.ArgumentParser(description="Sweep solo games over board sizes, fleets and targeting, reusing stored results")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10], help="Square board sizes")
+    parser.add_argument("--fleets", nargs="+", default=[fleet.DEFAULT_FLEET])
+    parser.add_argument("--density", choices=["off", "on"], nargs="+", default=["off"], help="Targeting to sweep, checkboard or density")
+    parser.add_argument("--games", type=int, default=1000, help="Games per configuration")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, default one per CPU")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="SQLite result store")
+    parser.add_argument("--corpus", default=None, help="Layout corpus to play, sets the board size and needs its fleet")
+    args = parser.parse_args()
+
+    sweep = []
+    if args.corpus is not None:
+        corpus = layoutCorpus.load_corpus(args.corpus)
+        args.sizes = [corpus.rows]
+        args.fleets = [name for name in args.fleets if fleet.get_fleet(name).ship_lengths == corpus.ship_lengths]
+        if corpus.rows != corpus.columns or not args.fleets:
+            parser.error(f"{args.corpus} is for a {corpus.rows}x{corpus.columns} board with ships {corpus.ship_lengths}, pick a square corpus and its fleet")
+    for size, fleet_name, density in product(args.sizes, args.fleets, args.density):
+        try:
+            fleet.get_fleet(fleet_name).validate(size, size)
+        except ValueError as e:
+            print(f"Skipping {size}x{size} {fleet_name}: {e}")
+            continue
+        sweep.append(SweepConfig(size, size, fleet_name, density == "on", args.seed, args.corpus and os.path.abspath(args.corpus)))
+    time_start = perf_counter()
+    with ResultStore(args.store) as result_store:
+        for summary in run_sweep(sweep, args.games, result_store, args.workers):
+            print(f"{summary['rows']}x{summary['columns']} {summary['fleet_name']:<10} density {'on ' if summary['density_targeting'] else 'off'}"
+                  f"  games {summary['games']:>6} (played {summary['played']:>6})  mean {summary['mean_turns']:8.2f}  p95 {summary['p95_turns']}")
+    print(f"Sweep took {perf_counter() - time_start:.2f}s")
@@ -0,0 +1,200 @@
+""" Progress and throughput telemetry for long computer runs
+
+    The game loop only adds to a couple of counters each turn and after each game. A background thread turns them
+    into games completed, games per second, turns per second, memory use, mean turns and, when the number of games
+    is known, the time left, writing them to a stats file once a second by default. Optionally they are also served
+    on localhost in Prometheus text format.
+
+    Classes:
+        Telemetry:
+            Collect run counters and report them from a background thread.
+"""
+from typing import Dict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic
+import os
+import threading
+import gameFunctions
+
+try:
+    import resource # Not available on Windows
+except ImportError:
+    resource = None
+
+
+def current_rss() -> int:
+    """
+    Resident memory of this process in bytes, or 0 if it can't be found on this platform.
+    """
+    try:
+        with open("/proc/self/statm") as statm: # Linux, current RSS
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # Peak RSS, kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    return 0
+
+
+class Telemetry:
+    """
+    Counters for a long run of games, reported from a background thread so the game loop isn't slowed down.
+    Use as a context manager to start and stop reporting.
+
+    Attributes:
+        games (int): Games completed.
+        turns (int): Turns taken, including the game being played.
+        game_turns (int): Turns taken over all completed games.
+    """
+
+    def __init__(self, stats_file: str = None, port: int = None, interval: float = 1.0, max_games: int = None):
+        """
+        Args:
+            stats_file (str): File the stats are written to every interval, None to not write a file.
+            port (int): Port to serve the stats on at http://127.0.0.1:port/metrics, None to not serve them.
+            interval (float): Seconds between writes of the stats file.
+            max_games (int): Games the run will play, to report the time left. None if not known.
+        """
+        self.stats_file: str = stats_file
+        self.port: int = port
+        self.interval: float = interval
+        self.max_games: int = max_games
+        self.games: int = 0
+        self.turns: int = 0
+        self.game_turns: int = 0
+        self.start_time: float = monotonic()
+        self.stop_event = threading.Event()
+        self.writer_thread: threading.Thread = None
+        self.server: ThreadingHTTPServer = None
+
+    def record_turn(self) -> None:
+        """
+        Count a turn as it is taken, so throughput is known before the first game finishes.
+        """
+        self.turns += 1
+
+    def record_game(self, turns: int) -> None:
+        """
+        Count a completed game.
+
+        Args:
+            turns (int): Turns the game took.
+        """
+        self.game_turns += turns
+        self.games += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Work out the current stats from the counters.
+
+        Returns:
+            Dict[str, float]: Stats by name.
+        """
+        games, game_turns, turns = self.games, self.game_turns, self.turns # Read once, the game loop keeps counting
+        elapsed = max(monotonic() - self.start_time, 1e-9)
+        mean_turns = game_turns / games if games else 0.0
+        stats = {
+            "games_completed": games,
+            "turns_completed": turns,
+            "games_per_second": games / elapsed,
+            "turns_per_second": turns / elapsed,
+            "mean_turns": mean_turns,
+            "rss_bytes": current_rss(),
+            "elapsed_seconds": elapsed,
+        }
+        if self.max_games is not None:
+            # Turns still to take at the mean so far, at the turn rate so far. Not known until a game has finished
+            turns_left = max(self.max_games * mean_turns - turns, 0.0)
+            stats["eta_seconds"] = turns_left / (turns / elapsed) if games and turns else float("nan")
+        return stats
+
+    def prometheus_text(self) -> str:
+        """
+        Format the current stats in Prometheus text exposition format.
+        """
+        lines = []
+        for name, value in self.snapshot().items():
+            metric_type = "counter" if name.endswith("_completed") else "gauge"
+            metric = f"battleship_{name}_total" if metric_type == "counter" else f"battleship_{name}"
+            lines.append(f"# TYPE {metric} {metric_type}")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_stats(self) -> None:
+        """
+        Write the current stats to the stats file, one name value pair per line. The file is replaced in one go
+        so anything reading it never sees a half written file.
+        """
+        stats = self.snapshot()
+        with gameFunctions.atomic_write(self.stats_file, "w") as file:
+            for name, value in stats.items():
+                file.write(f"{name} {value:.6g}\n" if isinstance(value, float) else f"{name} {value}\n")
+
+    def _write_loop(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            self.write_stats()
+
+    def start(self) -> None:
+        """
+        Start the background stats file writer and HTTP endpoint, whichever are turned on.
+        """
+        self.start_time = monotonic()
+        if self.stats_file is not None:
+            self.writer_thread = threading.Thread(target=self._write_loop, name="telemetry-writer", daemon=True)
+            self.writer_thread.start()
+        if self.port is not None:
+            telemetry = self
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = telemetry.prometheus_text().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass # Don't print every request over the game output
+
+            self.server = ThreadingHTTPServer(("127.0.0.1", self.port), MetricsHandler)
+            threading.Thread(target=self.server.serve_forever, name="telemetry-http", daemon=True).start()
+
+    def stop(self) -> None:
+        """
+        Stop reporting, writing the stats file one last time.
+        """
+        self.stop_event.set()
+        if self.writer_thread is not None:
+            self.writer_thread.join()
+            self.write_stats()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def __enter__(self) -> "Telemetry":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import random
+    from time import sleep
+    with Telemetry(stats_file="stats.txt", interval=0.2, max_games=50) as telemetry:
+        for _ in range(50):
+            turns = random.randint(17, 100)
+            for _ in range(turns):
+                telemetry.record_turn()
+            telemetry.record_game(turns)
+            sleep(0.01)
+        print(telemetry.prometheus_text())
+    with open("stats.txt") as file:
+        print(file.read())
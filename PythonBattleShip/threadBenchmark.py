@@ -0,0 +1,93 @@
+""" Thread scaling benchmark for headless solo games
+
+    Plays the same seeded games on thread pools of different sizes and reports games per second and the speedup
+    over one thread. Every game gets its own GameContext, so nothing the games change is shared between threads.
+    On a normal CPython build the GIL keeps the speedup near 1, on a free-threaded build (eg. python3.13t) it
+    should scale with the number of cores.
+
+    Run this file to benchmark, eg.
+        python threadBenchmark.py --games 2000 --threads 1 2 4 8
+
+    Functions:
+        run_games(rows: int, columns: int, games: int, threads: int, fleet_template: FleetTemplate, corpus: LayoutCorpus) -> Tuple[float, List[int]]:
+            Play seeded solo games on a thread pool, returning the time taken and turns of each game.
+
+        gil_enabled() -> bool:
+            True if the GIL is enabled in this interpreter.
+"""
+from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+import argparse
+import sys
+import fleet
+import gameModes
+import layoutCorpus
+import priors
+from gameContext import GameContext
+
+
+def run_games(rows: int, columns: int, games: int, threads: int, fleet_template: fleet.FleetTemplate = fleet.STANDARD_FLEET,
+              corpus: layoutCorpus.LayoutCorpus = None) -> Tuple[float, List[int]]:
+    """
+    Play seeded solo games on a thread pool. Game i always uses seed i, so the turns are the same for any number of threads.
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        games (int): Number of games to play.
+        threads (int): Number of threads in the pool.
+        fleet_template (FleetTemplate): Fleet placed in every game.
+        corpus (LayoutCorpus): Game i plays layout i of this corpus, None to place fleets from the seed.
+
+    Returns:
+        Tuple[float, List[int]]: Seconds taken and the turns of each game, in seed order.
+    """
+    cell_priors = priors.load_priors(rows, columns, fleet_template) # Read only, shared by every game
+    contexts = [GameContext(rows, columns, fleet_template, seed=seed, priors=cell_priors) for seed in range(games)]
+    layouts = [corpus.layout(game) if corpus is not None else None for game in range(games)]
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        time_start = perf_counter()
+        turns = list(executor.map(gameModes.play_solo_game, contexts, [None] * games, layouts))
+        elapsed = perf_counter() - time_start
+    return elapsed, turns
+
+
+def gil_enabled() -> bool:
+    """
+    True if the GIL is enabled, always True before Python 3.13.
+    """
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark headless solo games on thread pools of different sizes")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--fleet", default=fleet.DEFAULT_FLEET, help="Fleet name from the fleet config")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="Thread pool sizes to try")
+    parser.add_argument("--corpus", default=None, help="Layout corpus to play instead of placing fleets from the seed")
+    args = parser.parse_args()
+
+    template = fleet.get_fleet(args.fleet)
+    template.validate(args.rows, args.columns)
+    layout_corpus = None
+    if args.corpus is not None:
+        layout_corpus = layoutCorpus.load_corpus(args.corpus, template)
+        if (layout_corpus.rows, layout_corpus.columns) != (args.rows, args.columns) or len(layout_corpus) < args.games:
+            parser.error(f"{args.corpus} doesn't have {args.games} layouts for a {args.rows}x{args.columns} board")
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil_enabled() else 'disabled'}")
+    run_games(args.rows, args.columns, min(args.games, 100), 1, template, layout_corpus) # Warm up the shared caches
+
+    baseline_rate = None
+    baseline_turns = None
+    for threads in args.threads:
+        elapsed, turns = run_games(args.rows, args.columns, args.games, threads, template, layout_corpus)
+        rate = args.games / max(elapsed, 1e-9)
+        if baseline_rate is None:
+            baseline_rate, baseline_turns = rate, turns
+        # Seeded games must give the same result whatever the number of threads
+        same = "same results" if turns == baseline_turns else "DIFFERENT RESULTS"
+        print(f"{threads:>3} threads: {rate:>9.1f} games/s, speedup {rate / baseline_rate:.2f}x, {same}")
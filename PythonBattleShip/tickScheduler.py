@@ -0,0 +1,160 @@
+""" Fixed rate tick scheduler and non-blocking keyboard input for watched games
+
+    Ticks are scheduled at fixed times from the start (start + n * period), not by sleeping a fixed time after each
+    turn, so time spent thinking and rendering is taken out of the wait and the cadence doesn't drift.
+    While waiting for the next tick the scheduler polls the keyboard.
+
+    Controls while a game is being watched:
+        p   Pause / resume
+        f   Fast-forward on / off, ticks happen as fast as possible
+        q   Quit
+
+    Classes:
+        KeyReader:
+            Read single key presses from the terminal without blocking.
+
+        TickScheduler:
+            Wait for fixed rate ticks while handling key presses.
+"""
+from time import monotonic, sleep
+import os
+import sys
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import select
+    import termios
+    import tty
+
+POLL_INTERVAL: float = 0.02 # Longest the scheduler sleeps between checking for key presses
+
+
+class KeyReader:
+    """
+    Read single key presses from the terminal without blocking. Use as a context manager so the terminal
+    is put back to normal afterwards. If input is not from a terminal no keys are ever read.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Args:
+            enabled (bool): False to never read keys, eg. when a game isn't being watched.
+        """
+        self.enabled: bool = enabled and sys.stdin is not None and sys.stdin.isatty()
+        self.saved_settings = None # Terminal settings to restore on exit, POSIX only
+
+    def __enter__(self) -> "KeyReader":
+        if self.enabled and os.name != 'nt':
+            # Stop the terminal waiting for enter, so key presses can be read one at a time
+            self.saved_settings = termios.tcgetattr(sys.stdin.fileno())
+            tty.setcbreak(sys.stdin.fileno())
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.saved_settings is not None:
+            termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, self.saved_settings)
+            self.saved_settings = None
+
+    def read_key(self) -> str:
+        """
+        Get a key press if one is waiting.
+
+        Returns:
+            str: The key pressed in lower case, or None if no key is waiting.
+        """
+        if not self.enabled:
+            return None
+        if os.name == 'nt':
+            if msvcrt.kbhit():
+                return msvcrt.getwch().lower()
+        elif select.select([sys.stdin], [], [], 0)[0]:
+            return sys.stdin.read(1).lower()
+        return None
+
+
+class TickScheduler:
+    """
+    Wait for ticks at a fixed rate, handling pause, fast-forward and quit keys while waiting.
+
+    Attributes:
+        period (float): Seconds between ticks.
+        paused (bool): True while paused, wait doesn't return until resumed.
+        fast_forward (bool): True to tick as fast as possible.
+        quit (bool): True once quit has been pressed.
+    """
+
+    def __init__(self, period: float, key_reader: KeyReader = None):
+        """
+        Args:
+            period (float): Seconds between ticks.
+            key_reader (KeyReader): Where key presses are read from, None to ignore the keyboard.
+        """
+        self.period: float = period
+        self.key_reader: KeyReader = key_reader
+        self.paused: bool = False
+        self.fast_forward: bool = False
+        self.quit: bool = False
+        self.next_tick: float = monotonic() + period
+
+    def time_left(self) -> float:
+        """
+        Seconds until the next tick, 0 when fast-forwarding. Work that fits in this time won't delay the tick.
+        """
+        if self.fast_forward:
+            return 0.0
+        return max(self.next_tick - monotonic(), 0.0)
+
+    def handle_keys(self) -> None:
+        """
+        Apply any waiting key presses.
+        """
+        if self.key_reader is None:
+            return
+        while True:
+            key = self.key_reader.read_key()
+            if key is None:
+                return
+            if key == 'p':
+                self.paused = not self.paused
+            elif key == 'f':
+                self.fast_forward = not self.fast_forward
+            elif key == 'q':
+                self.quit = True
+
+    def wait(self) -> bool:
+        """
+        Wait for the next tick. Keys are handled while waiting.
+
+        Returns:
+            bool: True to carry on, False if quit was pressed.
+        """
+        while True:
+            self.handle_keys()
+            if self.quit:
+                return False
+            now = monotonic()
+            if self.paused:
+                self.next_tick = now + self.period # Start the schedule again from when it is resumed
+            elif self.fast_forward or now >= self.next_tick:
+                break
+            sleep(min(self.next_tick - now, POLL_INTERVAL) if not self.paused else POLL_INTERVAL)
+
+        # Schedule the next tick from the last one, not from now, so the rate doesn't drift
+        self.next_tick += self.period
+        if self.next_tick < now:
+            self.next_tick = now + self.period # Fell more than a tick behind, don't rush to catch up
+        return True
+
+
+if __name__ == "__main__":
+    # Print a tick every 0.5 seconds, even with a varying amount of work each tick
+    import random
+    with KeyReader() as keys:
+        scheduler = TickScheduler(0.5, keys)
+        start = monotonic()
+        for tick in range(10):
+            sleep(random.uniform(0, 0.3)) # Pretend to do some work
+            if not scheduler.wait():
+                break
+            print(f"Tick {tick + 1} at {monotonic() - start:.3f} seconds")